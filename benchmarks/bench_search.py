@@ -0,0 +1,224 @@
+"""
+Search pipeline benchmark on a synthetic corpus (see corpus.py).
+
+Measures files/s and MB/s for each stage of a search:
+  - walk:        Walker traversal including the stat of every file,
+  - extract.EXT: file_reader text extraction, per format, without the cache,
+  - match.*:     compiled Query matching over the extracted text,
+  - search.*:    end-to-end FileSearcher runs, filename-only and content
+                 (cold and warm cache, and with --workers processes).
+
+Every measurement is repeated --repeat times and the fastest run is kept. The
+report is JSON (corpus manifest, environment and results), so runs can be
+saved with --output and compared with --compare.
+
+Usage:
+    python benchmarks/bench_search.py [--files N] [--depth N] [--seed N] [--corpus DIR]
+                                      [--repeat N] [--workers N] [--output FILE] [--compare FILE]
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus  # noqa: E402
+from file_search_app import cache, file_reader, walker  # noqa: E402
+from file_search_app.query import Query  # noqa: E402
+from file_search_app.search import FileSearcher  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def _metric(seconds, files, nbytes, **extra):
+    metric = {
+        "seconds": round(seconds, 4),
+        "files": files,
+        "bytes": nbytes,
+        "files_per_s": round(files / seconds, 1) if seconds else None,
+        "mb_per_s": round(nbytes / MB / seconds, 2) if seconds else None,
+    }
+    metric.update(extra)
+    return metric
+
+
+def _best_of(repeat, func, before=None):
+    """Runs func repeat times and returns (fastest seconds, last return value)."""
+    best, value = None, None
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def bench_walk(root, repeat):
+    def walk():
+        files = nbytes = 0
+        for entry in walker.Walker(root, None, [], False):
+            files += 1
+            nbytes += entry.stat().st_size
+        return files, nbytes
+    seconds, (files, nbytes) = _best_of(repeat, walk)
+    return _metric(seconds, files, nbytes)
+
+
+def _files_by_ext(root):
+    by_ext = defaultdict(list)
+    for entry in walker.Walker(root, None, [], False):
+        by_ext[os.path.splitext(entry.name)[1][1:].lower()].append((entry.path, entry.stat().st_size))
+    return by_ext
+
+
+def bench_extract(by_ext, repeat):
+    """Per-format extraction rate; also returns the extracted texts for matching."""
+    results, texts = {}, []
+    for ext in sorted(by_ext):
+        files = by_ext[ext]
+        seconds, extracted = _best_of(repeat, lambda: [file_reader.read_file_content(p) for p, _ in files])
+        chars = sum(len(t) for t in extracted)
+        results[f"extract.{ext}"] = _metric(seconds, len(files), sum(size for _, size in files), chars=chars)
+        texts.extend(extracted)
+    return results, texts
+
+
+def bench_match(texts, repeat):
+    """Matching rate over already extracted text; bytes are the UTF-8 size of the text."""
+    nbytes = sum(len(t.encode("utf-8", "ignore")) for t in texts)
+    queries = {
+        "match.keyword": Query(corpus.KEYWORD, False, False, False),
+        "match.all_of_3": Query(f"report budget {corpus.KEYWORD}", False, False, False),
+        "match.any_of_3": Query(f"nothing_here absent_word {corpus.KEYWORD}", True, False, False),
+        "match.regex": Query(r"planted_\w+|\d{4}-\d{2}-\d{2}", False, False, True),
+    }
+    results = {}
+    for name, query in queries.items():
+        seconds, hits = _best_of(repeat, lambda: sum(query.find(t) != -1 for t in texts))
+        results[name] = _metric(seconds, len(texts), nbytes, hits=hits)
+    return results
+
+
+def _search(root, content, workers=1):
+    params = {'directory': root, 'pattern': corpus.KEYWORD, 'extensions': None, 'match_any': False,
+              'case_sensitive': False, 'search_content': content, 'use_regex': False,
+              'exclude': [], 'workers': workers}
+    hits = []
+    FileSearcher(params).search(None, hits.append, None)
+    return len(hits)
+
+
+def bench_search(root, manifest, repeat, workers):
+    """End-to-end searches; expected_hits is what the corpus planted, as a sanity check."""
+    formats = manifest["formats"].values()
+    files = sum(s["files"] for s in formats)
+    nbytes = manifest["bytes"]
+    name_hits = sum(s["name_hits"] for s in formats)
+    content_hits = sum(s["content_hits"] for s in formats)
+    # Forked workers would inherit a warm cache, so every cold run starts empty
+    clear = cache.get_default_cache().clear
+    results = {}
+
+    seconds, hits = _best_of(repeat, lambda: _search(root, False))
+    results["search.filename"] = _metric(seconds, files, nbytes, hits=hits, expected_hits=name_hits)
+
+    seconds, hits = _best_of(repeat, lambda: _search(root, True), before=clear)
+    results["search.content_cold"] = _metric(seconds, files, nbytes, hits=hits, expected_hits=content_hits)
+
+    clear()
+    _search(root, True)
+    seconds, hits = _best_of(repeat, lambda: _search(root, True))
+    results["search.content_warm"] = _metric(seconds, files, nbytes, hits=hits, expected_hits=content_hits)
+
+    if workers > 1:
+        seconds, hits = _best_of(repeat, lambda: _search(root, True, workers), before=clear)
+        results[f"search.content_{workers}_workers"] = _metric(seconds, files, nbytes, hits=hits,
+                                                               expected_hits=content_hits)
+    return results
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def _load_corpus(directory, args):
+    """Generates the corpus unless directory already holds one; its manifest sits next to it."""
+    manifest_path = directory.rstrip(os.sep) + ".json"
+    if os.path.isdir(directory) and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    manifest = corpus.generate(directory, args.files, args.depth, args.fanout, args.seed,
+                               paragraphs=args.paragraphs)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def compare(report, baseline):
+    """Prints the speed-up of every metric against a baseline report (>1 is faster)."""
+    print(f"{'metric':<30} {'baseline s':>11} {'current s':>11} {'speed-up':>9}")
+    for name, metric in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not metric["seconds"]:
+            continue
+        print(f"{name:<30} {old['seconds']:>11} {metric['seconds']:>11} {old['seconds'] / metric['seconds']:>8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=700)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--corpus", metavar="DIR", help="reuse (or create) the corpus in DIR instead of a temp dir")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--output", metavar="FILE", help="write the JSON report to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare against an earlier report")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.corpus or os.path.join(tmp, "corpus")
+        manifest = _load_corpus(directory, args)
+        results = {"walk": bench_walk(directory, args.repeat)}
+        extract, texts = bench_extract(_files_by_ext(directory), args.repeat)
+        results.update(extract)
+        results.update(bench_match(texts, args.repeat))
+        results.update(bench_search(directory, manifest, args.repeat, args.workers))
+
+    report = {"environment": _environment(), "corpus": manifest, "repeat": args.repeat, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    else:
+        print(f"{'metric':<30} {'seconds':>9} {'files/s':>10} {'MB/s':>9}")
+        for name, m in results.items():
+            print(f"{name:<30} {m['seconds']:>9} {m['files_per_s']!s:>10} {m['mb_per_s']!s:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Startup benchmark for the lazily loaded document backends.
+
+Each scenario runs in a fresh interpreter so import costs are measured cold
+(modulo the OS file cache). "eager backends" imports every parser library up
+front, which is what importing file_reader and ui used to cost before backends
+were loaded on demand.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat N] [--json]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "PyPDF2", "docx", "pptx", "openpyxl", "tkinter"]
+
+_SEARCH = """
+import sys
+from file_search_app.search import FileSearcher
+params = {{'directory': {directory!r}, 'pattern': 'needle', 'extensions': {extensions!r},
+          'match_any': False, 'case_sensitive': False, 'search_content': {content!r}, 'use_regex': False}}
+FileSearcher(params).search(None, None, None)
+"""
+
+_REPORT = """
+print(",".join(m for m in {heavy!r} if m in sys.modules) or "-")
+"""
+
+
+def _make_corpus(directory):
+    for i in range(50):
+        with open(os.path.join(directory, f"note_{i}.txt"), "w") as f:
+            f.write("haystack " * 50 + ("needle" if i % 10 == 0 else ""))
+
+
+def _scenarios(directory):
+    return {
+        "import search": "import sys\nimport file_search_app.search\n",
+        "filename-only search": _SEARCH.format(directory=directory, extensions=None, content=False),
+        "txt content search": _SEARCH.format(directory=directory, extensions=["txt"], content=True),
+        "eager backends": "import sys\nimport pandas, PyPDF2, docx, pptx, openpyxl\n",
+    }
+
+
+def _run(code):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code + _REPORT.format(heavy=HEAVY_MODULES)],
+                         cwd=REPO_ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if out.returncode != 0:
+        return None, out.stderr.strip().splitlines()[-1]
+    return elapsed, out.stdout.strip().splitlines()[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario (median is reported)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        _make_corpus(directory)
+        for name, code in _scenarios(directory).items():
+            times, loaded = [], ""
+            for _ in range(args.repeat):
+                elapsed, loaded = _run(code)
+                if elapsed is None:
+                    break
+                times.append(elapsed)
+            results[name] = {
+                "median_ms": round(statistics.median(times) * 1000, 1) if times else None,
+                "heavy_modules_loaded": loaded if times else f"error: {loaded}",
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in results.items():
+            median = "n/a" if r["median_ms"] is None else f"{r['median_ms']:.1f} ms"
+            print(f"{name:<24} {median:>10}   loaded: {r['heavy_modules_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Tabular extraction benchmark: streaming openpyxl/csv readers vs the old pandas path.
+
+Generates a workbook and a CSV with --rows rows (100k by default) and a keyword
+planted near the top, then times:
+  - the previous extraction (pandas read_excel + DataFrame.to_string, and
+    CSV text built with `text += ...` per row),
+  - the streaming readers in file_reader (full extraction),
+  - a content search that stops at the first matching cell.
+
+Usage:
+    python benchmarks/bench_tabular.py [--rows N] [--cols N] [--json]
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_search_app import file_reader  # noqa: E402
+from file_search_app.search import FileSearcher  # noqa: E402
+
+KEYWORD = "planted_needle"
+
+
+def make_workbook(path, rows, cols):
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append([f"col{c}" for c in range(cols)])
+    for r in range(rows):
+        values = [r * cols + c if c % 2 else f"text {r}-{c}" for c in range(cols)]
+        if r == 10:
+            values[3] = KEYWORD
+        ws.append(values)
+    wb.save(path)
+
+
+def make_csv(path, rows, cols):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([f"col{c}" for c in range(cols)])
+        for r in range(rows):
+            values = [f"text {r}-{c}" for c in range(cols)]
+            if r == 10:
+                values[3] = KEYWORD
+            writer.writerow(values)
+
+
+def old_xlsx(path):
+    import pandas as pd
+    text = ""
+    for sheet_name, sheet_df in pd.read_excel(path, sheet_name=None).items():
+        text += f"Sheet: {sheet_name} " + sheet_df.to_string() + " "
+    return text
+
+
+def old_csv(path):
+    text = ""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for row in csv.reader(f):
+            text += " ".join(row) + " "
+    return text
+
+
+def first_hit(directory, ext):
+    params = {'directory': directory, 'pattern': KEYWORD, 'extensions': [ext], 'match_any': False,
+              'case_sensitive': False, 'search_content': True, 'use_regex': False}
+    hits = []
+    FileSearcher(params).search(None, hits.append, None)
+    return hits[0]['location'] if hits else None
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return round(time.perf_counter() - start, 3), value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        xlsx = os.path.join(directory, "book.xlsx")
+        csv_path = os.path.join(directory, "table.csv")
+        results["generate_xlsx_s"], _ = timed(make_workbook, xlsx, args.rows, args.cols)
+        make_csv(csv_path, args.rows, args.cols)
+
+        if file_reader.load_backend("pandas") is not None:
+            results["xlsx_pandas_s"], _ = timed(old_xlsx, xlsx)
+        results["xlsx_streaming_s"], _ = timed(file_reader.read_file_content, xlsx)
+        results["xlsx_first_hit_s"], results["xlsx_hit"] = timed(first_hit, directory, "xlsx")
+
+        results["csv_concat_s"], _ = timed(old_csv, csv_path)
+        results["csv_streaming_s"], _ = timed(file_reader.read_file_content, csv_path)
+        results["csv_first_hit_s"], results["csv_hit"] = timed(first_hit, directory, "csv")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name:<22} {value}")
+
+
+if __name__ == "__main__":
+    main()
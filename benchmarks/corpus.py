@@ -0,0 +1,212 @@
+"""
+Reproducible synthetic corpora for the benchmarks.
+
+Builds a directory tree of configurable depth and fan-out filled with txt, csv,
+py, docx, pptx, xlsx and pdf files. File names, sizes and text come from a
+seeded random generator, and a known fraction of files has KEYWORD planted in
+its content (and some in their name), so searches have a predictable number of
+hits. PDFs are written directly; the Office formats need python-docx,
+python-pptx and openpyxl and are left out when those aren't installed.
+
+Usage:
+    python benchmarks/corpus.py DIRECTORY [--files N] [--depth N] [--fanout N] [--seed N]
+"""
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+import importlib
+
+KEYWORD = "planted_needle"
+FORMATS = ("txt", "csv", "py", "docx", "pptx", "xlsx", "pdf")
+# Office formats and the library needed to write them
+_WRITER_BACKENDS = {"docx": "docx", "pptx": "pptx", "xlsx": "openpyxl"}
+
+_WORDS = (
+    "report budget invoice meeting quarterly summary project customer account "
+    "delivery schedule review contract payment status draft final update team "
+    "revenue forecast analysis market product release support ticket vendor"
+).split()
+
+
+def _paragraphs(rng, count, words_per_paragraph, plant):
+    paragraphs = [" ".join(rng.choices(_WORDS, k=words_per_paragraph)) for _ in range(count)]
+    if plant:
+        # Anywhere in the file, so early-exit matching gets a realistic spread
+        i = rng.randrange(count)
+        words = paragraphs[i].split()
+        words.insert(rng.randrange(len(words) + 1), KEYWORD)
+        paragraphs[i] = " ".join(words)
+    return paragraphs
+
+
+def _write_txt(path, paragraphs):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs) + "\n")
+
+
+def _write_py(path, paragraphs):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, p in enumerate(paragraphs):
+            f.write(f"def func_{i}(value):\n    \"\"\"{p}\"\"\"\n    return value * {i}\n\n\n")
+
+
+def _write_csv(path, paragraphs):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "notes", "amount"])
+        for i, p in enumerate(paragraphs):
+            writer.writerow([i, p.split()[0], p, i * 17 % 1000])
+
+
+def _write_docx(path, paragraphs):
+    docx = importlib.import_module("docx")
+    doc = docx.Document()
+    for p in paragraphs:
+        doc.add_paragraph(p)
+    doc.save(path)
+
+
+def _write_pptx(path, paragraphs):
+    pptx = importlib.import_module("pptx")
+    prs = pptx.Presentation()
+    for p in paragraphs:
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = p
+    prs.save(path)
+
+
+def _write_xlsx(path, paragraphs):
+    openpyxl = importlib.import_module("openpyxl")
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append(["id", "notes", "amount"])
+    for i, p in enumerate(paragraphs):
+        ws.append([i, p, i * 17 % 1000])
+    wb.save(path)
+
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _write_pdf(path, paragraphs):
+    """Writes a minimal PDF with one page per paragraph and a built-in font."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(paragraphs)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(paragraphs)} >>".encode())
+    font_id = 3 + 2 * len(paragraphs)
+    for i, text in enumerate(paragraphs):
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                        f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>").encode())
+        stream = f"BT /F1 10 Tf 40 750 Td ({_pdf_string(text)}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+_WRITERS = {
+    "txt": _write_txt, "csv": _write_csv, "py": _write_py, "docx": _write_docx,
+    "pptx": _write_pptx, "xlsx": _write_xlsx, "pdf": _write_pdf,
+}
+
+
+def available_formats(formats=FORMATS):
+    """The requested formats whose writer library is installed."""
+    available = []
+    for ext in formats:
+        backend = _WRITER_BACKENDS.get(ext)
+        if backend is not None:
+            try:
+                importlib.import_module(backend)
+            except ImportError:
+                continue
+        available.append(ext)
+    return available
+
+
+def _directories(root, depth, fanout):
+    """All directories of a tree with the given depth and fan-out, root included."""
+    dirs = [root]
+    level = [root]
+    for d in range(depth):
+        level = [os.path.join(parent, f"dir_{d}_{i}") for parent in level for i in range(fanout)]
+        dirs.extend(level)
+    return dirs
+
+
+def generate(root, files=1000, depth=3, fanout=3, seed=0, formats=FORMATS,
+             paragraphs=20, words=40, hit_rate=0.1, name_hit_rate=0.02):
+    """
+    Writes the corpus under root and returns its manifest: the parameters,
+    total bytes, and per-format file counts, bytes and planted hits.
+
+    The same arguments always produce the same tree and text. Each file gets
+    between paragraphs/2 and paragraphs*2 paragraphs of `words` words.
+    """
+    rng = random.Random(seed)
+    formats = available_formats(formats)
+    dirs = _directories(root, depth, fanout)
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+
+    per_format = {ext: {"files": 0, "bytes": 0, "content_hits": 0, "name_hits": 0} for ext in formats}
+    for i in range(files):
+        ext = formats[i % len(formats)]
+        plant = rng.random() < hit_rate
+        name_hit = rng.random() < name_hit_rate
+        name = f"{rng.choice(_WORDS)}_{i}" + (f"_{KEYWORD}" if name_hit else "") + f".{ext}"
+        path = os.path.join(rng.choice(dirs), name)
+        count = rng.randint(max(1, paragraphs // 2), paragraphs * 2)
+        _WRITERS[ext](path, _paragraphs(rng, count, words, plant))
+
+        stats = per_format[ext]
+        stats["files"] += 1
+        stats["bytes"] += os.path.getsize(path)
+        stats["content_hits"] += plant
+        stats["name_hits"] += name_hit
+
+    return {
+        "root": root,
+        "params": {"files": files, "depth": depth, "fanout": fanout, "seed": seed,
+                   "paragraphs": paragraphs, "words": words, "hit_rate": hit_rate,
+                   "name_hit_rate": name_hit_rate},
+        "keyword": KEYWORD,
+        "directories": len(dirs),
+        "bytes": sum(s["bytes"] for s in per_format.values()),
+        "formats": per_format,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", help="where to create the corpus (created if missing)")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--paragraphs", type=int, default=20, help="average paragraphs (pages, slides, rows) per file")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    args = parser.parse_args(argv)
+
+    manifest = generate(args.directory, args.files, args.depth, args.fanout, args.seed,
+                        args.formats, args.paragraphs)
+    json.dump(manifest, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Allows running the package with `python -m file_search_app`.
+"""
+import sys
+from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
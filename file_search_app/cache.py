@@ -0,0 +1,186 @@
+"""
+Extracted-text cache shared by the searcher and the preview pane.
+
+Extracted (location, text) units are kept in an in-memory LRU bounded by total
+size, backed by an optional zlib-compressed on-disk tier. Entries are keyed by
+(path, size, mtime), so a modified file is never served stale text.
+
+A search stops reading a document at its first hit, so the units read until
+then are kept as a partial entry: later reads are served from it and only parse
+the file again to go past it. Only complete entries go to the disk tier.
+"""
+import os
+import sys
+import json
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+from . import config
+from . import file_reader
+
+
+def _units_size(units):
+    return sum(sys.getsizeof(text) for _, text in units)
+
+
+class ExtractionCache:
+    def __init__(self, max_bytes=config.CACHE_MAX_BYTES, disk_dir=config.CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        versioned = (file_reader.EXTRACTION_VERSION,) + tuple(key)
+        digest = hashlib.sha1(repr(versioned).encode('utf-8', 'surrogatepass')).hexdigest()
+        return os.path.join(self.disk_dir, digest[:2], digest + '.z')
+
+    def get(self, key, partial=False):
+        """
+        Returns the cached units for key, or None. With partial, a partial
+        entry is returned too, as (units, complete).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (partial or entry[2]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return (entry[0], entry[2]) if partial else entry[0]
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    units = tuple(tuple(u) for u in json.loads(zlib.decompress(f.read()).decode('utf-8', 'surrogatepass')))
+            except (OSError, ValueError, zlib.error):
+                units = None
+            if units is not None:
+                self._remember(key, units)
+                with self._lock:
+                    self.hits += 1
+                return (units, True) if partial else units
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, units):
+        units = tuple(units)
+        self._remember(key, units)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                data = json.dumps(units, ensure_ascii=False).encode('utf-8', 'surrogatepass')
+                with open(tmp, 'wb') as f:
+                    f.write(zlib.compress(data, 6))
+                os.replace(tmp, path)
+            except OSError:
+                pass  # The disk tier is best effort
+
+    def _remember(self, key, units, complete=True):
+        size = _units_size(units)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (units, size, complete)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        """Approximate memory held by the cached text."""
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def iter_units(self, filepath, stat=None, reader=None):
+        """
+        Yields the (location, text) units of filepath, from the cache when
+        possible. If the consumer stops early (e.g. on a match), the units read
+        so far are cached as a partial entry; reading past one parses the file
+        again, skipping the units already cached. Files are parsed by reader
+        (file_reader.iter_file_units by default).
+        """
+        reader = reader or file_reader.iter_file_units
+        try:
+            if stat is None:
+                stat = os.stat(filepath)
+        except OSError:
+            yield from reader(filepath)
+            return
+        key = (filepath, stat.st_size, stat.st_mtime)
+        cached = self.get(key, partial=True)
+        if cached is not None:
+            prefix, complete = cached
+            yield from prefix
+            if complete:
+                return
+            with self._lock:
+                self.misses += 1
+        else:
+            prefix = ()
+        units, size = list(prefix), _units_size(prefix)
+        complete = False
+        try:
+            for i, unit in enumerate(reader(filepath)):
+                if i < len(prefix):
+                    continue  # Already yielded from the cache
+                if units is not None:
+                    units.append(unit)
+                    size += sys.getsizeof(unit[1])
+                    if size > self.max_bytes:
+                        units = None  # Too big to cache; don't hold on to the text
+                yield unit
+            complete = True
+        finally:
+            # Read errors may be transient (locks, permissions), so they are not cached
+            if units is not None and (complete or len(units) > len(prefix)) \
+                    and not any(location == file_reader.READ_ERROR for location, _ in units):
+                if complete:
+                    self.put(key, units)
+                else:
+                    self._remember(key, tuple(units), complete=False)
+
+    def read(self, filepath, stat=None, reader=None):
+        """Returns the extracted text of filepath, parsing it only on a cache miss."""
+        return file_reader.join_units(self.iter_units(filepath, stat, reader))
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Returns the process-wide cache used by search and preview."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ExtractionCache()
+        return _default_cache
+
+
+def read_file_content(filepath, stat=None, reader=None):
+    """Cached equivalent of file_reader.read_file_content."""
+    return get_default_cache().read(filepath, stat, reader)
+
+
+def iter_file_units(filepath, stat=None, reader=None):
+    """Cached equivalent of file_reader.iter_file_units."""
+    return get_default_cache().iter_units(filepath, stat, reader)
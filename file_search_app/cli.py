@@ -0,0 +1,179 @@
+"""
+Headless command-line interface.
+
+Runs FileSearcher without Tk and streams every result to stdout as a JSON line
+as soon as it is found, or with --output into a csv, xlsx or jsonl file. Exit
+codes follow grep: 0 if anything matched, 1 if nothing did, 2 on errors.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+from . import config
+from . import export
+from . import server
+from .search import FileSearcher
+
+EXIT_MATCH = 0
+EXIT_NO_MATCH = 1
+EXIT_ERROR = 2
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m file_search_app",
+        description="Advanced File Search Pro. Run without a command to open the GUI."
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("gui", help="open the graphical interface (default)")
+
+    s = commands.add_parser("search", help="search from the command line, printing JSON lines")
+    s.add_argument("pattern", help="space-separated keywords, or a regex with --regex")
+    s.add_argument("directory", nargs="?", default=os.getcwd(), help="directory to search (default: current)")
+    s.add_argument("-e", "--ext", nargs="+", metavar="EXT", help="only search these extensions, e.g. -e pdf docx")
+    s.add_argument("-c", "--content", action="store_true", help="search inside files instead of file names")
+    s.add_argument("-r", "--regex", action="store_true", help="treat the pattern as a regular expression")
+    s.add_argument("-a", "--any", action="store_true", help="match any keyword instead of all of them")
+    s.add_argument("-s", "--case-sensitive", action="store_true", help="match case")
+    s.add_argument("-x", "--exclude", nargs="*", metavar="GLOB", default=None,
+                   help=f"folder/file globs to skip (default: {' '.join(config.DEFAULT_EXCLUDES)})")
+    s.add_argument("--gitignore", action="store_true", help="skip files ignored by .gitignore")
+    s.add_argument("--index", action="store_true",
+                   help="use a persistent index: the content index with --content, the filename index otherwise")
+    s.add_argument("-j", "--workers", type=int, default=1, help="processes used for content extraction")
+    s.add_argument("-m", "--max-results", type=int, metavar="N", help="stop after N results")
+    s.add_argument("--relevance", action="store_true",
+                   help=f"print only the most relevant hits (--max-results, default {config.RANK_TOP_K}), best first, "
+                        "with a score")
+    s.add_argument("-t", "--timeout", type=float, metavar="SECONDS", help="stop after this many seconds")
+    s.add_argument("--file-timeout", type=float, metavar="SECONDS",
+                   help="skip documents whose text takes longer than this to extract")
+    s.add_argument("--max-file-size", type=float, metavar="MB", help="don't read the content of larger files")
+    s.add_argument("-o", "--output", metavar="FILE",
+                   help="write results to FILE instead of stdout, as csv, xlsx or jsonl by its extension")
+    s.add_argument("--format", choices=sorted(export.EXPORTERS), help="format for --output, overriding the extension")
+    s.add_argument("--stats", action="store_true", help="print per-stage timings and counters as JSON to stderr")
+    s.add_argument("--server", action="store_true", help="run the search on the running search server")
+
+    serve = commands.add_parser("serve", help="run a search server that keeps caches warm between searches")
+    serve.add_argument("--host", default=config.SERVER_HOST, help=f"address to listen on (default: {config.SERVER_HOST})")
+    serve.add_argument("--port", type=int, default=config.SERVER_PORT, help="port to listen on (default: any free port)")
+    serve.add_argument("--status", action="store_true", help="print the status of the running server and exit")
+    return parser
+
+
+def params_from_args(args):
+    """Maps parsed arguments onto FileSearcher params."""
+    return {
+        'directory': args.directory,
+        'pattern': args.pattern.strip(),
+        'extensions': [e.lstrip('.').lower() for e in args.ext] if args.ext else None,
+        'match_any': args.any,
+        'case_sensitive': args.case_sensitive,
+        'search_content': args.content,
+        'use_regex': args.regex,
+        'use_index': args.index,
+        'use_name_index': args.index,
+        'workers': args.workers,
+        'exclude': config.DEFAULT_EXCLUDES if args.exclude is None else args.exclude,
+        'use_gitignore': args.gitignore,
+        'file_timeout': args.file_timeout,
+        'max_file_size': int(args.max_file_size * 1024 * 1024) if args.max_file_size else None,
+        'max_results': args.max_results,
+        'relevance': args.relevance,
+        'deadline': time.monotonic() + args.timeout if args.timeout else None,
+        'collect_stats': args.stats,
+    }
+
+
+def run_search(args, out=sys.stdout):
+    params = params_from_args(args)
+    if not params['pattern']:
+        print("error: empty search pattern", file=sys.stderr)
+        return EXIT_ERROR
+    if not os.path.isdir(params['directory']):
+        print(f"error: directory not found: {params['directory']}", file=sys.stderr)
+        return EXIT_ERROR
+
+    searcher = server.RemoteSearcher(params) if args.server else FileSearcher(params)
+    if searcher.query is None:
+        print(f"error: invalid regex: {searcher.query_error}", file=sys.stderr)
+        return EXIT_ERROR
+
+    def print_result(result):
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    exporter = None
+    on_result = print_result
+    if args.output:
+        try:
+            exporter = export.open_exporter(args.output, args.format)
+        except ValueError as e:
+            print(f"error: {e} (or pass --format)", file=sys.stderr)
+            return EXIT_ERROR
+        except (OSError, ImportError) as e:
+            print(f"error: can't write {args.output}: {e}", file=sys.stderr)
+            return EXIT_ERROR
+        # Results are streamed into the file as they are found, never collected
+        on_result = exporter.write
+
+    try:
+        searcher.search(None, on_result, None)
+    except BrokenPipeError:
+        # The consumer (e.g. `head`) went away; that's not an error for us
+        sys.stderr.close()
+        return EXIT_MATCH if searcher.results_found else EXIT_NO_MATCH
+    except KeyboardInterrupt:
+        searcher.cancel("interrupted")
+    except Exception as e:
+        # Anything unexpected is an error, not "no match"
+        print(f"error: {e.__class__.__name__}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        if exporter is not None:
+            exporter.close()
+    if searcher.error is not None:
+        print(f"error: {searcher.stop_reason}", file=sys.stderr)
+        return EXIT_ERROR
+    if searcher.stop_reason:
+        print(f"stopped: {searcher.stop_reason}", file=sys.stderr)
+    for path, reason in searcher.skipped:
+        print(f"skipped: {path} ({reason})", file=sys.stderr)
+    if searcher.stats is not None:
+        print(json.dumps({'stats': searcher.stats.to_dict()}, ensure_ascii=False), file=sys.stderr)
+    return EXIT_MATCH if searcher.results_found else EXIT_NO_MATCH
+
+
+def run_serve(args):
+    if args.status:
+        try:
+            print(json.dumps(server.server_status()))
+        except server.ServerError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_ERROR
+        return EXIT_MATCH
+
+    def ready(srv):
+        host, port = srv.server_address[:2]
+        print(f"search server listening on {host}:{port} (Ctrl+C to stop)", file=sys.stderr)
+
+    try:
+        server.serve(args.host, args.port, ready_callback=ready)
+    except OSError as e:
+        print(f"error: can't start the server: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    return EXIT_MATCH
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "search":
+        return run_search(args)
+    if args.command == "serve":
+        return run_serve(args)
+    from .main import main as gui_main  # Tk is only imported for the GUI
+    gui_main()
+    return EXIT_MATCH
@@ -1,6 +1,7 @@
 """
 Configuration for the File Search App.
 """
+import os
 
 # Icon mapping for file extensions
 ICONS = {
@@ -18,3 +19,72 @@ ICONS = {
     'png': '🖼️',
     'default': '📎'
 }
+
+# Extracted-text cache shared by search and preview
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Directory for the compressed on-disk cache tier; None keeps the cache in memory only
+CACHE_DIR = None
+
+# Directory and file globs skipped while walking the search tree
+DEFAULT_EXCLUDES = ['.git', '.hg', '.svn', 'node_modules', '__pycache__']
+
+# Structured text formats matched straight from a memory map once they reach
+# STREAM_MIN_BYTES (plain text of any extension always is)
+STREAMED_EXTENSIONS = {'csv'}
+STREAM_MIN_BYTES = 16 * 1024 * 1024
+
+# GUI refresh: search events are applied to the widgets every UI_POLL_MS, for at
+# most UI_DRAIN_MS at a time. At most UI_QUEUE_ROWS results wait to be applied;
+# beyond that the search waits for the UI. Rows are inserted in sorted position
+# until UI_SORTED_INSERT_LIMIT results, after which sorting is deferred to the end.
+UI_POLL_MS = 50
+UI_DRAIN_MS = 30
+UI_QUEUE_ROWS = 20000
+UI_SORTED_INSERT_LIMIT = 20000
+# With "Export while searching", results go to the file and only the first
+# UI_LIVE_EXPORT_ROWS are also listed in the results table
+UI_LIVE_EXPORT_ROWS = 1000
+
+# Content preview: characters shown per window ("Load more" appends another one)
+# and the maximum number of highlights per window
+PREVIEW_WINDOW_CHARS = 20000
+PREVIEW_MAX_HIGHLIGHTS = 1000
+# Extraction budgets of a preview when the search limits are left empty: seconds
+# (in an isolated process) and file size in bytes
+PREVIEW_TIMEOUT = 10
+PREVIEW_MAX_BYTES = 100 * 1024 * 1024
+
+# Per-file budgets for reading document content; None disables a limit. With a
+# timeout, documents are parsed in a worker process that is killed when it runs
+# over, and the file is remembered in STATE_DIR so later searches skip it quickly.
+EXTRACT_TIMEOUT = None
+EXTRACT_MAX_BYTES = None
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".file_search_app")
+
+# Extract and match documents with identical content (copies, hardlinks) only once
+DEDUPLICATE = True
+
+# Searches whose per-file outcomes are remembered by the GUI and the search
+# server, so repeating or narrowing one only examines files that changed
+QUERY_CACHE_ENTRIES = 4
+# Directory listings they remember between walks, least recently used dropped first
+LISTINGS_MAX_DIRS = 200000
+
+# Relevance ranking: how many of the best hits are kept, the score added per
+# keyword found in the file name, and per-extension score multipliers
+RANK_TOP_K = 100
+RANK_NAME_BOOST = 1.0
+RANK_EXTENSION_BOOSTS = {'log': 0.5}
+
+# Filename index (name searches with "Use index"): it is refreshed before every
+# search unless it was refreshed less than NAME_INDEX_MAX_AGE seconds ago. Raise
+# this for large network shares, where checking every directory takes a while
+NAME_INDEX_MAX_AGE = 0
+
+# Search server (`python -m file_search_app serve`). Port 0 picks a free port; the
+# address is published in STATE_DIR/server.json for clients to find
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 0
+
+# Number of slowest files listed in search statistics
+STATS_SLOWEST_FILES = 10
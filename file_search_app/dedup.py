@@ -0,0 +1,83 @@
+"""
+Recognises files with identical content during a search.
+
+Backup-style trees hold many copies of the same documents. ContentDeduper keys
+files by inode (hardlinks) and by size plus a BLAKE2b hash of the content, so
+the outcome of extracting and matching one copy can be reused for the others.
+Both keys include the reader that extracts the file: the same bytes named
+report.docx and report.docx.orig are read differently and don't share outcomes.
+A file is only hashed once a second file of the same size turns up, so trees
+without duplicates pay next to nothing.
+"""
+import hashlib
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def content_hash(filepath):
+    """BLAKE2b digest of a file's content. Raises OSError if it can't be read."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def _inode_key(stat, kind):
+    # Some filesystems report no inode numbers; those files are matched by hash only
+    return (kind, stat.st_dev, stat.st_ino) if stat.st_ino else None
+
+
+class ContentDeduper:
+    def __init__(self):
+        self._by_inode = {}      # (kind, dev, ino) -> outcome
+        self._by_hash = {}       # (kind, size, digest) -> outcome
+        self._unhashed = {}      # size -> [(path, kind, outcome)] recorded before another file of that size was seen
+        self._hashed_sizes = set()
+        self._digests = {}       # path -> digest computed by lookup, used by record
+        self.duplicates = 0
+
+    def _hash(self, filepath):
+        try:
+            return content_hash(filepath)
+        except OSError:
+            return None
+
+    def lookup(self, filepath, stat, kind=None):
+        """
+        Returns the outcome recorded for a file with the same content, or None.
+        kind identifies how the file is read (e.g. its reader); only files of
+        the same kind share outcomes.
+        """
+        inode = _inode_key(stat, kind)
+        outcome = self._by_inode.get(inode) if inode is not None else None
+        if outcome is None:
+            size = stat.st_size
+            if size not in self._hashed_sizes and size not in self._unhashed:
+                return None  # The first file of this size can't be a copy
+            # Files of this size recorded earlier are hashed now that they may have copies
+            for path, earlier_kind, earlier in self._unhashed.pop(size, ()):
+                digest = self._hash(path)
+                if digest is not None:
+                    self._by_hash.setdefault((earlier_kind, size, digest), earlier)
+            self._hashed_sizes.add(size)
+            digest = self._hash(filepath)
+            if digest is None:
+                return None
+            outcome = self._by_hash.get((kind, size, digest))
+            if outcome is None:
+                self._digests[filepath] = digest
+        if outcome is not None:
+            self.duplicates += 1
+        return outcome
+
+    def record(self, filepath, stat, outcome, kind=None):
+        """Remembers the outcome of a file that lookup() found no copy for."""
+        inode = _inode_key(stat, kind)
+        if inode is not None:
+            self._by_inode[inode] = outcome
+        digest = self._digests.pop(filepath, None)
+        if digest is not None:
+            self._by_hash[(kind, stat.st_size, digest)] = outcome
+        else:
+            self._unhashed.setdefault(stat.st_size, []).append((filepath, kind, outcome))
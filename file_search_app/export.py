@@ -0,0 +1,120 @@
+"""
+Streaming export of search results to csv, xlsx or JSON Lines.
+
+Exporters write one result at a time and never hold the result list: csv and
+jsonl rows go straight to the file, and xlsx uses openpyxl's write-only mode,
+which spools rows to disk until the workbook is saved. That lets results be
+exported while FileSearcher produces them (e.g. from its result callback, as
+the CLI's --output and the GUI's live export do), so very large
+result sets never have to be kept in memory.
+"""
+import os
+import re
+import csv
+import json
+from datetime import datetime
+
+HEADERS = ["Filename", "Path", "Size (bytes)", "Modified", "Snippet", "Found in"]
+
+# Control characters that aren't allowed in xlsx cells
+_ILLEGAL_XLSX_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _row(result):
+    return [
+        result['name'], result['path'], result['size'],
+        datetime.fromtimestamp(result['mtime']).strftime("%Y-%m-%d %H:%M:%S"),
+        result['snippet'], result.get('location') or "",
+    ]
+
+
+class _Exporter:
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def write(self, result):
+        self._write(result)
+        self.count += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvExporter(_Exporter):
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(HEADERS)
+
+    def _write(self, result):
+        self._writer.writerow(_row(result))
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlExporter(_Exporter):
+    """One JSON object per line, the same as the command line prints."""
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write(self, result):
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxExporter(_Exporter):
+    def __init__(self, path):
+        super().__init__(path)
+        import openpyxl  # Only needed for xlsx export, so not loaded at startup
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Search Results")
+        self._sheet.append(HEADERS)
+
+    def _write(self, result):
+        self._sheet.append([_ILLEGAL_XLSX_CHARS.sub("", v) if isinstance(v, str) else v for v in _row(result)])
+
+    def close(self):
+        # A write-only workbook can only be saved once
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+
+
+EXPORTERS = {'csv': CsvExporter, 'xlsx': XlsxExporter, 'jsonl': JsonlExporter}
+
+
+def format_for(path):
+    """
+    The export format implied by a file name. Raises ValueError for other
+    extensions, so e.g. results.json never silently becomes a workbook.
+    """
+    ext = os.path.splitext(path)[1][1:].lower()
+    if ext not in EXPORTERS:
+        raise ValueError(f"can't tell the export format of {os.path.basename(path)!r}: "
+                         f"use a .csv, .jsonl or .xlsx extension")
+    return ext
+
+
+def open_exporter(path, fmt=None):
+    """
+    Opens an exporter for path, in fmt or the format its extension implies.
+    Raises ValueError for unknown formats and OSError if path can't be written.
+    """
+    return EXPORTERS[fmt or format_for(path)](path)
+
+
+def export_results(results, path, fmt=None):
+    """Writes an iterable of result dicts to path. Returns the number written."""
+    with open_exporter(path, fmt) as exporter:
+        for result in results:
+            exporter.write(result)
+    return exporter.count
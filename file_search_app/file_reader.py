@@ -1,73 +1,251 @@
 """
 Handles reading content from various file types.
+
+Readers are registered per extension and their parsing libraries are imported
+the first time a file of that type is read, so startup and searches that never
+touch e.g. spreadsheets or PDFs don't pay for importing openpyxl or PyPDF2.
 """
 import os
 import csv
-import pandas as pd
+import codecs
+import importlib
 
-# Optional dependencies
-try:
-    from PyPDF2 import PdfReader
-except ImportError:
-    PdfReader = None
+# Extension (with dot) -> reader function
+_READERS = {}
+# Module name -> imported module, or None if it isn't installed
+_BACKENDS = {}
 
-try:
-    from docx import Document
-except ImportError:
-    Document = None
+# Bumped whenever readers change what text they extract, so that persisted
+# extractions (content index, on-disk cache) made by older readers are discarded
+EXTRACTION_VERSION = 1
 
-try:
-    from pptx import Presentation
-except ImportError:
-    Presentation = None
+# Location of the unit reporting a failed read
+READ_ERROR = 'error'
+# Tag of tabular unit locations and the number of rows per unit
+CELLS = 'cells'
+TABLE_ROWS_PER_UNIT = 500
+# Bytes inspected to tell text from binary and guess the encoding
+SNIFF_BYTES = 8192
+# Formats known to be binary; skipped without opening them
+BINARY_EXTENSIONS = (
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.tif', '.tiff', '.webp',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.jar',
+    '.exe', '.dll', '.so', '.dylib', '.o', '.a', '.lib', '.pyc', '.class',
+    '.mp3', '.mp4', '.avi', '.mov', '.mkv', '.wav', '.flac',
+    '.doc', '.xls', '.ppt', '.sqlite', '.db', '.iso', '.bin',
+)
 
-def read_file_content(filepath):
-    """Extract text from supported file types."""
-    ext = os.path.splitext(filepath)[1].lower()
 
+def register_reader(*extensions):
+    """
+    Decorator registering a reader for one or more extensions. Readers are
+    generators yielding (location, text) units; see iter_file_units.
+    """
+    def decorator(func):
+        for ext in extensions:
+            _READERS[ext.lower()] = func
+        return func
+    return decorator
+
+
+def load_backend(module_name):
+    """Imports an optional parser library on first use; returns None if missing."""
+    if module_name not in _BACKENDS:
+        try:
+            _BACKENDS[module_name] = importlib.import_module(module_name)
+        except ImportError:
+            _BACKENDS[module_name] = None
+    return _BACKENDS[module_name]
+
+
+def supported_extensions():
+    return sorted(_READERS)
+
+
+def sniff_encoding(head):
+    """
+    Guesses the encoding of a file from its first bytes. Returns None for
+    binary data (NUL bytes without a UTF-16 BOM).
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    if b'\0' in head:
+        return None
     try:
-        if ext == '.txt':
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
-
-        elif ext == '.pdf':
-            if PdfReader is None:
-                return "[PDF support not installed. Please run: pip install PyPDF2]"
-            with open(filepath, 'rb') as f:
-                reader = PdfReader(f)
-                return " ".join((page.extract_text() or "") for page in reader.pages)
-
-        elif ext == '.docx':
-            if Document is None:
-                return "[DOCX support not installed. Please run: pip install python-docx]"
-            doc = Document(filepath)
-            return " ".join(p.text for p in doc.paragraphs)
-
-        elif ext == '.pptx':
-            if Presentation is None:
-                return "[PPTX support not installed. Please run: pip install python-pptx]"
-            prs = Presentation(filepath)
-            return " ".join(shape.text for slide in prs.slides for shape in slide.shapes if hasattr(shape, "text"))
-
-        elif ext == '.csv':
-            text = ""
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    text += " ".join(row) + " "
-            return text
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sample boundary is still UTF-8
+        if e.start < len(head) - 3:
+            return 'cp1252'
+    return 'utf-8'
+
+
+@register_reader('.txt')
+def _read_text(filepath):
+    """Reader for .txt and any extension without a dedicated reader."""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    encoding = sniff_encoding(data[:SNIFF_BYTES])
+    if encoding is None:
+        return  # Binary: no searchable text
+    yield None, data.decode(encoding, errors='ignore')
+
+
+@register_reader(*BINARY_EXTENSIONS)
+def _read_binary(filepath):
+    return
+    yield
+
+
+def is_text_format(ext):
+    """True if files with this extension (without dot) are read as plain text."""
+    return _READERS.get('.' + ext.lower(), _read_text) is _read_text
+
+
+@register_reader('.pdf')
+def _read_pdf(filepath):
+    pypdf2 = load_backend('PyPDF2')
+    if pypdf2 is None:
+        yield None, "[PDF support not installed. Please run: pip install PyPDF2]"
+        return
+    with open(filepath, 'rb') as f:
+        reader = pypdf2.PdfReader(f)
+        for number, page in enumerate(reader.pages, 1):
+            yield f"page {number}", page.extract_text() or ""
+
+
+@register_reader('.docx')
+def _read_docx(filepath):
+    docx = load_backend('docx')
+    if docx is None:
+        yield None, "[DOCX support not installed. Please run: pip install python-docx]"
+        return
+    doc = docx.Document(filepath)
+    for number, p in enumerate(doc.paragraphs, 1):
+        yield f"paragraph {number}", p.text
+
+
+@register_reader('.pptx')
+def _read_pptx(filepath):
+    pptx = load_backend('pptx')
+    if pptx is None:
+        yield None, "[PPTX support not installed. Please run: pip install python-pptx]"
+        return
+    prs = pptx.Presentation(filepath)
+    for number, slide in enumerate(prs.slides, 1):
+        yield f"slide {number}", " ".join(shape.text for shape in slide.shapes if hasattr(shape, "text"))
+
 
-        elif ext == '.xlsx':
-            try:
-                df = pd.read_excel(filepath, sheet_name=None)  # All sheets
-                text = ""
-                for sheet_name, sheet_df in df.items():
-                    text += f"Sheet: {sheet_name} " + sheet_df.to_string() + " "
-                return text
-            except Exception as e:
-                return f"[Excel read error: {str(e)}]"
-
-        else:
-            return f"[Unsupported format: {ext}]"
+def _row_blocks(rows, sheet=None):
+    """
+    Groups (row_number, cells) into units whose text is the cells joined by
+    spaces. The location records the cell widths so a match offset can be
+    mapped back to a (sheet, row, column) coordinate; see resolve_cell.
+    """
+    widths, cells, first_row = [], [], None
+    for number, row in rows:
+        if first_row is None:
+            first_row = number
+        while row and not row[-1]:
+            row.pop()
+        widths.append(list(map(len, row)))
+        cells += row
+        if len(widths) == TABLE_ROWS_PER_UNIT:
+            yield (CELLS, sheet, first_row, widths), " ".join(cells)
+            widths, cells, first_row = [], [], None
+    if widths:
+        yield (CELLS, sheet, first_row, widths), " ".join(cells)
+
+
+def _column_letter(number):
+    letters = ""
+    while number:
+        number, rem = divmod(number - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def resolve_cell(location, text, pos):
+    """
+    Maps an offset in a tabular unit to its cell. Returns (label, cell_text,
+    (sheet, row, column)) with 1-based row and column, or None for other units.
+    """
+    if not isinstance(location, (tuple, list)) or not location or location[0] != CELLS:
+        return None
+    _, sheet, first_row, widths = location
+    offset = 0
+    for r, row_widths in enumerate(widths):
+        for c, width in enumerate(row_widths):
+            # A match starting on the separator is attributed to the cell before it
+            if pos <= offset + width:
+                row, column = first_row + r, c + 1
+                label = f"{_column_letter(column)}{row}"
+                if sheet is not None:
+                    label = (f"'{sheet}'" if " " in sheet else sheet) + "!" + label
+                return label, text[offset:offset + width], (sheet, row, column)
+            offset += width + 1
+    return None
+
+
+@register_reader('.csv')
+def _read_csv(filepath):
+    with open(filepath, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+        yield from _row_blocks(enumerate(csv.reader(f), 1))
+
+
+@register_reader('.xlsx')
+def _read_xlsx(filepath):
+    try:
+        openpyxl = load_backend('openpyxl')
+        if openpyxl is None:
+            yield None, "[Excel support not installed. Please run: pip install openpyxl]"
+            return
+        # read_only streams rows from the XML instead of building the whole workbook
+        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                yield f"sheet {ws.title}", f"Sheet: {ws.title}"
+                rows = (
+                    (number, ["" if v is None else str(v) for v in values])
+                    for number, values in enumerate(ws.iter_rows(values_only=True), 1)
+                )
+                yield from _row_blocks(rows, ws.title)
+        finally:
+            wb.close()
+    except Exception as e:
+        yield None, f"[Excel read error: {str(e)}]"
+
+
+def reader_for(filepath):
+    """The reader that extracts a file's text, chosen by its extension."""
+    return _READERS.get(os.path.splitext(filepath)[1].lower(), _read_text)
+
+
+def iter_file_units(filepath):
+    """
+    Yields (location, text) units of a file as it is parsed: pages, slides,
+    paragraphs, sheets or row blocks. location is a label such as 'page 3',
+    a CELLS tuple for spreadsheet rows, or None for formats without internal
+    structure. A read error ends the stream with a READ_ERROR unit.
+    """
+    reader = reader_for(filepath)
+    try:
+        yield from reader(filepath)
     except Exception as e:
-        return f"[Error reading file: {str(e)}]"
+        yield READ_ERROR, f"[Error reading file: {str(e)}]"
+
+
+def join_units(units):
+    """Joins units into the flat text returned by read_file_content."""
+    units = list(units)
+    for location, text in units:
+        if location == READ_ERROR:
+            return text
+    return " ".join(text for _, text in units)
+
+
+def read_file_content(filepath):
+    """Extract text from supported file types."""
+    return join_units(iter_file_units(filepath))
@@ -0,0 +1,186 @@
+"""
+Persistent on-disk content index.
+
+Extracted text is stored in a SQLite database under STATE_DIR, one per search
+root, so that repeat content searches only re-extract files whose stat changed.
+The text is kept in an FTS5 table with the trigram tokenizer, so the literal
+text a query requires (see Query.required_literals) is looked up in the index
+instead of scanning every stored document; candidates are then matched with
+the compiled Query as usual.
+
+Documents are stored as the space-joined text of their (location, text) units,
+with the location and length of each unit alongside, so candidates are split
+back into units and matched, and report their hits (e.g. spreadsheet cells),
+exactly as without the index.
+"""
+import os
+import json
+import hashlib
+import sqlite3
+
+from . import config
+from . import file_reader
+
+# Older versions kept the index in the searched root under this name; such
+# files are still never searched
+INDEX_FILENAME = '.file_search_index.sqlite'
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id     INTEGER PRIMARY KEY,   -- rowid of the text in texts
+    path   TEXT NOT NULL UNIQUE,  -- Absolute path
+    ext    TEXT NOT NULL,
+    size   INTEGER NOT NULL,
+    mtime  REAL NOT NULL,
+    inode  INTEGER NOT NULL,
+    units  TEXT NOT NULL          -- JSON [location, length] of each unit of the text
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS texts USING fts5(text, tokenize='trigram');
+"""
+
+
+def default_index_path(directory):
+    """Returns the location of the index for a search root."""
+    root = os.path.abspath(directory)
+    digest = hashlib.sha1(root.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(config.STATE_DIR, 'content_index', digest + '.sqlite')
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _split_units(text, layout):
+    """The (location, text) units of a stored text, from their [location, length] layout."""
+    units = []
+    offset = 0
+    for location, length in json.loads(layout):
+        if isinstance(location, list):
+            location = tuple(location)
+        units.append((location, text[offset:offset + length]))
+        offset += length + 1  # The joining space
+    return units
+
+
+def match_expression(query):
+    """
+    FTS5 MATCH expression selecting the documents query can match, or None when
+    the index can't narrow it down. Trigrams need three characters, so shorter
+    literals are left to the Query.
+    """
+    alternatives = query.required_literals()
+    if alternatives is None:
+        return None
+    terms = []
+    for literals in alternatives:
+        usable = [_phrase(text) for text in literals if len(text) >= 3]
+        if not usable:
+            return None
+        terms.append("(" + " AND ".join(usable) + ")")
+    return " OR ".join(terms)
+
+
+class ContentIndex:
+    """Stores extracted units keyed by path and validated by (size, mtime, inode)."""
+
+    def __init__(self, path):
+        """Raises sqlite3.Error if the database can't be opened or created."""
+        self.path = path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        except OSError as e:
+            raise sqlite3.OperationalError(f"unable to create {path}: {e}") from e
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        version = SCHEMA_VERSION * 1000 + int(file_reader.EXTRACTION_VERSION)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != version:
+            # Text extracted by older readers may differ; re-extract everything
+            self.conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS texts;")
+            self.conn.execute(f"PRAGMA user_version = {version}")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+        self._known = None
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load_known(self):
+        self._known = {
+            path: (size, mtime, inode)
+            for path, size, mtime, inode in self.conn.execute("SELECT path, size, mtime, inode FROM files")
+        }
+
+    def is_fresh(self, filepath, stat):
+        """True if the stored entry for filepath (absolute) matches the given stat result."""
+        if self._known is None:
+            self._load_known()
+        return self._known.get(filepath) == (stat.st_size, stat.st_mtime, stat.st_ino)
+
+    def store(self, filepath, stat, units):
+        """Stores the (location, text) units of filepath (absolute)."""
+        ext = os.path.splitext(filepath)[1][1:].lower()
+        layout = json.dumps([[location, len(text)] for location, text in units], ensure_ascii=False)
+        self.forget(filepath)
+        cursor = self.conn.execute(
+            "INSERT INTO files (path, ext, size, mtime, inode, units) VALUES (?, ?, ?, ?, ?, ?)",
+            (filepath, ext, stat.st_size, stat.st_mtime, stat.st_ino, layout)
+        )
+        self.conn.execute("INSERT INTO texts (rowid, text) VALUES (?, ?)",
+                          (cursor.lastrowid, " ".join(text for _, text in units)))
+        if self._known is not None:
+            self._known[filepath] = (stat.st_size, stat.st_mtime, stat.st_ino)
+
+    def forget(self, filepath):
+        """Drops the entry for filepath, e.g. once its text can no longer be read."""
+        row = self.conn.execute("SELECT id FROM files WHERE path = ?", (filepath,)).fetchone()
+        if row is not None:
+            self.conn.execute("DELETE FROM texts WHERE rowid = ?", row)
+            self.conn.execute("DELETE FROM files WHERE id = ?", row)
+        if self._known is not None:
+            self._known.pop(filepath, None)
+
+    def prune(self, seen_paths):
+        """
+        Drops entries for files that no longer exist. Entries merely not seen,
+        e.g. filtered out by this search's extensions or excludes, are kept.
+        """
+        if self._known is None:
+            self._load_known()
+        for path in [p for p in self._known if p not in seen_paths and not os.path.exists(p)]:
+            self.forget(path)
+        self.conn.commit()
+
+    def containing(self, text):
+        """Paths of the indexed files containing text (3+ characters, ignoring case)."""
+        return {path for (path,) in self.conn.execute(
+            "SELECT f.path FROM files f JOIN texts ON texts.rowid = f.id WHERE texts MATCH ?", (_phrase(text),))}
+
+    def query(self, query, extensions=None):
+        """
+        Yields (path, size, mtime, units) for the indexed files that may match
+        query, a compiled Query; every indexed file when the index can't narrow
+        it down. units are the file's (location, text) units; callers still
+        match them.
+        """
+        sql = "SELECT f.path, f.size, f.mtime, f.units, texts.text FROM files f JOIN texts ON texts.rowid = f.id"
+        clauses, args = [], []
+        expression = match_expression(query)
+        if expression is not None:
+            clauses.append("texts MATCH ?")
+            args.append(expression)
+        if extensions:
+            clauses.append("f.ext IN (" + ", ".join("?" for _ in extensions) + ")")
+            args.extend(e.lower() for e in extensions)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        for path, size, mtime, layout, text in self.conn.execute(sql, args):
+            yield path, size, mtime, _split_units(text, layout)
@@ -0,0 +1,225 @@
+"""
+Per-file extraction budgets.
+
+Documents are parsed in a separate worker process that is killed when a file
+exceeds its time budget, so one pathological PDF can't stall a whole search.
+Files that time out or crash the parser are remembered in a small failure log
+and skipped quickly by later searches until they change (or, for timeouts,
+until a search allows them more time).
+"""
+import os
+import json
+import time
+import threading
+import multiprocessing
+
+from . import config
+from . import file_reader
+
+# Seconds a new worker process may take to become ready
+STARTUP_TIMEOUT = 30
+# Seconds between cancellation checks while waiting for the worker
+CANCEL_POLL_SECONDS = 0.1
+
+
+class ExtractionFailed(Exception):
+    """The isolated extractor crashed or was killed."""
+    # Failures are remembered for the file unless it wasn't to blame
+    recordable = True
+    # Seconds of budget the failure applies to; None for any budget (a crash)
+    budget = None
+
+
+class ExtractionTimeout(ExtractionFailed):
+    """A file exceeded its extraction time budget."""
+
+    def __init__(self, budget):
+        super().__init__(f"timed out after {budget:g}s")
+        self.budget = budget
+
+
+class ExtractorUnavailable(ExtractionFailed):
+    """The worker process couldn't be started; says nothing about the file."""
+    recordable = False
+
+
+class ExtractionCancelled(Exception):
+    """The search was cancelled while a file was being extracted."""
+
+
+def _worker_main(conn, stop):
+    """Worker process loop: extracts one file per request and streams its units back."""
+    conn.send(('ready', None))
+    while True:
+        try:
+            filepath = conn.recv()
+        except EOFError:
+            return
+        if filepath is None:
+            return
+        for unit in file_reader.iter_file_units(filepath):
+            if stop.is_set():
+                break
+            conn.send(('unit', unit))
+        conn.send(('done', None))
+
+
+class IsolatedExtractor:
+    """
+    Runs file_reader.iter_file_units in a killable child process.
+
+    The worker is started on first use and restarted after it is killed.
+    Spawn is used instead of fork so it is safe to use from GUI threads. When
+    the optional cancelled() callable returns True the worker is killed at once.
+    """
+
+    def __init__(self, timeout, cancelled=None):
+        self.timeout = timeout
+        self.cancelled = cancelled
+        self._context = multiprocessing.get_context('spawn')
+        self._proc = None
+        self._conn = None
+        self._stop = None
+
+    def _ensure_worker(self):
+        if self._proc is not None and self._proc.is_alive():
+            return
+        parent_conn, child_conn = self._context.Pipe()
+        self._stop = self._context.Event()
+        self._proc = self._context.Process(target=_worker_main, args=(child_conn, self._stop), daemon=True)
+        self._proc.start()
+        child_conn.close()
+        self._conn = parent_conn
+        # Interpreter startup must not count against the first file's budget
+        if not parent_conn.poll(STARTUP_TIMEOUT):
+            self._kill()
+            raise ExtractorUnavailable("extractor did not start")
+        try:
+            parent_conn.recv()
+        except (EOFError, OSError):
+            self._kill()
+            raise ExtractorUnavailable("extractor did not start")
+
+    def _kill(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.join()
+            self._conn.close()
+        self._proc = self._conn = None
+
+    def close(self):
+        if self._proc is not None and self._proc.is_alive():
+            try:
+                self._conn.send(None)
+                self._proc.join(1)
+            except OSError:
+                pass
+        self._kill()
+
+    def _receive(self, deadline):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._kill()
+                raise ExtractionTimeout(self.timeout)
+            if self._conn.poll(min(remaining, CANCEL_POLL_SECONDS)):
+                break
+            if self.cancelled is not None and self.cancelled():
+                self._kill()
+                raise ExtractionCancelled()
+        try:
+            return self._conn.recv()
+        except (EOFError, OSError):
+            self._kill()
+            raise ExtractionFailed("extractor crashed")
+
+    def iter_units(self, filepath):
+        """
+        Yields the units of filepath like file_reader.iter_file_units. Raises
+        ExtractionTimeout once the file's total time budget is used up.
+        """
+        self._ensure_worker()
+        self._stop.clear()
+        self._conn.send(filepath)
+        deadline = time.monotonic() + self.timeout
+        finished = False
+        try:
+            while True:
+                kind, unit = self._receive(deadline)
+                if kind == 'done':
+                    finished = True
+                    return
+                yield unit
+        finally:
+            if not finished and self._proc is not None:
+                # The consumer stopped early (e.g. on a match): stop the worker
+                # and drop whatever it already sent before the next request
+                self._stop.set()
+                try:
+                    while self._receive(deadline)[0] != 'done':
+                        pass
+                except (ExtractionFailed, ExtractionCancelled):
+                    pass
+
+
+class FailureLog:
+    """
+    Files whose extraction failed, keyed by path and valid while size/mtime are
+    unchanged. A timeout only counts for budgets up to the one that ran out.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config.STATE_DIR, 'extraction_failures.json')
+        self._lock = threading.Lock()
+        self._new = {}
+        self._dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def known_failure(self, filepath, stat, budget=None):
+        """
+        Returns the recorded reason if filepath failed before in its current
+        state and would fail again within budget (seconds; None for unlimited).
+        """
+        entry = self._entries.get(filepath)
+        # Entries without a budget were written by older versions and are ignored
+        if not entry or len(entry) < 4 or entry[0] != stat.st_size or entry[1] != stat.st_mtime:
+            return None
+        failed_budget = entry[3]
+        if failed_budget is not None and (budget is None or budget > failed_budget):
+            return None
+        return entry[2]
+
+    def record(self, filepath, stat, reason, budget=None):
+        """Remembers a failure; budget is the time budget that ran out, None for a crash."""
+        self.merge({filepath: [stat.st_size, stat.st_mtime, reason, budget]})
+
+    def merge(self, entries):
+        """Adds entries recorded elsewhere, e.g. by a process-pool worker."""
+        with self._lock:
+            self._entries.update(entries)
+            self._new.update(entries)
+            self._dirty = True
+
+    def take_new(self):
+        """Returns and forgets the entries recorded since the last call."""
+        with self._lock:
+            new, self._new = self._new, {}
+            return new
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError:
+                pass  # Remembering failures is an optimisation only
@@ -0,0 +1,276 @@
+"""
+Persistent filename index for instant, locate-style name searches.
+
+The names of all files and directories below the searched roots are kept in a
+SQLite database in STATE_DIR, with a trigram index over the case-folded file
+names. A name search only looks at the files that contain every trigram of its
+keywords (or of the literal text a regex requires), so it takes milliseconds
+however large the tree is, and the candidates are then matched for real.
+
+The index is refreshed incrementally before it is queried: like
+walker.DirectoryListings, a directory is only listed again when its mtime
+changed, which happens when an entry is added, removed or renamed in it.
+Unchanged directories cost one stat each. Directories the search never descends
+into (excluded or ignored by .gitignore) aren't refreshed either.
+"""
+import os
+import time
+import sqlite3
+
+from . import config
+from .walker import RACY_SECONDS
+
+INDEX_FILENAME = 'names.sqlite'
+INDEX_VERSION = 3
+# Directories listed between commits, so other searches aren't locked out for long
+COMMIT_EVERY = 500
+# Postings counted at most when picking the rarest trigram to start from
+RARITY_PROBE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id        INTEGER PRIMARY KEY,
+    path      TEXT NOT NULL UNIQUE,
+    mtime     INTEGER,            -- st_mtime_ns when listed; NULL lists it again
+    refreshed REAL,               -- When a refresh rooted here last completed
+    scope     TEXT                -- The scope of that refresh; NULL if nothing was skipped
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id     INTEGER PRIMARY KEY,
+    dir    INTEGER NOT NULL,
+    name   TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    UNIQUE (dir, name)
+);
+CREATE TABLE IF NOT EXISTS grams (
+    gram  TEXT NOT NULL,
+    entry INTEGER NOT NULL,
+    PRIMARY KEY (gram, entry)
+) WITHOUT ROWID;
+"""
+
+
+def default_index_path():
+    return os.path.join(config.STATE_DIR, INDEX_FILENAME)
+
+
+def trigrams(text):
+    folded = text.casefold()
+    return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+
+def _storable(name):
+    """False for names with undecodable bytes, which SQLite can't store."""
+    try:
+        name.encode('utf-8')
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def requirements(query):
+    """
+    Trigram sets a matching name must contain, as alternatives: a name can only
+    match if it has every trigram of at least one set. None when the query
+    can't be narrowed down that way (e.g. a keyword shorter than three letters).
+    """
+    literals = query.required_literals()
+    if literals is None:
+        return None
+    alternatives = [set().union(*(trigrams(text) for text in alternative)) for alternative in literals]
+    return alternatives if all(alternatives) else None
+
+
+def _subtree(root):
+    """SQL condition and arguments selecting the directory paths at or below root."""
+    prefix = root if root.endswith(os.sep) else root + os.sep
+    return "(d.path = ? OR (d.path >= ? AND d.path < ?))", [root, prefix, prefix[:-1] + chr(ord(os.sep) + 1)]
+
+
+class NameIndex:
+    """Names of files and directories keyed by directory, with a trigram index over file names."""
+
+    def __init__(self, path):
+        """Raises sqlite3.Error if the database can't be opened or created."""
+        self.path = path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        except OSError as e:
+            raise sqlite3.OperationalError(f"unable to create {path}: {e}") from e
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS entries; "
+                                    "DROP TABLE IF EXISTS grams;")
+            self.conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fresh(self, root, max_age, scope):
+        """
+        True if root, or a directory above it, was refreshed less than max_age
+        seconds ago in the same scope, or without skipping anything.
+        """
+        since = time.time() - max_age
+        directory = root
+        while True:
+            row = self.conn.execute("SELECT refreshed, scope FROM dirs WHERE path = ?", (directory,)).fetchone()
+            if row is not None and row[0] is not None and row[0] >= since and row[1] in (None, scope):
+                return True
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return False
+            directory = parent
+
+    def _add_entry(self, dir_id, name, is_dir):
+        cursor = self.conn.execute("INSERT OR IGNORE INTO entries (dir, name, is_dir) VALUES (?, ?, ?)",
+                                   (dir_id, name, int(is_dir)))
+        if cursor.rowcount and not is_dir:
+            entry_id = cursor.lastrowid
+            self.conn.executemany("INSERT OR IGNORE INTO grams (gram, entry) VALUES (?, ?)",
+                                  ((gram, entry_id) for gram in trigrams(name)))
+
+    def _remove_entry(self, entry_id, name, is_dir):
+        if not is_dir:
+            self.conn.executemany("DELETE FROM grams WHERE gram = ? AND entry = ?",
+                                  ((gram, entry_id) for gram in trigrams(name)))
+        self.conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+
+    def _forget(self, directory):
+        """Drops a directory that no longer exists, with everything below it."""
+        condition, args = _subtree(directory)
+        dirs = self.conn.execute(f"SELECT id FROM dirs d WHERE {condition}", args).fetchall()
+        for (dir_id,) in dirs:
+            for entry_id, name, is_dir in self.conn.execute(
+                    "SELECT id, name, is_dir FROM entries WHERE dir = ?", (dir_id,)).fetchall():
+                self._remove_entry(entry_id, name, is_dir)
+            self.conn.execute("DELETE FROM dirs WHERE id = ?", (dir_id,))
+
+    def _relist(self, directory, dir_id, mtime):
+        """Brings the stored entries of directory up to date; returns its subdirectories."""
+        listing = {}
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not _storable(entry.name):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    if is_dir and entry.is_symlink():
+                        continue  # Neither a file nor followed, like Walker
+                except OSError:
+                    is_dir = False
+                listing[entry.name] = is_dir
+        if dir_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO dirs (path) VALUES (?)", (directory,))
+            dir_id = self.conn.execute("SELECT id FROM dirs WHERE path = ?", (directory,)).fetchone()[0]
+
+        stored = set()
+        for entry_id, name, is_dir in self.conn.execute(
+                "SELECT id, name, is_dir FROM entries WHERE dir = ?", (dir_id,)).fetchall():
+            if listing.get(name) == bool(is_dir):
+                stored.add(name)
+                continue
+            self._remove_entry(entry_id, name, is_dir)
+            if is_dir:
+                self._forget(os.path.join(directory, name))
+        for name, is_dir in listing.items():
+            if name not in stored:
+                self._add_entry(dir_id, name, is_dir)
+
+        # A change within the same mtime tick would go unnoticed, so recent
+        # directories are listed again next time
+        recent = time.time() - mtime / 1e9 <= RACY_SECONDS
+        self.conn.execute("UPDATE dirs SET mtime = ? WHERE id = ?", (None if recent else mtime, dir_id))
+        return [os.path.join(directory, name) for name, is_dir in listing.items() if is_dir]
+
+    def refresh(self, root, cancelled=None, max_age=0, descend=None, scope=None):
+        """
+        Updates the index for the tree under root (an absolute path), listing
+        only directories whose mtime changed. descend, if given, is called with
+        the path of each subdirectory and returns False for those to skip with
+        everything below them (e.g. walker.Walker.descends); scope is a string
+        identifying it. Skipped if root was refreshed less than max_age seconds
+        ago in the same scope. Returns the number of directories (listed, unchanged).
+        """
+        if descend is None:
+            scope = None
+        if max_age and self._fresh(root, max_age, scope):
+            return 0, 0
+        listed = unchanged = 0
+        stack = [root]
+        while stack:
+            if cancelled is not None and cancelled():
+                self.conn.commit()
+                return listed, unchanged
+            directory = stack.pop()
+            row = self.conn.execute("SELECT id, mtime FROM dirs WHERE path = ?", (directory,)).fetchone()
+            dir_id, known_mtime = row if row is not None else (None, None)
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime == known_mtime:
+                unchanged += 1
+                subdirs = [os.path.join(directory, name) for (name,) in self.conn.execute(
+                    "SELECT name FROM entries WHERE dir = ? AND is_dir = 1", (dir_id,))]
+            else:
+                try:
+                    subdirs = self._relist(directory, dir_id, mtime) if mtime is not None else None
+                except OSError:
+                    subdirs = None
+                if subdirs is None:
+                    if dir_id is not None:
+                        self._forget(directory)
+                    continue
+                listed += 1
+                if listed % COMMIT_EVERY == 0:
+                    self.conn.commit()
+            if descend is not None:
+                # Their stored entries are kept for searches that do descend
+                subdirs = [d for d in subdirs if descend(d)]
+            # Reversed so that subdirectories are visited in listing order, like Walker
+            stack.extend(reversed(subdirs))
+        self.conn.execute("UPDATE dirs SET refreshed = ?, scope = ? WHERE path = ?", (time.time(), scope, root))
+        self.conn.commit()
+        return listed, unchanged
+
+    def _rarest_first(self, grams):
+        def postings(gram):
+            return self.conn.execute("SELECT COUNT(*) FROM (SELECT 1 FROM grams WHERE gram = ? LIMIT ?)",
+                                     (gram, RARITY_PROBE)).fetchone()[0]
+        return sorted(grams, key=postings)
+
+    def candidates(self, root, query):
+        """
+        Yields (directory, name) of the indexed files under root whose names
+        may match query, ordered by path. Every file under root is a candidate
+        when the query can't be narrowed down by trigrams.
+        """
+        condition, args = _subtree(root)
+        alternatives = requirements(query)
+        if alternatives is None:
+            sql = (f"SELECT d.path, e.name FROM entries e JOIN dirs d ON d.id = e.dir "
+                   f"WHERE e.is_dir = 0 AND {condition}")
+        else:
+            selects, select_args = [], []
+            for grams in alternatives:
+                # Driven by the rarest trigram; the others are primary key lookups
+                first, *rest = self._rarest_first(grams)
+                exists = "".join(" AND EXISTS (SELECT 1 FROM grams WHERE gram = ? AND entry = g.entry)"
+                                 for _ in rest)
+                selects.append(f"SELECT d.path, e.name FROM grams g JOIN entries e ON e.id = g.entry "
+                               f"JOIN dirs d ON d.id = e.dir WHERE g.gram = ?{exists} AND {condition}")
+                select_args.extend([first, *rest, *args])
+            sql, args = " UNION ".join(selects), select_args
+        yield from self.conn.execute(sql + " ORDER BY 1, 2", args)
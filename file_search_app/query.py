@@ -0,0 +1,345 @@
+"""
+Compiled search queries.
+
+A Query is built once per search and reused for every file name and content.
+Keyword lists are compiled into a single alternation regex, so one pass over the
+text finds the first position of every keyword, decides match-any/match-all and
+yields the snippet offset at the same time.
+"""
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+def _regex_literals(pattern, flags):
+    """Runs of literal text that every match of the regex contains."""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        # A private parser; anything unexpected just means no literals
+        return []
+    runs = []
+
+    def walk(items):
+        run = []
+        for op, av in items:
+            if op == sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            if run:
+                runs.append(''.join(run))
+                run = []
+            # Groups are required as a whole; alternatives, repeats and
+            # lookarounds may not match their literals, so they are skipped
+            if op == sre_parse.SUBPATTERN:
+                walk(av[-1])
+        if run:
+            runs.append(''.join(run))
+
+    walk(parsed)
+    return runs
+
+
+# ASCII letters that also match non-ASCII characters when case is ignored:
+# str patterns fold i to \u0130/\u0131, k to the Kelvin sign and s to long s
+_UNICODE_FOLDS = {'i': '\u0130\u0131', 'k': '\u212a', 's': '\u017f'}
+_ANCHORS = ('AT_BEGINNING', 'AT_BEGINNING_STRING', 'AT_END', 'AT_END_STRING')
+
+
+def _escape_folded(keyword):
+    """re.escape() of an ASCII bytes keyword that also matches its Unicode case variants."""
+    parts = []
+    for c in keyword.decode('ascii'):
+        escaped = re.escape(c.encode('ascii'))
+        folds = _UNICODE_FOLDS.get(c.lower())
+        if folds:
+            escaped = b'(?:' + b'|'.join([escaped] + [f.encode('utf-8') for f in folds]) + b')'
+        parts.append(escaped)
+    return b''.join(parts)
+
+
+def _bytes_safe(pattern, ignorecase):
+    """
+    True if the ASCII regex matches UTF-8 bytes exactly where it matches text:
+    only literals, positive sets of literals, groups, alternatives, repeats,
+    lookarounds and ^/$ anchors. Classes such as \\w, \\d, \\b and . or negated
+    sets are Unicode-aware (or match part of a character) on str only, and
+    ignoring case also folds i, k and s to non-ASCII letters.
+    """
+    if not pattern.isascii():
+        return False
+    try:
+        parsed = sre_parse.parse(pattern, re.IGNORECASE if ignorecase else 0)
+    except Exception:
+        return False
+    anchors = {getattr(sre_parse, name) for name in _ANCHORS}
+
+    def literal(code):
+        return not ignorecase or chr(code).lower() not in _UNICODE_FOLDS
+
+    def safe(items):
+        for op, av in items:
+            if op == sre_parse.LITERAL:
+                if not literal(av):
+                    return False
+            elif op == sre_parse.IN:
+                for item_op, item_av in av:
+                    if item_op == sre_parse.LITERAL:
+                        if not literal(item_av):
+                            return False
+                    elif item_op == sre_parse.RANGE:
+                        if ignorecase and any(chr(c).lower() in _UNICODE_FOLDS
+                                              for c in range(item_av[0], item_av[1] + 1)):
+                            return False
+                    else:
+                        return False  # NEGATE, CATEGORY
+            elif op == sre_parse.SUBPATTERN:
+                if not safe(av[-1]):
+                    return False
+            elif op == sre_parse.BRANCH:
+                if not all(safe(branch) for branch in av[1]):
+                    return False
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) or op.name == 'POSSESSIVE_REPEAT':
+                if not safe(av[2]):
+                    return False
+            elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                if not safe(av[1]):
+                    return False
+            elif op == sre_parse.AT:
+                if av not in anchors:
+                    return False
+            else:
+                return False
+        return True
+
+    return safe(parsed)
+
+
+def _context_sensitive(pattern, flags):
+    """
+    True if whether the regex matches at a position also depends on the text
+    around the match: ^, $, \\A, \\Z, \\b or a lookaround. Such regexes can't be
+    matched over slices of a text without matching at the slice edges.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return True
+
+    def walk(items):
+        for op, av in items:
+            if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                return True
+            if op == sre_parse.SUBPATTERN:
+                subpatterns = [av[-1]]
+            elif op == sre_parse.BRANCH:
+                subpatterns = av[1]
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) or op.name == 'POSSESSIVE_REPEAT':
+                subpatterns = [av[2]]
+            elif op.name == 'ATOMIC_GROUP':
+                subpatterns = [av]
+            elif op == sre_parse.GROUPREF_EXISTS:
+                subpatterns = [p for p in av[1:] if p is not None]
+            else:
+                continue
+            if any(walk(p) for p in subpatterns):
+                return True
+        return False
+
+    return walk(parsed)
+
+
+def _overlaps(a, b):
+    """True if a proper suffix of a is a prefix of b."""
+    return any(b.startswith(a[i:]) for i in range(1, len(a)))
+
+
+class Query:
+    def __init__(self, pattern, match_any=False, case_sensitive=False, use_regex=False, _encode=False):
+        """Raises re.error if use_regex is set and the pattern is invalid."""
+        self.pattern = pattern
+        self.match_any = match_any
+        self.case_sensitive = case_sensitive
+        self.use_regex = use_regex
+        flags = 0 if case_sensitive else re.IGNORECASE
+        convert = (lambda s: s.encode('utf-8')) if _encode else (lambda s: s)
+
+        if use_regex:
+            self.keywords = []
+            self._regex = re.compile(convert(pattern), flags)
+            # Anchors and lookarounds look past the match, so slices of a text can't be matched alone
+            self.context_sensitive = _context_sensitive(pattern, flags)
+            return
+
+        self._regex = None
+        self.context_sensitive = False
+        escape = _escape_folded if _encode and not case_sensitive else re.escape
+        self.keywords = [convert(k) for k in pattern.split()]
+        folded = [k if case_sensitive else k.lower() for k in self.keywords]
+        # Distinct keywords, longest first so the alternation prefers the longest hit
+        distinct = sorted(set(folded), key=len, reverse=True)
+        self._slots = {k: i for i, k in enumerate(distinct)}
+        self._keyword_slots = [self._slots[k] for k in folded]
+        self._combined = re.compile(
+            convert('|').join(convert('(') + escape(k) + convert(')') for k in distinct), flags
+        ) if distinct else None
+
+        # A keyword contained in another one is found whenever the longer one is
+        self._implied = {}
+        for i, k in enumerate(distinct):
+            for j, other in enumerate(distinct):
+                if i != j and k in other:
+                    self._implied.setdefault(j, []).append((i, other.find(k)))
+        # Keywords whose hits may be swallowed by an overlapping hit of another
+        # keyword; only these get a dedicated search when the single pass misses them
+        self._shadowed = {
+            self._slots[k]: re.compile(escape(k), flags)
+            for k in distinct
+            if any(k != o and (_overlaps(k, o) or _overlaps(o, k)) for o in distinct)
+        }
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(params['pattern'], params['match_any'], params['case_sensitive'], params['use_regex'])
+
+    def encoded(self):
+        """
+        Returns an equivalent Query over UTF-8 bytes, or None when bytes patterns
+        can't express it: case-insensitive non-ASCII keywords, or a regex using
+        more than the syntax that means the same on bytes (see _bytes_safe).
+        """
+        if not self.case_sensitive and not self.pattern.isascii():
+            return None
+        # Inline flags may turn case folding on anywhere in the pattern
+        if self.use_regex and not _bytes_safe(self.pattern, not self.case_sensitive or '(?' in self.pattern):
+            return None
+        try:
+            return Query(self.pattern, self.match_any, self.case_sensitive, self.use_regex, _encode=True)
+        except re.error:
+            return None
+
+    def satisfied(self, found):
+        if self.match_any:
+            return bool(found)
+        return len(found) == len(self._slots)
+
+    def collect(self, text, found):
+        """
+        Records the first position of each keyword slot not yet in found.
+
+        found maps slot -> position and may be carried across chunks of a file;
+        the pass stops as soon as the match criteria are satisfied.
+        """
+        if self._combined is None or self.satisfied(found):
+            return found
+        for m in self._combined.finditer(text):
+            slot = m.lastindex - 1
+            if slot not in found:
+                found[slot] = m.start()
+                for implied, offset in self._implied.get(slot, ()):
+                    found.setdefault(implied, m.start() + offset)
+            if self.satisfied(found):
+                return found
+        for slot, regex in self._shadowed.items():
+            if slot not in found:
+                m = regex.search(text)
+                if m:
+                    found[slot] = m.start()
+                    if self.satisfied(found):
+                        break
+        return found
+
+    def anchor_slot(self, found):
+        """Slot the snippet is taken from: the first keyword if found, else the earliest hit."""
+        if self._keyword_slots and self._keyword_slots[0] in found:
+            return self._keyword_slots[0]
+        return min(found, key=found.get) if found else None
+
+    def anchor(self, found):
+        slot = self.anchor_slot(found)
+        return found[slot] if slot is not None else 0
+
+    def find(self, text):
+        """Returns the snippet offset of the match in text, or -1 if it doesn't match."""
+        if self._regex is not None:
+            m = self._regex.search(text)
+            return m.start() if m else -1
+        if not self.keywords:
+            # Mirrors all([]) / any([]) of the original keyword matching
+            return -1 if self.match_any else 0
+        found = self.collect(text, {})
+        return self.anchor(found) if self.satisfied(found) else -1
+
+    def find_in_units(self, units):
+        """
+        Matches a stream of (location, text) units, stopping as soon as the match
+        criteria are met. Returns (location, text, pos) of the snippet anchor, or
+        None if the units don't match.
+        """
+        if self._regex is not None or not self.keywords:
+            for location, text in units:
+                pos = self.find(text)
+                if pos != -1:
+                    return location, text, pos
+            return None
+
+        found = {}
+        hits = {}  # slot -> (location, text, pos), in discovery order
+        for location, text in units:
+            before = set(found)
+            self.collect(text, found)
+            for slot in sorted(found.keys() - before, key=found.get):
+                hits[slot] = (location, text, found[slot])
+            if self.satisfied(found):
+                first = self._keyword_slots[0]
+                return hits[first] if first in hits else next(iter(hits.values()))
+        return None
+
+    @property
+    def term_count(self):
+        """Number of counters count_terms() fills: one per distinct keyword, or one for a regex."""
+        return 1 if self._regex is not None else len(self._slots)
+
+    def term_keys(self):
+        """The distinct (case-folded) keywords in counter order."""
+        if self._regex is not None:
+            return [self.pattern]
+        return sorted(self._slots, key=self._slots.get)
+
+    def count_terms(self, text, counts):
+        """
+        Adds the occurrences of every keyword in text to counts (a list of
+        term_count ints) and returns it; a regex counts its matches.
+        """
+        if self._regex is not None:
+            counts[0] += sum(1 for _ in self._regex.finditer(text))
+            return counts
+        if self._combined is None:
+            return counts
+        for m in self._combined.finditer(text):
+            slot = m.lastindex - 1
+            counts[slot] += 1
+            for implied, _ in self._implied.get(slot, ()):
+                counts[implied] += 1
+        return counts
+
+    def required_literals(self):
+        """
+        Text a match must contain, for index lookups: a list of alternatives,
+        each a list of strings that all occur in the text when the alternative
+        matches. None when nothing is required (e.g. no keywords). Literals are
+        compared case-insensitively unless case_sensitive is set.
+        """
+        if self._regex is not None:
+            flags = 0 if self.case_sensitive else re.IGNORECASE
+            runs = _regex_literals(self.pattern, flags)
+            return [runs] if runs else None
+        if not self.keywords:
+            return None
+        return [[k] for k in self.keywords] if self.match_any else [list(self.keywords)]
+
+    def matches(self, text):
+        return self.find(text) != -1
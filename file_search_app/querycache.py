@@ -0,0 +1,196 @@
+"""
+Cache of recent searches for incremental re-search.
+
+Users often repeat a search, or refine it, over the same folder. A QueryCache
+remembers the outcome of every file examined by recent searches, keyed by the
+search root and the params that decide outcomes, together with the file's stat.
+A repeat search still walks the tree, but through DirectoryListings, so only
+directories whose mtime changed are listed again, and only files whose stat
+changed (or that are new) are examined again; the others reuse their outcome.
+
+A narrowing refinement, one that adds match-all keywords or narrows the
+extension list, can't match a file the earlier search didn't, so it reuses that
+search's misses and only matches its hits (and changed files) again. When only
+the extensions narrowed, the hits are reused too.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from . import config
+from .walker import DirectoryListings
+
+# recall() result for files that must be examined
+MISSING = object()
+
+
+def stat_key(stat):
+    # ctime also changes on chmod, so a file that couldn't be read is retried once it can
+    return stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino
+
+
+def search_fields(params):
+    """The params that decide the outcome of a file, normalised."""
+    use_regex = bool(params['use_regex'])
+    extensions = params['extensions']
+    pattern = params['pattern']
+    if not use_regex:
+        # Keywords are matched like Query folds them, so "Budget" repeats "budget"
+        pattern = tuple(pattern.split() if params['case_sensitive'] else pattern.lower().split())
+    return {
+        'root': os.path.abspath(params['directory']),
+        'pattern': pattern,
+        'match_any': bool(params['match_any']),
+        'case_sensitive': bool(params['case_sensitive']),
+        'search_content': bool(params['search_content']),
+        'use_regex': use_regex,
+        'extensions': tuple(sorted(set(extensions))) if extensions else None,
+        'exclude': tuple(params.get('exclude', config.DEFAULT_EXCLUDES) or ()),
+        'use_gitignore': bool(params.get('use_gitignore', False)),
+        'max_file_size': params.get('max_file_size', config.EXTRACT_MAX_BYTES),
+        'file_timeout': params.get('file_timeout', config.EXTRACT_TIMEOUT),
+        'relevance': bool(params.get('relevance')),
+    }
+
+
+def refines(fields, earlier):
+    """
+    True if every file matching a search with fields also matched the earlier
+    search: it only adds match-all keywords and/or narrows the extensions.
+    """
+    if any(fields[k] != earlier[k] for k in fields if k not in ('pattern', 'extensions')):
+        return False
+    if fields['use_regex'] or fields['match_any']:
+        if fields['pattern'] != earlier['pattern']:
+            return False
+    else:
+        fold = (lambda k: k) if fields['case_sensitive'] else str.lower
+        if not {fold(k) for k in earlier['pattern']} <= {fold(k) for k in fields['pattern']}:
+            return False
+    if earlier['extensions'] is None:
+        return True
+    return fields['extensions'] is not None and set(fields['extensions']) <= set(earlier['extensions'])
+
+
+class CachedRun:
+    """
+    One search's view of the cache: recalls outcomes from the search it can
+    build on, records its own and, once complete, is stored for later searches.
+    """
+
+    def __init__(self, cache, fields, previous, hits_valid, rarity=None):
+        self.cache = cache
+        self.fields = fields
+        # Whether the earlier search's hits are hits of this one too
+        self.hits_valid = hits_valid
+        # Relevance mode: the rank.Rarity recalled misses are counted in
+        self.rarity = rarity
+        self._previous = previous or {}
+        self._outcomes = {}  # path -> (stat key or None, result dict or None, keyword counts of a miss or None)
+        self.recalled = 0
+
+    def recall(self, entry):
+        """
+        The outcome remembered for a walked file: a copy of its result dict,
+        None if it didn't match, or MISSING if it has to be examined.
+        """
+        previous = self._previous.get(entry.path)
+        if previous is None:
+            return MISSING
+        key, result, terms = previous
+        if result is not None and not (self.hits_valid and self.fields['search_content']):
+            # Hits of a broader search are matched again; name hits are cheap
+            # to redo and get a fresh size and date
+            return MISSING
+        if result is None and self.rarity is not None and (terms is None or not self.hits_valid):
+            # Keyword counts are needed for ranking, and a broader search counted other keywords
+            return MISSING
+        # A name search outcome depends on the path alone, a content one on the file's stat
+        if self.fields['search_content']:
+            try:
+                if stat_key(entry.stat()) != key:
+                    return MISSING
+            except OSError:
+                return MISSING
+        if result is None and self.rarity is not None:
+            self.rarity.add(terms)
+        self._outcomes[entry.path] = previous
+        self.recalled += 1
+        return dict(result) if result is not None else None
+
+    def record(self, entry, result, terms=None):
+        """
+        Remembers the outcome of a file examined by this search; terms are the
+        keyword counts of a file that didn't match, in relevance mode.
+        """
+        key = None
+        if self.fields['search_content']:
+            try:
+                key = stat_key(entry.stat())
+            except OSError:
+                return
+        self._outcomes[entry.path] = (key, dict(result) if result is not None else None, terms)
+
+    def finish(self):
+        """Stores the outcomes; only call this when the whole tree was searched."""
+        self.cache.store(self.fields, self._outcomes)
+
+
+class QueryCache:
+    """
+    Outcomes of the last max_entries complete searches, least recently used
+    dropped first. Its listings are used by searches that aren't given their own.
+    """
+
+    def __init__(self, max_entries=config.QUERY_CACHE_ENTRIES, listings=None):
+        self.max_entries = max_entries
+        self.listings = listings if listings is not None else DirectoryListings()
+        self._entries = OrderedDict()  # fields key -> (fields, outcomes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.refinements = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(fields):
+        return tuple(sorted(fields.items()))
+
+    def begin(self, params, rarity=None):
+        """
+        Starts a CachedRun for a search, built on the best remembered one.
+        rarity is the search's rank.Rarity, in relevance mode.
+        """
+        fields = search_fields(params)
+        key = self._key(fields)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return CachedRun(self, fields, entry[1], hits_valid=True, rarity=rarity)
+            # The most recent search this one narrows down
+            for earlier, outcomes in reversed(self._entries.values()):
+                if refines(fields, earlier):
+                    self.refinements += 1
+                    # With the same keywords only the extensions narrowed
+                    return CachedRun(self, fields, outcomes, hits_valid=fields['pattern'] == earlier['pattern'],
+                                     rarity=rarity)
+            self.misses += 1
+        return CachedRun(self, fields, None, hits_valid=False, rarity=rarity)
+
+    def store(self, fields, outcomes):
+        if self.max_entries <= 0:
+            return
+        key = self._key(fields)
+        with self._lock:
+            self._entries[key] = (fields, outcomes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
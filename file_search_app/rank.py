@@ -0,0 +1,96 @@
+"""
+Relevance ranking of search hits.
+
+Every hit is described by how often each keyword occurs in it and by its
+length. Ranker scores it BM25-style: term frequencies saturate, long documents
+are normalised against the average length, rare keywords weigh more, keywords
+in the file name add a boost and the extension scales the score. Only the best
+`limit` hits are kept, in a bounded heap, so memory and sorting cost grow with
+the limit rather than with the number of hits.
+
+Keyword rarity is taken over every file examined, matching or not (see
+Rarity), and the average length over the hits; both are only final once the
+search ends. Until then the running values decide which hits are kept; the
+kept ones are scored again with the final values at the end.
+"""
+import math
+import heapq
+
+from . import config
+
+# BM25 term-frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+
+
+class Rarity:
+    """Number of files examined and, per keyword, of those containing it (IDF's N and df)."""
+
+    def __init__(self, term_count):
+        self.files = 0
+        self.df = [0] * term_count
+
+    def add(self, terms):
+        """Counts one examined file, given its keyword counts."""
+        self.files += 1
+        for i, tf in enumerate(terms):
+            if tf:
+                self.df[i] += 1
+
+
+class Ranker:
+    def __init__(self, query, limit=config.RANK_TOP_K, name_boost=config.RANK_NAME_BOOST,
+                 extension_boosts=config.RANK_EXTENSION_BOOSTS, rarity=None):
+        """
+        rarity is the Rarity the searcher adds the files that didn't match to;
+        hits are added to it by add().
+        """
+        self.query = query
+        self.limit = limit
+        self.name_boost = name_boost
+        self.extension_boosts = extension_boosts
+        self.hits = 0
+        self.rarity = rarity if rarity is not None else Rarity(query.term_count)
+        self._total_length = 0
+        self._heap = []  # Min-heap of (score, -sequence, result, terms, length)
+
+    def score(self, result, terms, length):
+        avg_length = self._total_length / self.hits if self.hits else 0
+        norm = 1 - B + B * length / avg_length if avg_length else 1
+        score = 0.0
+        examined = self.rarity.files
+        for tf, df in zip(terms, self.rarity.df):
+            if tf:
+                idf = math.log(1 + examined / df)
+                score += idf * tf * (K1 + 1) / (tf + K1 * norm)
+        in_name = self.query.count_terms(result['name'], [0] * self.query.term_count)
+        score += self.name_boost * sum(1 for n in in_name if n)
+        return score * self.extension_boosts.get(result['ext'], 1.0)
+
+    def add(self, result, terms=None, length=0):
+        """
+        Offers a hit with its keyword counts (see Query.count_terms), or None
+        when only its name was matched. Returns True if it is kept for now.
+        """
+        terms = terms or [0] * self.query.term_count
+        self.hits += 1
+        self._total_length += length
+        self.rarity.add(terms)
+        # Earlier hits win ties, so equally relevant files keep their walk order
+        entry = (self.score(result, terms, length), -self.hits, result, terms, length)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def results(self):
+        """The kept hits, most relevant first, each with its final 'score'."""
+        ranked = []
+        for _, order, result, terms, length in self._heap:
+            result['score'] = round(self.score(result, terms, length), 4)
+            ranked.append((result['score'], order, result))
+        ranked.sort(key=lambda entry: entry[:2], reverse=True)
+        return [result for _, _, result in ranked]
@@ -0,0 +1,155 @@
+"""
+Compact, column-oriented storage for search results.
+
+A list of result dicts costs around a kilobyte per hit. ResultStore keeps each
+field in its own column instead: directories are interned and shared by the
+files in them, sizes and mtimes live in typed arrays, and snippets, which are
+only needed for export, are spilled to a temporary file and read back on
+demand. Sorting produces a permutation of row numbers (an argsort), so rows are
+never copied or rebuilt, and the GUI renders only the rows on screen from it.
+"""
+import os
+import tempfile
+from array import array
+
+# Sort orders offered by the GUI; dates and sizes sort newest/largest first
+SORT_ORDERS = ('name', 'date', 'size')
+
+
+def _split(path):
+    """Splits path into a directory prefix (with its separator) and file name."""
+    cut = max(path.rfind('/'), path.rfind(os.sep)) + 1
+    return path[:cut], path[cut:]
+
+
+class ResultStore:
+    def __init__(self):
+        self._dirs = []          # Interned directory prefixes
+        self._dir_ids = {}       # prefix -> index in _dirs
+        self._dir_of = array('I')
+        self._names = []
+        self._name_keys = []     # Case-folded names, the same object when already lower case
+        self._sizes = array('q')
+        self._mtimes = array('d')
+        self._extras = {}        # row -> (location, cell), only for rows that have one
+        self._snippet_offsets = array('Q', [0])
+        self._snippets = None    # Spill file, created with the first snippet
+        self._unflushed = False
+        self._order = None       # View position -> row, None for arrival order
+        self.sorted_by = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def __bool__(self):
+        return bool(self._names)
+
+    def __iter__(self):
+        """Yields result dicts in view order, e.g. for export."""
+        for position in range(len(self)):
+            yield self.result(position)
+
+    def append(self, result):
+        """Adds a result dict. It appears at the end of the view until the next sort()."""
+        row = len(self._names)
+        prefix, name = _split(result['path'])
+        dir_id = self._dir_ids.get(prefix)
+        if dir_id is None:
+            dir_id = self._dir_ids[prefix] = len(self._dirs)
+            self._dirs.append(prefix)
+        self._dir_of.append(dir_id)
+        self._names.append(name)
+        key = name.lower()
+        self._name_keys.append(name if key == name else key)
+        self._sizes.append(result['size'])
+        self._mtimes.append(result['mtime'])
+        if result.get('location') is not None or result.get('cell') is not None:
+            self._extras[row] = (result.get('location'), result.get('cell'))
+
+        snippet = result.get('snippet') or ""
+        end = self._snippet_offsets[-1]
+        if snippet:
+            if self._snippets is None:
+                self._snippets = tempfile.TemporaryFile()
+            data = snippet.encode('utf-8', 'surrogatepass')
+            self._snippets.seek(end)
+            self._snippets.write(data)
+            self._unflushed = True
+            end += len(data)
+        self._snippet_offsets.append(end)
+        return row
+
+    def row(self, position):
+        """The row number (arrival index) shown at a view position."""
+        order = self._order
+        return order[position] if order is not None and position < len(order) else position
+
+    def position(self, row):
+        """The view position of a row number; the inverse of row()."""
+        order = self._order
+        if order is None or row >= len(order):
+            return row
+        return order.index(row)
+
+    def path(self, position):
+        row = self.row(position)
+        return self._dirs[self._dir_of[row]] + self._names[row]
+
+    def snippet(self, position):
+        row = self.row(position)
+        start, end = self._snippet_offsets[row], self._snippet_offsets[row + 1]
+        if start == end:
+            return ""
+        if self._unflushed:
+            self._snippets.flush()
+            self._unflushed = False
+        self._snippets.seek(start)
+        return self._snippets.read(end - start).decode('utf-8', 'surrogatepass')
+
+    def result(self, position, with_snippet=True):
+        """The result dict at a view position; the snippet is only read if asked for."""
+        row = self.row(position)
+        name = self._names[row]
+        location, cell = self._extras.get(row, (None, None))
+        return {
+            'name': name,
+            'path': self._dirs[self._dir_of[row]] + name,
+            'size': self._sizes[row],
+            'mtime': self._mtimes[row],
+            'ext': os.path.splitext(name)[1][1:].lower(),
+            'snippet': self.snippet(position) if with_snippet else "",
+            'location': location,
+            'cell': cell,
+        }
+
+    def sort(self, by):
+        """
+        Orders the view by 'name', 'date' or 'size', or by arrival for None.
+
+        Re-sorting by the same order after appending only merges in the new
+        rows, since the already sorted prefix is a single run for the sort.
+        """
+        count = len(self)
+        if by not in SORT_ORDERS:
+            self._order = None
+            self.sorted_by = None
+            return
+        if by == self.sorted_by and self._order is not None:
+            rows = self._order.tolist()
+            rows.extend(range(len(rows), count))
+        else:
+            rows = list(range(count))
+        if by == 'name':
+            rows.sort(key=self._name_keys.__getitem__)
+        elif by == 'date':
+            rows.sort(key=self._mtimes.__getitem__, reverse=True)
+        else:
+            rows.sort(key=self._sizes.__getitem__, reverse=True)
+        self._order = array('I', rows)
+        self.sorted_by = by
+
+    def close(self):
+        """Releases the snippet spill file."""
+        if self._snippets is not None:
+            self._snippets.close()
+            self._snippets = None
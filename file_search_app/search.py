@@ -3,103 +3,830 @@ Core file search logic.
 """
 import os
 import re
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from . import cache
 from . import file_reader
+from . import config
+from . import walker
+from . import textscan
+from . import index as content_index
+from . import nameindex
+from . import querycache
+from . import isolation
+from .dedup import ContentDeduper
+from .query import Query
+from .rank import Ranker, Rarity
+from .stats import SearchStats
+
+# Number of files handed to a worker process per task in parallel mode
+DEFAULT_CHUNK_SIZE = 16
+# Seconds between cancellation checks while waiting for worker processes
+CANCEL_POLL_SECONDS = 0.1
 
 class FileSearcher:
-    def __init__(self, params):
+    def __init__(self, params, listings=None, query_cache=None):
+        """
+        params is the dict of search options. listings is an optional
+        walker.DirectoryListings shared between searches, so that directories
+        which haven't changed aren't read again. query_cache is an optional
+        querycache.QueryCache: files examined by an earlier search it remembers
+        aren't examined again unless they changed; its listings are used if
+        none are given.
+        """
         self.params = params
+        self.query_cache = query_cache
+        if listings is None and query_cache is not None:
+            listings = query_cache.listings
+        self.listings = listings
+        self.query_error = None
+        try:
+            self.query = Query.from_params(params)
+        except re.error as e:
+            self.query = None
+            self.query_error = e
+        # (path, reason) of files whose content was skipped for exceeding a budget
+        self.skipped = []
+        # Set by cancel(); checked between files and between pages/chunks
+        self.cancel_event = threading.Event()
+        self.stop_reason = None
+        # Set when the search failed, e.g. its index couldn't be used; stop_reason says why
+        self.error = None
+        self.results_found = 0
+        # Per-stage timings, only gathered when asked for
+        self.stats = SearchStats() if params.get('collect_stats') else None
+        # Relevance mode: hits carry keyword counts and are ranked before they are yielded
+        self.relevance = bool(params.get('relevance'))
+        # Relevance mode: examined files that didn't match, counted for keyword
+        # rarity; _miss_terms holds their keyword counts until they are counted
+        self.rarity = None
+        if self.relevance and params['search_content'] and self.query is not None:
+            self.rarity = Rarity(self.query.term_count)
+        self._miss_terms = {}
+        self._bytes_read = 0
+        self._dedup = ContentDeduper() if params.get('dedupe', config.DEDUPLICATE) else None
+        self._extractor = None
+        self._failures = None
+        self._pool_stop = None
+        timeout = params.get('file_timeout', config.EXTRACT_TIMEOUT)
+        if timeout:
+            self._extractor = isolation.IsolatedExtractor(timeout, self.cancelled)
+            self._failures = isolation.FailureLog(params.get('failure_log'))
 
-    def _matches_pattern(self, text, pattern):
-        use_regex = self.params['use_regex']
-        case_sensitive = self.params['case_sensitive']
+    def _make_snippet(self, content, pos):
+        """Returns ~150 characters of content around the match offset."""
+        start = max(0, pos - 75)
+        end = min(len(content), pos + 75)
+        return content[start:end].strip()
 
-        if use_regex:
-            flags = 0 if case_sensitive else re.IGNORECASE
-            try:
-                return re.search(pattern, text, flags) is not None
-            except re.error as e:
-                # In a real app, this should be logged or reported back to the UI
-                print(f"Regex Error: {e}")
-                return False
+    def cancel(self, reason="cancelled"):
+        """Asks a running search to stop as soon as possible. Safe to call from any thread."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self.cancel_event.set()
+        pool_stop = self._pool_stop
+        if pool_stop is not None:
+            # Workers of a parallel search stop even while its generator is suspended
+            pool_stop.set()
+
+    def cancelled(self):
+        """
+        True once the search should stop: it was cancelled, found max_results
+        results, or reached its deadline (a time.monotonic() timestamp).
+        """
+        if self.cancel_event.is_set():
+            return True
+        deadline = self.params.get('deadline')
+        if deadline is not None and time.monotonic() >= deadline:
+            self.cancel("time limit reached")
+            return True
+        return False
+
+    def _until_cancelled(self, units):
+        for unit in units:
+            if self.cancelled():
+                return
+            yield unit
+
+    def search(self, progress_callback, result_callback, completion_callback):
+        """
+        Walks through directories and searches for files. Returns early, still
+        calling completion_callback, once the search is cancelled; stop_reason
+        then says why.
+
+        completion_callback is called without arguments. The SearchStats of the
+        run (None unless params['collect_stats'] is set) are in self.stats and
+        are also returned.
+        """
+        if self.query is None:
+            # In a real app, this should be logged or reported back to the UI
+            print(f"Regex Error: {self.query_error}")
+            if completion_callback:
+                completion_callback()
+            return self.stats
+
+        results = self.iter_results(progress_callback)
+        try:
+            for result in results:
+                if result_callback:
+                    result_callback(result)
+        except KeyboardInterrupt:
+            self.cancel("interrupted")
+            raise
+        finally:
+            results.close()
+
+        if completion_callback:
+            completion_callback()
+        return self.stats
+
+    def iter_results(self, progress_callback=None):
+        """
+        Yields result dicts as they are found.
+
+        With params['relevance'], the whole tree is searched first and then only
+        the best params['max_results'] (config.RANK_TOP_K by default) hits are
+        yielded, most relevant first, each with a 'score'.
+
+        The search only advances while the consumer asks for more results, so a
+        slow consumer never makes results pile up; closing the generator cancels
+        the search. Raises re.error if the pattern is an invalid regex. If an
+        index can't be used, the search stops with error set.
+        """
+        if self.query is None:
+            raise self.query_error
+        if self.params['search_content'] and self.params.get('use_index'):
+            source = self._iter_indexed(progress_callback)
+        elif not self.params['search_content'] and self.params.get('use_name_index'):
+            source = self._iter_name_index(progress_callback)
         else:
-            keywords = pattern.split()
-            if not case_sensitive:
-                text = text.lower()
-                keywords = [k.lower() for k in keywords]
-            
-            if self.params['match_any']:
-                return any(k in text for k in keywords)
+            source = self._iter_files(progress_callback)
+        max_results = self.params.get('max_results')
+        if self.relevance:
+            source = self._ranked(source, max_results or config.RANK_TOP_K)
+            max_results = None
+        try:
+            for result in source:
+                self.results_found += 1
+                yield result
+                if max_results and self.results_found >= max_results:
+                    self.cancel("result limit reached")
+        except sqlite3.Error as e:
+            self.error = e
+            self.stop_reason = f"index unavailable: {e}"
+            self.cancel_event.set()
+        except GeneratorExit:
+            # Cancel before closing the source so it doesn't wait for running work
+            self.cancel("closed")
+            raise
+        finally:
+            source.close()
+            self._release_extractor()
+            if self.stats is not None:
+                self.stats.count('results', self.results_found)
+                self.stats.count('skipped', len(self.skipped))
+                self.stats.finish()
+
+    async def aiter_results(self, progress_callback=None):
+        """
+        Async counterpart of iter_results, for `async for`. The search runs in
+        the event loop's default executor one result at a time, so it is paused
+        while the consumer is busy. aclose() cancels it, and so does the end of
+        the task that started iterating, e.g. when that task is cancelled or
+        leaves the loop early, even before the generator itself is finalized.
+        progress_callback is called from the executor thread.
+        """
+        loop = asyncio.get_running_loop()
+        results = self.iter_results(progress_callback)
+        pending = None
+        finished = False
+
+        def consumer_done(task):
+            self.cancel("cancelled" if task.cancelled() else "closed")
+
+        # A cancelled consumer may be suspended elsewhere while this generator
+        # waits at its yield, so its task, not the generator, signals the end
+        consumer = asyncio.current_task()
+        consumer.add_done_callback(consumer_done)
+        try:
+            while True:
+                pending = loop.run_in_executor(None, next, results, None)
+                # Shielded so that cancelling the consumer can't abandon a running step
+                result = await asyncio.shield(pending)
+                pending = None
+                if result is None:
+                    finished = True
+                    return
+                yield result
+        except asyncio.CancelledError:
+            self.cancel("cancelled")
+            raise
+        finally:
+            consumer.remove_done_callback(consumer_done)
+            if not finished:
+                self.cancel("closed")
+            if pending is not None:
+                # The step notices the cancellation at its next check
+                await asyncio.wait([pending])
+            await loop.run_in_executor(None, results.close)
+
+    def _ranked(self, source, limit):
+        """Collects every hit in a Ranker, then yields the best ones."""
+        ranker = Ranker(self.query, limit, rarity=self.rarity)
+        try:
+            for result in source:
+                start = time.perf_counter() if self.stats is not None else None
+                ranker.add(result, result.pop('terms', None), result.pop('length', 0))
+                if self.stats is not None:
+                    self._lap('rank', start)
+        finally:
+            source.close()
+        if self.stats is not None:
+            self.stats.count('hits', ranker.hits)
+        yield from ranker.results()
+
+    def _iter_files(self, progress_callback):
+        files = self._walker()
+        run = self.query_cache.begin(self.params, self.rarity) if self.query_cache is not None else None
+        workers = self.params.get('workers') or 1
+        if workers > 1 and self.params['search_content']:
+            yield from self._iter_parallel(files, workers, progress_callback, run)
+        else:
+            scanned = 0
+            for entry in self._timed_walk(files):
+                if self.cancelled():
+                    break
+                scanned += 1
+                if progress_callback:
+                    progress_callback(scanned, files.estimated_total())
+
+                result = self._examine_entry(entry, run)
+                if result:
+                    yield result
             else:
-                return all(k in text for k in keywords)
+                if progress_callback:
+                    progress_callback(scanned, scanned)
+        if run is not None:
+            if self.stats is not None:
+                self.stats.count('recalled', run.recalled)
+            # Only a search that saw the whole tree can stand in for a later one
+            if not self.cancelled():
+                run.finish()
 
-    def search(self, progress_callback, result_callback, completion_callback):
-        """Walks through directories and searches for files."""
-        directory = self.params['directory']
-        pattern = self.params['pattern']
-        extensions = self.params['extensions']
+    def _examine_entry(self, entry, run):
+        """_examine_file() for a walked entry, reusing the outcome run remembers for it if still valid."""
+        if run is not None:
+            result = run.recall(entry)
+            if result is not querycache.MISSING:
+                return result
+        skipped = len(self.skipped)
+        result = self._examine_file(entry.path, entry)
+        terms = self._miss_terms.pop(entry.path, None)
+        if terms is not None:
+            self.rarity.add(terms)
+        # Skipped files are examined again next time, so the skip is reported again
+        if run is not None and len(self.skipped) == skipped:
+            run.record(entry, result, terms)
+        return result
+
+    def _timed_walk(self, files):
+        return files if self.stats is None else self.stats.timed('walk', files)
+
+    def _lap(self, stage, since):
+        """Adds the time since `since` to stage and returns the current time."""
+        now = time.perf_counter()
+        self.stats.add(stage, now - since)
+        return now
+
+    def _release_extractor(self):
+        """Stops the isolated extractor and persists newly recorded failures."""
+        if self._extractor is not None:
+            self._extractor.close()
+        if self._failures is not None:
+            self._failures.save()
+
+    def _budget_exceeded(self, filepath, stat):
+        """Returns why the content of filepath must not be read, or None."""
+        max_size = self.params.get('max_file_size', config.EXTRACT_MAX_BYTES)
+        if max_size and stat.st_size > max_size:
+            return f"larger than the {max_size} byte limit"
+        if self._failures is not None:
+            reason = self._failures.known_failure(filepath, stat, self._extractor.timeout)
+            if reason:
+                return f"failed before: {reason}"
+        return None
+
+    def _skip(self, filepath, stat, reason, failure=None):
+        """failure is the ExtractionFailed that caused the skip, remembered if the file was to blame."""
+        self.skipped.append((filepath, reason))
+        if failure is not None and failure.recordable and self._failures is not None:
+            self._failures.record(filepath, stat, reason, failure.budget)
+
+    def _reader(self):
+        """Unit reader used on cache misses: isolated when a timeout is configured."""
+        return self._extractor.iter_units if self._extractor is not None else None
+
+    def _read_units(self, filepath, stat):
+        """Extracted (location, text) units of filepath within the budgets, or None if it was skipped."""
+        reason = self._budget_exceeded(filepath, stat)
+        if reason is None:
+            try:
+                units = cache.iter_file_units(filepath, stat, self._reader())
+                try:
+                    return list(self._until_cancelled(units))
+                finally:
+                    units.close()
+            except isolation.ExtractionFailed as e:
+                self._skip(filepath, stat, str(e), failure=e)
+                return None
+            except isolation.ExtractionCancelled:
+                return None
+        self._skip(filepath, stat, reason)
+        return None
+
+    def _walker(self):
+        """Builds the streaming walker for the current params."""
+        exclude = list(self.params.get('exclude', config.DEFAULT_EXCLUDES) or [])
+        # Never search the content index itself
+        exclude.append(content_index.INDEX_FILENAME + '*')
+        return walker.Walker(self.params['directory'], self.params['extensions'], exclude,
+                             self.params.get('use_gitignore', False), self.listings)
+
+    def _examine_file(self, filepath, entry=None):
+        """
+        Matches a single file by name or content. Returns a result dict or None.
+
+        When the os.DirEntry from the walk is given, its cached stat is reused.
+        """
+        if self.stats is None:
+            return self._examine(filepath, entry)
+        self._bytes_read = 0
+        start = time.perf_counter()
+        result = self._examine(filepath, entry)
+        ext = os.path.splitext(filepath)[1][1:].lower()
+        self.stats.file_done(filepath, ext, self._bytes_read, time.perf_counter() - start)
+        return result
+
+    def _examine(self, filepath, entry):
+        stats = self.stats
+        lap = time.perf_counter() if stats is not None else None
         search_content = self.params['search_content']
-        case_sensitive = self.params['case_sensitive']
-        use_regex = self.params['use_regex']
+        name_match = self.query.matches(os.path.basename(filepath))
+        if stats is not None:
+            lap = self._lap('name_match', lap)
+
+        if not search_content and not name_match:
+            return None
+
+        try:
+            stat = entry.stat() if entry is not None else os.stat(filepath)
+        except OSError:
+            return None # Skip files that can't be accessed
+        if stats is not None:
+            lap = self._lap('stat', lap)
+
+        content_match = False
+        content_snippet = ""
+        location = None
+        cell = None
+        file_ext = os.path.splitext(filepath)[1][1:].lower()
+        plain_text = search_content and file_reader.is_text_format(file_ext)
+        scanned = None
+        # Relevance mode: keyword counts and length of the examined content,
+        # counted in the same pass that matches it
+        terms = [0] * self.query.term_count if self.relevance and search_content else None
+        length = 0
+        skip_reason = self._budget_exceeded(filepath, stat) if search_content else None
+        if skip_reason is not None:
+            self._skip(filepath, stat, skip_reason)
+            scanned = (False, "")
+            terms = None
+        elif plain_text or (search_content and file_ext in config.STREAMED_EXTENSIONS
+                            and stat.st_size >= config.STREAM_MIN_BYTES):
+            # Text is matched as raw bytes from a memory map, without decoding or copying
+            try:
+                scanned = textscan.scan_file(filepath, self.query, sniff=plain_text, cancelled=self.cancelled,
+                                             counts=terms)
+                length = stat.st_size
+            except OSError:
+                scanned = (False, "")
+                terms = None
+            if stats is not None:
+                lap = self._lap('text_scan', lap)
+                if scanned is not None:
+                    self._bytes_read = stat.st_size
+
+        if scanned is not None:
+            content_match, content_snippet = scanned
+        elif search_content:
+            outcome = None
+            if self._dedup is not None:
+                # Copies of a document already examined reuse its outcome
+                outcome = self._dedup.lookup(filepath, stat, file_reader.reader_for(filepath))
+                if stats is not None:
+                    lap = self._lap('dedup', lap)
+            if outcome is not None:
+                if outcome[4] is not None:
+                    self._skip(filepath, stat, outcome[4])
+                if stats is not None:
+                    stats.count('duplicates')
+            else:
+                outcome = self._match_document(filepath, stat, lap)
+                if outcome is not None and self._dedup is not None:
+                    self._dedup.record(filepath, stat, outcome, file_reader.reader_for(filepath))
+            if outcome is not None:
+                content_match, content_snippet, location, cell, _, terms, length = outcome
+            else:
+                terms = None
+
+        if (search_content and content_match) or (not search_content and name_match):
+            result = {
+                'name': os.path.basename(filepath),
+                'path': filepath,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'ext': file_ext,
+                'snippet': content_snippet,
+                'location': location,
+                'cell': cell
+            }
+            if self.relevance and search_content:
+                # Counted by the worker that matched the file; ranked by the caller
+                result['terms'], result['length'] = terms, length
+            return result
+        if terms is not None and not self.cancelled():
+            # A file that was read in full without matching; the caller counts it
+            self._miss_terms[filepath] = terms
+        return None
 
-        all_files = [os.path.join(r, f) for r, d, fs in os.walk(directory) for f in fs]
-        total_files = len(all_files)
+    def _match_document(self, filepath, stat, lap):
+        """
+        Extracts and matches a document. Returns (matched, snippet, location,
+        cell, skip_reason, terms, length), or None if the search was cancelled
+        meanwhile. In relevance mode terms are the keyword counts of the whole
+        document and length its length, counted in the same pass; otherwise
+        terms is None and reading stops at the hit.
+        """
+        stats = self.stats
+        # Pages/slides/sheets are matched as they are parsed, so reading stops at the hit
+        units = cache.iter_file_units(filepath, stat, self._reader())
+        timed_units = units
+        if stats is not None:
+            # Time spent producing units is extraction; the rest is matching
+            extract_before = stats.stages['extract'][0]
+            cache_before = self._cache_counts()
+            timed_units = stats.timed('extract', units)
+        terms = [0] * self.query.term_count if self.relevance else None
+        length = 0
+
+        def counted(units):
+            nonlocal length
+            for unit in units:
+                self.query.count_terms(unit[1], terms)
+                length += len(unit[1])
+                yield unit
+
+        source = self._until_cancelled(timed_units)
+        if terms is not None:
+            source = counted(source)
+        skip_reason = None
+        hit = None
+        try:
+            hit = self.query.find_in_units(source)
+            if terms is not None:
+                for _ in source:
+                    pass  # The rest of the document is only counted
+        except isolation.ExtractionFailed as e:
+            # A hit stands even if counting the rest of its document fails
+            if hit is None:
+                skip_reason = str(e)
+                self._skip(filepath, stat, skip_reason, failure=e)
+        except isolation.ExtractionCancelled:
+            return None
+        finally:
+            units.close()
+        if stats is not None:
+            extract_seconds = stats.stages['extract'][0] - extract_before
+            stats.add('match', time.perf_counter() - lap - extract_seconds)
+            hits, misses = (now - before for now, before in zip(self._cache_counts(), cache_before))
+            stats.count('cache_hits', hits)
+            stats.count('cache_misses', misses)
+            if misses:
+                self._bytes_read = stat.st_size
+        if hit is None:
+            # A search cancelled mid-document says nothing about its content
+            if self.cancelled():
+                return None
+            return False, "", None, None, skip_reason, None if skip_reason else terms, length
+        snippet, location, cell = self._hit_report(hit)
+        return True, snippet, location, cell, None, terms, length
+
+    def _hit_report(self, hit):
+        """(snippet, location, cell) of a find_in_units() hit."""
+        location, content, pos = hit
+        resolved = file_reader.resolve_cell(location, content, pos)
+        if resolved is not None:
+            # Spreadsheet hits are reported by coordinate and cell value
+            location, snippet, cell = resolved
+            return snippet, location, cell
+        return self._make_snippet(content, pos), location, None
+
+    @staticmethod
+    def _cache_counts():
+        extraction_cache = cache.get_default_cache()
+        return extraction_cache.hits, extraction_cache.misses
+
+    def _iter_parallel(self, files, workers, progress_callback, run=None):
+        """
+        Fans extraction and matching out to a process pool.
+
+        Files are submitted in chunks and at most a few chunks per worker are kept
+        in flight, so memory stays bounded however large the tree is, and however
+        slowly results are consumed. On cancellation queued chunks are dropped and
+        a cancel event shared with the workers is set, which they check between
+        files and units (and their isolated extractors while waiting), so
+        running chunks stop within a unit. With a querycache.CachedRun, files
+        whose outcome it remembers aren't submitted at all.
+        """
+        chunk_size = self.params.get('chunk_size') or DEFAULT_CHUNK_SIZE
+        max_in_flight = workers * 2
         scanned = 0
+        chunks = {}  # future -> walked entries, to record their outcomes in run
+
+        def drain(pending):
+            """Yields the results of finished chunks and returns the still pending ones."""
+            nonlocal scanned
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_len, results, skipped, failures, miss_terms, stats = future.result()
+                scanned += chunk_len
+                for terms in miss_terms.values():
+                    self.rarity.add(terms)
+                entries = chunks.pop(future, None)
+                if entries is not None:
+                    hits = {result['path']: result for result in results}
+                    skipped_paths = {path for path, _ in skipped}
+                    for entry in entries:
+                        if entry.path not in skipped_paths:
+                            run.record(entry, hits.get(entry.path), miss_terms.get(entry.path))
+                if stats is not None and self.stats is not None:
+                    self.stats.merge(stats)
+                self.skipped.extend(skipped)
+                if failures and self._failures is not None:
+                    self._failures.merge(failures)
+                for result in results:
+                    if self.cancelled():
+                        break
+                    yield result
+                if progress_callback:
+                    progress_callback(scanned, files.estimated_total())
+            return pending
 
-        for filepath in all_files:
-            scanned += 1
-            if progress_callback:
-                progress_callback(scanned, total_files)
-
-            file_ext = os.path.splitext(filepath)[1][1:].lower()
-            if extensions and file_ext not in extensions:
-                continue
-
-            filename_to_match = os.path.basename(filepath) if case_sensitive else os.path.basename(filepath).lower()
-            name_match = self._matches_pattern(filename_to_match, pattern)
-
-            content_match = False
-            content_snippet = ""
-            if search_content:
-                content = file_reader.read_file_content(filepath)
-                content_to_match = content if case_sensitive else content.lower()
-                pattern_for_search = pattern if use_regex or case_sensitive else pattern.lower()
-                content_match = self._matches_pattern(content_to_match, pattern_for_search)
-                if content_match:
+        def submit(chunk):
+            future = executor.submit(_examine_chunk, self.params, [entry.path for entry in chunk])
+            if run is not None:
+                chunks[future] = chunk
+            pending.add(future)
+
+        context = multiprocessing.get_context()
+        stop = context.Event()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=_init_worker, initargs=(stop,))
+        self._pool_stop = stop
+        pending = set()
+        try:
+            chunk = []
+            for entry in self._timed_walk(files):
+                if self.cancelled():
+                    return
+                if run is not None:
+                    result = run.recall(entry)
+                    if result is not querycache.MISSING:
+                        scanned += 1
+                        if result:
+                            yield result
+                        continue
                     try:
-                        pos = -1
-                        if use_regex:
-                            match = re.search(pattern, content, re.IGNORECASE if not case_sensitive else 0)
-                            if match:
-                                pos = match.start()
-                        else:
-                            # Find position in the correct case for snippet extraction
-                            pos = content_to_match.find(pattern_for_search.split()[0])
-
-                        if pos != -1:
-                            start = max(0, pos - 75)
-                            end = min(len(content), pos + 75)
-                            content_snippet = content[start:end].strip()
-                        else:
-                            content_snippet = content[:150].strip()
-                    except Exception:
-                        content_snippet = content[:150].strip()
-
-
-            if (search_content and content_match) or (not search_content and name_match):
+                        # Cached by the entry, so the outcome is recorded with
+                        # the stat from before the worker read the file
+                        entry.stat()
+                    except OSError:
+                        pass
+                chunk.append(entry)
+                if len(chunk) >= chunk_size:
+                    while len(pending) >= max_in_flight and not self.cancelled():
+                        pending = yield from drain(pending)
+                    submit(chunk)
+                    chunk = []
+            if chunk:
+                submit(chunk)
+            while pending and not self.cancelled():
+                pending = yield from drain(pending)
+        finally:
+            self._pool_stop = None
+            for future in pending:
+                future.cancel()
+            if self.cancelled():
+                stop.set()
+            # Running chunks stop at their next cancellation check
+            executor.shutdown(wait=not self.cancelled())
+
+    def _iter_indexed(self, progress_callback):
+        """
+        Content search backed by the persistent index.
+
+        Files whose (size, mtime, inode) changed since the last run are
+        re-extracted, then the index picks the documents containing the text
+        the query requires, which are matched against their stored text.
+        """
+        directory = self.params['directory']
+        index_path = self.params.get('index_path') or content_index.default_index_path(directory)
+        files = self._walker()
+        seen = {}  # Absolute path -> path as walked
+        indexed = set()  # Keys of the seen files whose text is in the index
+
+        stats = self.stats
+        with content_index.ContentIndex(index_path) as idx:
+            for scanned, entry in enumerate(self._timed_walk(files), 1):
+                if self.cancelled():
+                    return  # Not pruned: files after this point weren't seen
+                if progress_callback:
+                    progress_callback(scanned, files.estimated_total())
+                filepath = entry.path
                 try:
-                    stat = os.stat(filepath)
-                    result = {
-                        'name': os.path.basename(filepath),
-                        'path': filepath,
-                        'size': stat.st_size,
-                        'mtime': stat.st_mtime,
-                        'ext': file_ext,
-                        'snippet': content_snippet
-                    }
-                    if result_callback:
-                        result_callback(result)
+                    stat = entry.stat()
                 except OSError:
-                    continue # Skip files that can't be accessed
-        
-        if completion_callback:
-            completion_callback()
+                    continue
+                key = os.path.abspath(filepath)
+                seen[key] = filepath
+                reason = self._budget_exceeded(filepath, stat)
+                if reason is not None:
+                    # Text indexed under a larger budget mustn't match either
+                    self._skip(filepath, stat, reason)
+                    idx.forget(key)
+                    continue
+                if idx.is_fresh(key, stat):
+                    indexed.add(key)
+                    if stats is not None:
+                        stats.count('index_fresh')
+                    continue
+                lap = time.perf_counter() if stats is not None else None
+                units = self._read_units(filepath, stat)
+                if self.cancelled():
+                    return  # Possibly read only in part
+                if units is not None:
+                    idx.store(key, stat, units)
+                    indexed.add(key)
+                else:
+                    idx.forget(key)
+                if stats is not None:
+                    now = self._lap('index_refresh', lap)
+                    ext = os.path.splitext(filepath)[1][1:].lower()
+                    stats.file_done(filepath, ext, stat.st_size, now - lap)
+            idx.prune(seen)
+            lap = time.perf_counter() if stats is not None else None
+
+            for key, size, mtime, units in idx.query(self.query, self.params['extensions']):
+                if self.cancelled():
+                    return
+                path = seen.get(key)
+                if path is None:
+                    continue
+                indexed.discard(key)
+                # Matched unit by unit, like the documents read without the index
+                hit = self.query.find_in_units(units)
+                terms = None
+                if self.relevance:
+                    terms = [0] * self.query.term_count
+                    for _, text in units:
+                        self.query.count_terms(text, terms)
+                if hit is None:
+                    if self.rarity is not None:
+                        self.rarity.add(terms)
+                    continue
+                snippet, location, cell = self._hit_report(hit)
+                result = {
+                    'name': os.path.basename(path),
+                    'path': path,
+                    'size': size,
+                    'mtime': mtime,
+                    'ext': os.path.splitext(path)[1][1:].lower(),
+                    'snippet': snippet,
+                    'location': location,
+                    'cell': cell
+                }
+                if self.relevance:
+                    result['terms'] = terms
+                    result['length'] = sum(len(text) for _, text in units)
+                yield result
+            if self.rarity is not None:
+                self._count_unmatched(idx, indexed)
+            if stats is not None:
+                self._lap('index_query', lap)
+
+    def _count_unmatched(self, idx, keys):
+        """
+        Counts the indexed files the index ruled out (keys) toward keyword
+        rarity, looking each keyword up in the index instead of reading them.
+        They contain no text a regex requires; keywords shorter than a trigram
+        aren't counted, and case is ignored.
+        """
+        if self.query.use_regex:
+            containing = [set()]
+        else:
+            containing = [idx.containing(k) if len(k) >= 3 else set() for k in self.query.term_keys()]
+        for key in keys:
+            self.rarity.add([1 if key in paths else 0 for paths in containing])
+
+    def _iter_name_index(self, progress_callback):
+        """
+        Name search answered by the filename index, which is refreshed first
+        (unless it is younger than params['name_index_max_age'] seconds).
+        Only candidates from the index are matched, checked against the
+        excludes, .gitignore and extensions, and stat'ed.
+        """
+        directory = self.params['directory']
+        root = os.path.abspath(directory)
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        index_path = self.params.get('name_index_path') or nameindex.default_index_path()
+        max_age = self.params.get('name_index_max_age', config.NAME_INDEX_MAX_AGE)
+        files = self._walker()
+
+        stats = self.stats
+        with nameindex.NameIndex(index_path) as idx:
+            lap = time.perf_counter() if stats is not None else None
+            # Only the directories the walk would enter are refreshed
+            scope = json.dumps([sorted(files.exclude), files.use_gitignore])
+            listed, unchanged = idx.refresh(root, self.cancelled, max_age, files.descends, scope)
+            if stats is not None:
+                lap = self._lap('names_refresh', lap)
+                stats.count('dirs_listed', listed)
+                stats.count('dirs_unchanged', unchanged)
+
+            scanned = 0
+            for dirpath, name in idx.candidates(root, self.query):
+                if self.cancelled():
+                    return
+                scanned += 1
+                if progress_callback:
+                    progress_callback(scanned, scanned)
+                if not self.query.matches(name):
+                    continue
+                # Reported under the directory as given, like the walk would
+                rel = name if dirpath == root else os.path.join(dirpath[len(prefix):], name)
+                filepath = os.path.join(directory, rel)
+                if not files.admits(filepath):
+                    continue
+                result = self._examine_file(filepath)
+                if result:
+                    yield result
+            if stats is not None:
+                stats.count('name_candidates', scanned)
+                self._lap('names_query', lap)
+
+# Searcher reused by a pool worker across chunks, so its isolated extractor
+# process is started once per worker rather than once per chunk
+_chunk_searcher = None
+# Set by the parent process when the search is cancelled
+_pool_cancel_event = None
+
+
+def _init_worker(cancel_event):
+    """Process-pool initializer: receives the search's shared cancel event."""
+    global _pool_cancel_event
+    _pool_cancel_event = cancel_event
+
+
+def _examine_chunk(params, filepaths):
+    """
+    Process-pool entry point: matches a chunk of files in a worker. Returns the
+    chunk length, the results, the skipped files, newly recorded failures, the
+    keyword counts of the files that didn't match (relevance mode) and the
+    chunk's SearchStats (None unless collect_stats is set).
+    """
+    global _chunk_searcher
+    if _chunk_searcher is None or _chunk_searcher.params != params:
+        _chunk_searcher = FileSearcher(params)
+        if _pool_cancel_event is not None:
+            # cancelled() checks it like the local event, so cancelling the
+            # search in the parent stops this worker between files and units
+            _chunk_searcher.cancel_event = _pool_cancel_event
+    searcher = _chunk_searcher
+    searcher.skipped = []
+    if searcher.stats is not None:
+        searcher.stats = SearchStats()
+    results = []
+    for filepath in filepaths:
+        if searcher.cancelled():
+            break
+        result = searcher._examine_file(filepath)
+        if result:
+            results.append(result)
+    failures = searcher._failures.take_new() if searcher._failures is not None else {}
+    miss_terms, searcher._miss_terms = searcher._miss_terms, {}
+    return len(filepaths), results, searcher.skipped, failures, miss_terms, searcher.stats
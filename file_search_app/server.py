@@ -0,0 +1,380 @@
+"""
+Warm search server.
+
+`python -m file_search_app serve` keeps one process running so that searches
+start warm: modules are imported once, extracted text stays in the in-memory
+cache, directory listings are remembered between searches (see
+walker.DirectoryListings) and so are the outcomes of recent searches (see
+querycache.QueryCache). Any number of clients, such as the GUI, the CLI
+with --server or scripts, can share it.
+
+Clients connect to a localhost TCP socket and exchange JSON lines:
+
+    request:   {"token": ..., "command": "search", "params": {...}}
+    responses: {"progress": [scanned, total]}
+               {"result": {...}}                    one per result, as found
+               {"done": {"stop_reason": ..., "skipped": [...], "results": n, "stats": {...}}}
+               {"error": "..."}
+
+params are FileSearcher params, with 'timeout' in seconds instead of the
+process-local 'deadline'. Sending {"cancel": reason}, or closing the connection,
+cancels the search. {"command": "status"} reports what the server holds.
+
+The address and a random token are written to STATE_DIR/server.json, readable
+only by the user who started the server, so other local users can't query it.
+"""
+import os
+import re
+import json
+import time
+import signal
+import secrets
+import socket
+import threading
+import socketserver
+
+from . import cache
+from . import config
+from .query import Query
+from .querycache import QueryCache
+from .search import FileSearcher
+from .stats import SearchStats
+from .walker import DirectoryListings
+
+# Minimum seconds between progress messages
+PROGRESS_INTERVAL = 0.1
+# Seconds a client waits to connect before giving up
+CONNECT_TIMEOUT = 5
+REQUIRED_PARAMS = ('directory', 'pattern', 'extensions', 'match_any', 'case_sensitive',
+                   'search_content', 'use_regex')
+
+
+class ServerError(Exception):
+    """The search server can't be reached or rejected a request."""
+
+
+def default_info_path():
+    return os.path.join(config.STATE_DIR, 'server.json')
+
+
+def read_info(path=None):
+    """Returns the address and token published by a running server."""
+    try:
+        with open(path or default_info_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise ServerError("no search server is running") from None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            request = None
+        try:
+            if not isinstance(request, dict):
+                self._send({'error': "malformed request"})
+            elif not secrets.compare_digest(str(request.get('token', '')), self.server.token):
+                self._send({'error': "invalid token"})
+            elif request.get('command', 'search') == 'search':
+                self._search(request.get('params'))
+            elif request['command'] == 'status':
+                self._send({'status': self.server.status()})
+            else:
+                self._send({'error': f"unknown command: {request['command']}"})
+        except OSError:
+            pass  # The client went away
+        except Exception as e:
+            try:
+                self._send({'error': f"server error: {e.__class__.__name__}: {e}"})
+            except OSError:
+                pass
+            raise  # Logged with its traceback by SearchServer.handle_error()
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def _watch(self, searcher):
+        """Cancels the search when the client asks to, or hangs up."""
+        reason = "client disconnected"
+        try:
+            line = self.rfile.readline()
+            if line:
+                reason = json.loads(line).get('cancel') or "cancelled"
+        except (OSError, ValueError, AttributeError):
+            pass
+        searcher.cancel(reason)
+
+    def _search(self, params):
+        if not isinstance(params, dict):
+            self._send({'error': "missing params"})
+            return
+        missing = [key for key in REQUIRED_PARAMS if key not in params]
+        if missing:
+            self._send({'error': f"missing params: {', '.join(missing)}"})
+            return
+        if not os.path.isdir(params['directory']):
+            self._send({'error': f"directory not found: {params['directory']}"})
+            return
+        params = dict(params)
+        timeout = params.pop('timeout', None)
+        params['deadline'] = time.monotonic() + timeout if timeout else None
+        searcher = FileSearcher(params, self.server.listings, self.server.query_cache)
+        if searcher.query is None:
+            self._send({'error': f"invalid regex: {searcher.query_error}"})
+            return
+
+        self.server.searches += 1
+        watcher = threading.Thread(target=self._watch, args=(searcher,), daemon=True)
+        watcher.start()
+        try:
+            self._stream(searcher)
+        finally:
+            # Wakes the watcher, so it's done with rfile before the handler closes it
+            try:
+                self.connection.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+            watcher.join()
+
+    def _stream(self, searcher):
+        last_progress = 0.0
+
+        def progress(scanned, total):
+            nonlocal last_progress
+            now = time.monotonic()
+            # Throttled, but the final count always goes out
+            if now - last_progress >= PROGRESS_INTERVAL or scanned >= total:
+                last_progress = now
+                self._send({'progress': [scanned, total]})
+
+        results = searcher.iter_results(progress)
+        try:
+            for result in results:
+                self._send({'result': result})
+        finally:
+            results.close()
+        if searcher.error is not None:
+            self._send({'error': searcher.stop_reason})
+            return
+        self._send({'done': {
+            'stop_reason': searcher.stop_reason,
+            'skipped': searcher.skipped,
+            'results': searcher.results_found,
+            'stats': searcher.stats.to_dict() if searcher.stats is not None else None,
+        }})
+
+
+class SearchServer(socketserver.ThreadingTCPServer):
+    """Serves each connection on its own thread, sharing the warm caches."""
+    daemon_threads = True
+
+    def __init__(self, host=config.SERVER_HOST, port=config.SERVER_PORT, token=None):
+        super().__init__((host, port), _Handler)
+        self.token = token or secrets.token_hex(16)
+        self.listings = DirectoryListings()
+        self.query_cache = QueryCache(listings=self.listings)
+        self.started = time.time()
+        self.searches = 0
+
+    def status(self):
+        extraction_cache = cache.get_default_cache()
+        return {
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started, 1),
+            'searches': self.searches,
+            'directories': len(self.listings),
+            'listing_hits': self.listings.hits,
+            'listing_misses': self.listings.misses,
+            'cached_searches': len(self.query_cache),
+            'cached_files': len(extraction_cache),
+            'cached_bytes': extraction_cache.size_bytes,
+        }
+
+    def write_info(self, path=None):
+        """Publishes the address and token for clients, readable by this user only."""
+        path = path or default_info_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        host, port = self.server_address[:2]
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'host': host, 'port': port, 'token': self.token, 'pid': os.getpid()}, f)
+        os.replace(tmp, path)
+        return path
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(host=config.SERVER_HOST, port=config.SERVER_PORT, info_path=None, ready_callback=None):
+    """
+    Runs a search server until interrupted by Ctrl+C or SIGTERM (e.g. from
+    `kill` or a service manager). ready_callback receives the server once it listens.
+    """
+    with SearchServer(host, port) as server:
+        previous = None
+        if threading.current_thread() is threading.main_thread():
+            # SIGTERM stops the server like Ctrl+C, so server.json is removed too
+            previous = signal.signal(signal.SIGTERM, _interrupt)
+        path = None
+        try:
+            path = server.write_info(info_path)
+            if ready_callback:
+                ready_callback(server)
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if previous is not None:
+                signal.signal(signal.SIGTERM, previous)
+            # Only remove the info file if a newer server hasn't replaced it
+            try:
+                with open(path or info_path or default_info_path(), encoding='utf-8') as f:
+                    if json.load(f).get('pid') == os.getpid():
+                        os.remove(path)
+            except (OSError, ValueError):
+                pass
+
+
+def _connect(info_path):
+    info = read_info(info_path)
+    try:
+        sock = socket.create_connection((info['host'], info['port']), timeout=CONNECT_TIMEOUT)
+    except OSError as e:
+        raise ServerError(f"search server unavailable: {e}") from None
+    sock.settimeout(None)
+    return sock, info['token']
+
+
+def server_status(info_path=None):
+    """Returns the status of the running server. Raises ServerError if there is none."""
+    sock, token = _connect(info_path)
+    with sock, sock.makefile('rb') as lines:
+        sock.sendall(json.dumps({'token': token, 'command': 'status'}).encode('utf-8') + b"\n")
+        try:
+            message = json.loads(lines.readline())
+        except ValueError:
+            raise ServerError("connection to the search server was lost") from None
+    if 'error' in message:
+        raise ServerError(message['error'])
+    return message['status']
+
+
+class RemoteSearcher:
+    """
+    Runs a search on the search server behind FileSearcher's interface
+    (search, iter_results, cancel, stop_reason, skipped, stats, results_found),
+    so the GUI and CLI can use either one.
+    """
+
+    def __init__(self, params, info_path=None):
+        self.params = params
+        self.query_error = None
+        try:
+            # Compiled here too, so an invalid regex is reported before connecting
+            self.query = Query.from_params(params)
+        except re.error as e:
+            self.query = None
+            self.query_error = e
+        self.skipped = []
+        self.stop_reason = None
+        self.results_found = 0
+        self.stats = None
+        self.error = None
+        self._info_path = info_path
+        self._sock = None
+        self._cancel_reason = None
+        self._lock = threading.Lock()
+
+    def cancel(self, reason="cancelled"):
+        """Asks the server to stop the search. Safe to call from any thread."""
+        with self._lock:
+            if self._cancel_reason is None:
+                self._cancel_reason = reason
+            sock = self._sock
+        if sock is not None:
+            try:
+                sock.sendall(json.dumps({'cancel': reason}).encode('utf-8') + b"\n")
+            except OSError:
+                pass
+
+    def _request(self, token):
+        params = dict(self.params)
+        # The server has its own working directory and monotonic clock
+        params['directory'] = os.path.abspath(params['directory'])
+        deadline = params.pop('deadline', None)
+        if deadline is not None:
+            params['timeout'] = max(deadline - time.monotonic(), 0.001)
+        return json.dumps({'token': token, 'command': 'search', 'params': params}).encode('utf-8') + b"\n"
+
+    def search(self, progress_callback, result_callback, completion_callback):
+        """
+        Same contract as FileSearcher.search(). If the server can't be reached
+        or rejects the search, error holds the ServerError and stop_reason says why.
+        """
+        if self.query is not None:
+            try:
+                results = self.iter_results(progress_callback)
+                try:
+                    for result in results:
+                        if result_callback:
+                            result_callback(result)
+                except KeyboardInterrupt:
+                    self.cancel("interrupted")
+                    raise
+                finally:
+                    results.close()
+            except ServerError as e:
+                self.error = e
+                self.stop_reason = str(e)
+        if completion_callback:
+            completion_callback()
+        return self.stats
+
+    def iter_results(self, progress_callback=None):
+        """
+        Yields result dicts as the server finds them. Raises ServerError if the
+        server can't be reached or fails; closing the generator cancels the search.
+        """
+        if self.query is None:
+            raise self.query_error
+        sock, token = _connect(self._info_path)
+        with self._lock:
+            self._sock = sock
+            cancelled = self._cancel_reason
+        try:
+            sock.sendall(self._request(token))
+            if cancelled is not None:
+                self.cancel(cancelled)
+            with sock.makefile('rb') as lines:
+                for line in lines:
+                    message = json.loads(line)
+                    if 'result' in message:
+                        self.results_found += 1
+                        yield message['result']
+                    elif 'progress' in message:
+                        if progress_callback:
+                            progress_callback(*message['progress'])
+                    elif 'done' in message:
+                        done = message['done']
+                        self.stop_reason = done['stop_reason']
+                        self.skipped = [tuple(s) for s in done['skipped']]
+                        if done['stats'] is not None:
+                            self.stats = SearchStats.from_dict(done['stats'])
+                        return
+                    elif 'error' in message:
+                        raise ServerError(message['error'])
+            raise ServerError("connection to the search server was lost")
+        except GeneratorExit:
+            self.cancel("closed")
+            self.stop_reason = self._cancel_reason
+            raise
+        except (OSError, ValueError) as e:
+            raise ServerError(f"connection to the search server failed: {e}") from None
+        finally:
+            with self._lock:
+                self._sock = None
+            sock.close()
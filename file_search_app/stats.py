@@ -0,0 +1,164 @@
+"""
+Search instrumentation.
+
+SearchStats collects per-stage timers, per-extension counters, bytes read, the
+slowest files and cache hit rates for one search. FileSearcher only creates it
+when params['collect_stats'] is set, so searches without statistics pay for
+nothing but an `is None` check per file.
+"""
+import time
+import heapq
+from collections import defaultdict
+
+from . import config
+
+# Stages timed by FileSearcher, in pipeline order
+STAGES = (
+    'walk',          # Directory traversal (time spent waiting for the next entry)
+    'stat',          # os.stat of each candidate file
+    'name_match',    # Matching the file name
+    'dedup',         # Hashing documents to recognise copies of ones already examined
+    'text_scan',     # Memory-mapped read and match of plain-text files
+    'extract',       # Document parsing, or fetching its text from the cache
+    'match',         # Matching extracted text
+    'rank',          # Scoring hits and keeping the best for relevance ranking
+    'index_refresh', # Re-extracting changed files into the content index
+    'index_query',   # Querying the content index
+    'names_refresh', # Re-listing changed directories into the filename index
+    'names_query',   # Matching the candidates from the filename index
+)
+
+
+class SearchStats:
+    def __init__(self, top_n=config.STATS_SLOWEST_FILES):
+        self.top_n = top_n
+        self.elapsed = 0.0
+        self.stages = defaultdict(lambda: [0.0, 0])   # stage -> [seconds, calls]
+        self.extensions = defaultdict(lambda: [0, 0, 0.0])  # ext -> [files, bytes, seconds]
+        self.counters = defaultdict(int)
+        self.slowest = []  # Min-heap of (seconds, path), at most top_n long
+        self._started = time.perf_counter()
+
+    def __getstate__(self):
+        # defaultdicts with lambdas can't be pickled for the process pool
+        state = self.__dict__.copy()
+        state['stages'] = dict(self.stages)
+        state['extensions'] = dict(self.extensions)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stages = defaultdict(lambda: [0.0, 0], self.stages)
+        self.extensions = defaultdict(lambda: [0, 0, 0.0], self.extensions)
+
+    def add(self, stage, seconds, calls=1):
+        entry = self.stages[stage]
+        entry[0] += seconds
+        entry[1] += calls
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def timed(self, stage, iterable):
+        """Yields from iterable, adding the time spent producing each item to stage."""
+        iterator = iter(iterable)
+        entry = self.stages[stage]
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                entry[0] += time.perf_counter() - start
+                return
+            entry[0] += time.perf_counter() - start
+            entry[1] += 1
+            yield item
+
+    def file_done(self, path, ext, bytes_read, seconds):
+        """Records a file examined in `seconds`, reading bytes_read bytes from disk."""
+        entry = self.extensions[ext]
+        entry[0] += 1
+        entry[1] += bytes_read
+        entry[2] += seconds
+        self.counters['files_examined'] += 1
+        self.counters['bytes_read'] += bytes_read
+        if len(self.slowest) < self.top_n:
+            heapq.heappush(self.slowest, (seconds, path))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, path))
+
+    def merge(self, other):
+        """Adds the statistics gathered by another searcher, e.g. a pool worker."""
+        for stage, (seconds, calls) in other.stages.items():
+            self.add(stage, seconds, calls)
+        for ext, (files, nbytes, seconds) in other.extensions.items():
+            entry = self.extensions[ext]
+            entry[0] += files
+            entry[1] += nbytes
+            entry[2] += seconds
+        for name, n in other.counters.items():
+            self.counters[name] += n
+        for item in other.slowest:
+            if len(self.slowest) < self.top_n:
+                heapq.heappush(self.slowest, item)
+            elif item[0] > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    @classmethod
+    def from_dict(cls, d):
+        """Rebuilds statistics from to_dict(), e.g. as received from the search server."""
+        stats = cls()
+        stats.elapsed = d['elapsed']
+        stats.counters.update(d['counters'])
+        for stage, v in d['stages'].items():
+            stats.stages[stage] = [v['seconds'], v['calls']]
+        for ext, v in d['extensions'].items():
+            stats.extensions['' if ext == '(none)' else ext] = [v['files'], v['bytes'], v['seconds']]
+        stats.slowest = [(f['seconds'], f['path']) for f in d['slowest_files']]
+        heapq.heapify(stats.slowest)
+        return stats
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self._started
+
+    def cache_hit_rate(self):
+        hits = self.counters.get('cache_hits', 0)
+        lookups = hits + self.counters.get('cache_misses', 0)
+        return hits / lookups if lookups else None
+
+    def to_dict(self):
+        """JSON-serialisable form, as printed by the CLI."""
+        ordered = [s for s in STAGES if s in self.stages] + [s for s in self.stages if s not in STAGES]
+        hit_rate = self.cache_hit_rate()
+        return {
+            'elapsed': round(self.elapsed, 4),
+            'counters': dict(self.counters),
+            'cache_hit_rate': None if hit_rate is None else round(hit_rate, 3),
+            'stages': {s: {'seconds': round(self.stages[s][0], 4), 'calls': self.stages[s][1]} for s in ordered},
+            'extensions': {
+                ext or '(none)': {'files': files, 'bytes': nbytes, 'seconds': round(seconds, 4)}
+                for ext, (files, nbytes, seconds) in sorted(self.extensions.items(), key=lambda kv: -kv[1][2])
+            },
+            'slowest_files': [{'path': path, 'seconds': round(seconds, 4)}
+                              for seconds, path in sorted(self.slowest, reverse=True)],
+        }
+
+    def to_text(self):
+        """Plain-text report shown in the GUI's statistics window."""
+        d = self.to_dict()
+        lines = [f"Elapsed: {d['elapsed']:.3f} s"]
+        lines += [f"{name.replace('_', ' ').capitalize()}: {n}" for name, n in sorted(d['counters'].items())]
+        if d['cache_hit_rate'] is not None:
+            lines.append(f"Cache hit rate: {d['cache_hit_rate']:.0%}")
+
+        lines += ["", f"{'Stage':<16}{'Seconds':>10}{'Calls':>10}"]
+        lines += [f"{s:<16}{v['seconds']:>10.3f}{v['calls']:>10}" for s, v in d['stages'].items()]
+
+        lines += ["", f"{'Extension':<16}{'Files':>8}{'MB read':>10}{'Seconds':>10}"]
+        lines += [f"{ext:<16}{v['files']:>8}{v['bytes'] / 1048576:>10.2f}{v['seconds']:>10.3f}"
+                  for ext, v in d['extensions'].items()]
+
+        if d['slowest_files']:
+            lines += ["", "Slowest files:"]
+            lines += [f"{f['seconds']:>8.3f} s  {f['path']}" for f in d['slowest_files']]
+        return "\n".join(lines)
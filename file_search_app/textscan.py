@@ -0,0 +1,149 @@
+"""
+Constant-memory matching for plain-text files of any extension and large CSVs.
+
+Instead of reading the whole file into a string, the file is memory-mapped and
+searched with bytes-level regular expressions, stopping as soon as the match
+criteria are satisfied. Queries that bytes patterns cannot express (e.g.
+case-insensitive non-ASCII keywords) and files that aren't UTF-8 (cp1252,
+UTF-16) are matched over fixed-size chunks decoded incrementally with the
+sniffed encoding, each starting with the end of the previous one so that
+matches spanning a chunk boundary are still found. Cancellable scans of files
+above CHUNK_SIZE use overlapping chunks on the raw bytes.
+
+Regexes with anchors, \\b or lookarounds (Query.context_sensitive) would match
+at the artificial edges of a chunk, so they are always matched over the whole
+file in one pass, as re.search() on the full text would; such a scan can't be
+cancelled midway.
+
+CSV files are matched on their raw bytes, so a keyword containing the delimiter
+may behave differently than on the space-joined text of file_reader.
+"""
+import mmap
+import codecs
+
+from . import file_reader
+
+CHUNK_SIZE = 4 * 1024 * 1024
+# Overlap between chunks (bytes, or characters once decoded); also bounds the
+# length of regex matches that can be found across a chunk boundary.
+CHUNK_OVERLAP = 64 * 1024
+SNIPPET_RADIUS = 75
+
+
+def _snippet(buf, pos):
+    start = max(0, pos - SNIPPET_RADIUS)
+    return bytes(buf[start:pos + SNIPPET_RADIUS]).decode('utf-8', errors='ignore').strip()
+
+
+def _chunks(mm, cancelled, count=None):
+    """Overlapping chunks of mm; count, if given, is called with each chunk minus its overlap."""
+    offset = 0
+    size = len(mm)
+    while offset < size and not (cancelled and cancelled()):
+        if count is not None:
+            count(mm[offset:offset + CHUNK_SIZE])
+        yield None, mm[offset:offset + CHUNK_SIZE + CHUNK_OVERLAP]
+        offset += CHUNK_SIZE
+
+
+def _decoded_chunks(mm, encoding, cancelled, count=None):
+    """
+    Decodes mm CHUNK_SIZE bytes at a time, so characters split between chunks
+    are decoded whole; each chunk starts with the last CHUNK_OVERLAP characters
+    of the previous one. count is as for _chunks().
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+    tail = ""
+    size = len(mm)
+    for offset in range(0, size, CHUNK_SIZE):
+        if cancelled and cancelled():
+            return
+        fresh = decoder.decode(mm[offset:offset + CHUNK_SIZE], final=offset + CHUNK_SIZE >= size)
+        if count is not None:
+            count(fresh)
+        text = tail + fresh
+        yield None, text
+        tail = text[-CHUNK_OVERLAP:]
+
+
+def _find_counting(query, chunks, counting):
+    """find_in_units() over chunks, reading the rest too when the chunks are counted."""
+    hit = query.find_in_units(chunks)
+    if counting:
+        for _ in chunks:
+            pass
+    return hit
+
+
+def _scan_mapped(mm, query, cancelled=None, count=None):
+    if cancelled is None or len(mm) <= CHUNK_SIZE or query.context_sensitive:
+        if count is not None:
+            count(mm)
+        pos = query.find(mm)
+        return (True, _snippet(mm, pos)) if pos != -1 else (False, "")
+    # Large files are matched chunk by chunk so a cancelled search stops promptly
+    hit = _find_counting(query, _chunks(mm, cancelled, count), count is not None)
+    if hit is None:
+        return False, ""
+    _, chunk, pos = hit
+    return True, _snippet(chunk, pos)
+
+
+def _scan_chunks(mm, query, encoding='utf-8', cancelled=None, count=None):
+    """Matches decoded text, for queries or encodings that bytes can't handle."""
+    if query.context_sensitive:
+        # One pass over the whole text, so the regex sees the real start and end
+        text = codecs.decode(mm, encoding, errors='ignore')
+        if count is not None:
+            count(text)
+        pos = query.find(text)
+        if pos == -1:
+            return False, ""
+        start = max(0, pos - SNIPPET_RADIUS)
+        return True, text[start:pos + SNIPPET_RADIUS].strip()
+    hit = _find_counting(query, _decoded_chunks(mm, encoding, cancelled, count), count is not None)
+    if hit is None:
+        return False, ""
+    _, text, pos = hit
+    start = max(0, pos - SNIPPET_RADIUS)
+    return True, text[start:pos + SNIPPET_RADIUS].strip()
+
+
+def scan_file(filepath, query, sniff=False, cancelled=None, counts=None):
+    """
+    Matches a text-like file against a compiled Query without loading it.
+
+    Returns a (matched, snippet) tuple. Raises OSError if the file can't be read.
+    With sniff set, binary files never match and files in other encodings than
+    UTF-8 are decoded chunk by chunk. cancelled, if given, is called between
+    chunks and ends the scan without a match once it returns True.
+
+    counts, a list of query.term_count ints, makes the same pass also add the
+    keyword occurrences of the whole file to it (see Query.count_terms), for
+    relevance ranking; the file is then read to the end even after a match.
+    Occurrences spanning a chunk boundary aren't counted.
+    """
+    with open(filepath, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return False, ""  # Empty files can't be mapped
+        with mm:
+            encoding = 'utf-8'
+            if sniff:
+                encoding = file_reader.sniff_encoding(mm[:file_reader.SNIFF_BYTES])
+                if encoding is None:
+                    return False, ""
+            encoded = query.encoded() if encoding in ('utf-8', 'utf-8-sig') else None
+            if encoded is None:
+                count = (lambda text: query.count_terms(text, counts)) if counts is not None else None
+                return _scan_chunks(mm, query, encoding, cancelled, count)
+            if counts is None:
+                return _scan_mapped(mm, encoded, cancelled)
+            raw = [0] * encoded.term_count
+            scanned = _scan_mapped(mm, encoded, cancelled, lambda chunk: encoded.count_terms(chunk, raw))
+    # The bytes query may number its keywords differently
+    slots = {k if query.use_regex else k.decode('utf-8'): i for i, k in enumerate(encoded.term_keys())}
+    for i, k in enumerate(query.term_keys()):
+        counts[i] += raw[slots[k]]
+    return scanned
@@ -5,18 +5,24 @@ Main GUI for the Advanced File Search Pro application.
 import os
 import re
 import sys
-import csv
+import time
 import webbrowser
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, font
 from datetime import datetime
 import threading
-import openpyxl
+import queue
 
 from . import config
+from . import cache
+from . import export
 from . import file_reader
+from . import isolation
 from . import search
-from .utils import Tooltip
+from . import server
+from .querycache import QueryCache
+from .results import ResultStore
+from .utils import Tooltip, VirtualTreeview
 
 class FileSearchApp:
     def __init__(self, root):
@@ -26,8 +32,17 @@ class FileSearchApp:
         self.root.configure(padx=15, pady=15)
 
         self._setup_styles_and_fonts()
-        self.results = []
+        self.results = ResultStore()
+        self._sort_deferred = False
+        self._live_exporter = None
+        self._export_error = None
+        # Lets a repeated or narrowed search only examine files that changed
+        self._query_cache = QueryCache()
+        self._preview_token = 0
+        self._preview_content = None
+        self._preview_requests = queue.Queue()
         self.create_widgets()
+        threading.Thread(target=self._preview_worker, daemon=True).start()
 
     def _setup_styles_and_fonts(self):
         self.default_font = font.nametofont("TkDefaultFont")
@@ -48,6 +63,7 @@ class FileSearchApp:
         self._create_title(top_frame)
         self._create_input_panel(top_frame)
         self._create_options_panel(top_frame)
+        self._create_limits_panel(top_frame)
         self._create_action_panel(top_frame)
         self._create_results_panel(middle_frame)
         self._create_footer(footer_frame)
@@ -83,6 +99,13 @@ class FileSearchApp:
         ext_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
         Tooltip(ext_entry, "Filter by extensions: pdf docx txt pptx xlsx csv py js\nLeave empty to include all")
 
+        # Excludes
+        ttk.Label(input_frame, text="Exclude:").grid(row=3, column=0, sticky="w", pady=5, padx=(0, 5))
+        self.exclude_var = tk.StringVar(value=" ".join(config.DEFAULT_EXCLUDES))
+        exclude_entry = ttk.Entry(input_frame, textvariable=self.exclude_var)
+        exclude_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+        Tooltip(exclude_entry, "Folder or file name globs to skip, e.g. .git node_modules *.bak\nLeave empty to include everything")
+
     def _create_options_panel(self, parent):
         options_frame = ttk.LabelFrame(parent, text="Search Options", padding=10)
         options_frame.pack(fill="x", expand=True, pady=10)
@@ -91,16 +114,78 @@ class FileSearchApp:
         self.case_sensitive_var = tk.BooleanVar()
         self.search_content_var = tk.BooleanVar()
         self.regex_var = tk.BooleanVar()
+        self.use_index_var = tk.BooleanVar()
+        self.gitignore_var = tk.BooleanVar()
+        self.use_server_var = tk.BooleanVar()
         self.sort_var = tk.StringVar(value="name")
+        self.sort_var.trace_add("write", lambda *args: self._resort())
+        self.workers_var = tk.IntVar(value=1)
 
         ttk.Checkbutton(options_frame, text="Match any keyword", variable=self.match_any_var).pack(side="left", padx=10)
         ttk.Checkbutton(options_frame, text="Case sensitive", variable=self.case_sensitive_var).pack(side="left", padx=10)
         ttk.Checkbutton(options_frame, text="Search in content", variable=self.search_content_var).pack(side="left", padx=10)
         ttk.Checkbutton(options_frame, text="Use Regex", variable=self.regex_var).pack(side="left", padx=10)
+        index_check = ttk.Checkbutton(options_frame, text="Use index", variable=self.use_index_var)
+        index_check.pack(side="left", padx=10)
+        ttk.Checkbutton(options_frame, text="Respect .gitignore", variable=self.gitignore_var).pack(side="left", padx=10)
+        Tooltip(index_check, "Content search: keep extracted text in a full-text index (in ~/.file_search_app)\n"
+                             "so repeat searches only re-read changed files\n"
+                             "Name search: look names up in a filename index, re-reading only changed folders")
+        server_check = ttk.Checkbutton(options_frame, text="Use search server", variable=self.use_server_var)
+        server_check.pack(side="left", padx=10)
+        Tooltip(server_check, "Run searches on a running search server, which keeps caches warm\n"
+                              "Start it with: python -m file_search_app serve")
 
         ttk.Label(options_frame, text="Sort by:").pack(side="left", padx=(20, 5))
-        ttk.Combobox(options_frame, textvariable=self.sort_var, values=["name", "date", "size", "none"],
-                     state="readonly", width=10).pack(side="left", padx=5)
+        sort_combo = ttk.Combobox(options_frame, textvariable=self.sort_var,
+                                  values=["name", "date", "size", "relevance", "none"], state="readonly", width=10)
+        sort_combo.pack(side="left", padx=5)
+        Tooltip(sort_combo, "relevance: rank hits by how often and where the keywords occur\n"
+                            f"Only the best (Max results, default {config.RANK_TOP_K}) are listed, when the search ends")
+
+        ttk.Label(options_frame, text="Workers:").pack(side="left", padx=(20, 5))
+        workers_spin = ttk.Spinbox(options_frame, from_=1, to=os.cpu_count() or 1, textvariable=self.workers_var, width=4)
+        workers_spin.pack(side="left", padx=5)
+        Tooltip(workers_spin, "Number of processes used to read and match file content in parallel")
+
+    def _create_limits_panel(self, parent):
+        limits_frame = ttk.LabelFrame(parent, text="Limits", padding=10)
+        limits_frame.pack(fill="x", expand=True, pady=(0, 10))
+
+        self.file_timeout_var = tk.StringVar()
+        self.max_file_size_var = tk.StringVar()
+        self.max_results_var = tk.StringVar()
+        self.time_limit_var = tk.StringVar()
+
+        ttk.Label(limits_frame, text="Max results:").pack(side="left", padx=(0, 5))
+        results_entry = ttk.Entry(limits_frame, textvariable=self.max_results_var, width=6)
+        results_entry.pack(side="left", padx=5)
+        Tooltip(results_entry, "Stop the search after this many results\nLeave empty for no limit")
+
+        ttk.Label(limits_frame, text="Time limit (s):").pack(side="left", padx=(20, 5))
+        time_entry = ttk.Entry(limits_frame, textvariable=self.time_limit_var, width=6)
+        time_entry.pack(side="left", padx=5)
+        Tooltip(time_entry, "Stop the search after this many seconds\nLeave empty for no limit")
+
+        ttk.Label(limits_frame, text="Per-file timeout (s):").pack(side="left", padx=(20, 5))
+        timeout_entry = ttk.Entry(limits_frame, textvariable=self.file_timeout_var, width=6)
+        timeout_entry.pack(side="left", padx=5)
+        Tooltip(timeout_entry, "Skip documents whose text takes longer than this to extract\n"
+                               "They are remembered and skipped quickly by later searches\nLeave empty for no limit")
+
+        ttk.Label(limits_frame, text="Max file size (MB):").pack(side="left", padx=(20, 5))
+        size_entry = ttk.Entry(limits_frame, textvariable=self.max_file_size_var, width=6)
+        size_entry.pack(side="left", padx=5)
+        Tooltip(size_entry, "Don't search inside files larger than this\nLeave empty for no limit")
+
+        self.live_export_var = tk.StringVar()
+        ttk.Label(limits_frame, text="Export while searching:").pack(side="left", padx=(20, 5))
+        live_export_entry = ttk.Entry(limits_frame, textvariable=self.live_export_var, width=20)
+        live_export_entry.pack(side="left", padx=5)
+        ttk.Button(limits_frame, text="...", width=3, command=self.browse_live_export).pack(side="left")
+        Tooltip(live_export_entry, "Write results to this .csv, .xlsx or .jsonl file as they are found\n"
+                                   f"Only the first {config.UI_LIVE_EXPORT_ROWS} are listed below\n"
+                                   "Leave empty to list them all")
 
     def _create_action_panel(self, parent):
         btn_frame = ttk.Frame(parent)
@@ -109,9 +194,15 @@ class FileSearchApp:
         self.search_btn = ttk.Button(btn_frame, text="🔍 Start Search", command=self.start_search_thread)
         self.search_btn.pack(side="left", padx=2)
 
+        self.stop_btn = ttk.Button(btn_frame, text="⏹ Stop", command=self.stop_search, state="disabled")
+        self.stop_btn.pack(side="left", padx=2)
+
         self.export_btn = ttk.Button(btn_frame, text="💾 Export Results", command=self.export_results, state="disabled")
         self.export_btn.pack(side="left", padx=2)
 
+        self.stats_btn = ttk.Button(btn_frame, text="📊 Statistics", command=self.show_statistics, state="disabled")
+        self.stats_btn.pack(side="left", padx=2)
+
         self.scanned_label = ttk.Label(btn_frame, text="0 / 0")
         self.scanned_label.pack(side="right", padx=(0, 5))
         ttk.Label(btn_frame, text="Files Scanned:").pack(side="right")
@@ -123,34 +214,35 @@ class FileSearchApp:
         paned = ttk.PanedWindow(parent, orient=tk.HORIZONTAL)
         paned.pack(fill="both", expand=True)
 
-        # Left: Results Tree
-        left_frame = ttk.Frame(paned)
-        columns = ("Icon", "Name", "Size", "Modified")
-        self.tree = ttk.Treeview(left_frame, columns=columns, show="headings", height=20)
+        # Left: Results Tree, rendering only the rows on screen
+        columns = ("Icon", "Name", "Size", "Modified", "Location")
+        self.results_view = VirtualTreeview(paned, columns, self._row_values, on_select=self.show_preview, height=20)
+        left_frame = self.results_view.frame
+        self.tree = self.results_view.tree
         self.tree.heading("Icon", text="")
         self.tree.heading("Name", text="Name")
         self.tree.heading("Size", text="Size (KB)")
         self.tree.heading("Modified", text="Modified")
+        self.tree.heading("Location", text="Found in")
         self.tree.column("Icon", width=30, anchor="center")
         self.tree.column("Name", width=300)
         self.tree.column("Size", width=100, anchor="center")
         self.tree.column("Modified", width=150, anchor="center")
-
-        vsb1 = ttk.Scrollbar(left_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb1.set)
-        vsb1.pack(side="right", fill="y")
-        self.tree.pack(side="left", fill="both", expand=True)
+        self.tree.column("Location", width=100, anchor="center")
 
         self.tree.bind("<Double-1>", self.open_selected_file)
-        self.tree.bind("<<TreeviewSelect>>", self.show_preview)
         self.tree.bind("<Button-3>", self.show_context_menu)
         if sys.platform == "darwin":
             self.tree.bind("<Button-2>", self.show_context_menu)
 
         # Right: Preview Pane
         right_frame = ttk.Frame(paned)
-        ttk.Label(right_frame, text="📄 Content Preview", font=("Helvetica", 11, "bold")).pack(anchor="w", pady=5)
-        
+        preview_header = ttk.Frame(right_frame)
+        preview_header.pack(fill="x", pady=5)
+        ttk.Label(preview_header, text="📄 Content Preview", font=("Helvetica", 11, "bold")).pack(side="left")
+        self.load_more_btn = ttk.Button(preview_header, text="⬇ Load more", command=self.load_more_preview, state="disabled")
+        self.load_more_btn.pack(side="right")
+
         vsb2 = ttk.Scrollbar(right_frame, orient="vertical")
         self.preview_text = tk.Text(right_frame, wrap="word", font=self.mono_font, height=20, bg="#f4f4f4", state="disabled", yscrollcommand=vsb2.set)
         vsb2.config(command=self.preview_text.yview)
@@ -188,10 +280,9 @@ class FileSearchApp:
         self.context_menu.add_command(label="📋 Copy Path", command=self.copy_path_to_clipboard)
 
     def show_context_menu(self, event):
-        item = self.tree.identify_row(event.y)
-        if item:
-            if not self.tree.selection() or item not in self.tree.selection():
-                self.tree.selection_set(item)
+        position = self.results_view.identify_row(event.y)
+        if position is not None:
+            self.results_view.select(position)
             self.context_menu.tk_popup(event.x_root, event.y_root)
 
     def browse_directory(self):
@@ -199,6 +290,16 @@ class FileSearchApp:
         if path:
             self.directory_var.set(path)
 
+    def browse_live_export(self):
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=self._export_filetypes())
+        if path:
+            self.live_export_var.set(path)
+
+    @staticmethod
+    def _export_filetypes():
+        return [("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl"),
+                ("All files", "*.* ")]
+
     def start_search_thread(self):
         params = {
             'directory': self.directory_var.get(),
@@ -208,7 +309,19 @@ class FileSearchApp:
             'case_sensitive': self.case_sensitive_var.get(),
             'search_content': self.search_content_var.get(),
             'use_regex': self.regex_var.get(),
+            'use_index': self.use_index_var.get(),
+            'use_name_index': self.use_index_var.get(),
+            'workers': self._get_workers(),
+            'exclude': self.exclude_var.get().split(),
+            'use_gitignore': self.gitignore_var.get(),
+            'file_timeout': self._get_limit(self.file_timeout_var),
+            'max_file_size': self._get_limit(self.max_file_size_var, 1024 * 1024),
+            'max_results': int(self._get_limit(self.max_results_var) or 0) or None,
+            'relevance': self.sort_var.get() == "relevance",
+            'collect_stats': True,
         }
+        time_limit = self._get_limit(self.time_limit_var)
+        params['deadline'] = time.monotonic() + time_limit if time_limit else None
 
         if not params['pattern']:
             messagebox.showwarning("Input Error", "Please enter a search pattern.")
@@ -218,21 +331,69 @@ class FileSearchApp:
             messagebox.showerror("Directory Error", f"Directory not found:\n{params['directory']}")
             return
 
+        live_export = self.live_export_var.get().strip()
+        self._live_exporter = self._export_error = None
+        if live_export:
+            try:
+                self._live_exporter = export.open_exporter(live_export)
+            except (OSError, ImportError, ValueError) as e:
+                messagebox.showerror("Export Failed", f"Could not create file:\n{str(e)}")
+                return
+
         self._prepare_for_search()
 
-        searcher = search.FileSearcher(params)
-        search_thread = threading.Thread(
-            target=searcher.search,
-            args=(self.update_progress, self.add_result, self.search_complete)
-        )
+        if self.use_server_var.get():
+            searcher = server.RemoteSearcher(params)
+        else:
+            searcher = search.FileSearcher(params, query_cache=self._query_cache)
+        self._searcher = searcher
+        search_thread = threading.Thread(target=self._run_search, args=(searcher,))
         search_thread.daemon = True
         search_thread.start()
+        self.root.after(config.UI_POLL_MS, self._drain_events, self._events)
+
+    def _run_search(self, searcher):
+        """Search thread body: the UI hears that the search ended even if it failed."""
+        try:
+            searcher.search(self.update_progress, self.add_result, None)
+        except Exception as e:
+            self._events.put(('error', e))
+        finally:
+            self.search_complete()
+
+    def _get_workers(self):
+        try:
+            return max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
+
+    def stop_search(self):
+        """Cancels the running search; results found so far are kept."""
+        self.stop_btn.config(state="disabled")
+        self._searcher.cancel()
+
+    def _get_limit(self, var, scale=1):
+        """Reads an optional positive number from an entry; empty or invalid means no limit."""
+        try:
+            value = float(var.get()) * scale
+        except ValueError:
+            return None
+        return value if value > 0 else None
 
     def _prepare_for_search(self):
         self.search_btn.config(state="disabled")
+        self.stop_btn.config(state="normal")
         self.export_btn.config(state="disabled")
-        self.tree.delete(*self.tree.get_children())
-        self.results = []
+        self.stats_btn.config(state="disabled")
+        self.results.close()
+        self.results = ResultStore()
+        self._sort_deferred = False
+        self.results_view.reset()
+        # Search thread -> UI hand-off, drained on a timer instead of one after() per event;
+        # bounded, so a search finding results faster than they are shown waits
+        self._events = queue.Queue(maxsize=config.UI_QUEUE_ROWS)
+        self._search_error = None
+        self._latest_progress = None
         self.preview_text.config(state="normal")
         self.preview_text.delete(1.0, tk.END)
         self.preview_text.config(state="disabled")
@@ -240,50 +401,156 @@ class FileSearchApp:
         self.scanned_label.config(text="0 / ?")
         self.root.update_idletasks()
 
+    # The callbacks below run on the search thread. They only hand data
+    # over; _drain_events applies it to the widgets every UI_POLL_MS.
     def update_progress(self, scanned, total):
-        self.root.after(0, self._update_progress_ui, scanned, total)
+        # Coalesced: only the most recent value is ever shown
+        self._latest_progress = (scanned, total)
+
+    def add_result(self, result):
+        exporter = self._live_exporter
+        if exporter is not None:
+            # Written here, on the search thread, so the table never has to hold every result
+            try:
+                exporter.write(result)
+            except Exception as e:
+                # e.g. OSError, or openpyxl rejecting a value
+                self._export_error = e
+                self._searcher.cancel(f"export failed: {e}")
+                return
+            if exporter.count > config.UI_LIVE_EXPORT_ROWS:
+                return
+        self._events.put(('result', result))
+
+    def search_complete(self):
+        try:
+            if self._live_exporter is not None:
+                self._live_exporter.close()
+        except Exception as e:
+            # Reported in the done message; the search must still finish
+            self._export_error = e
+        finally:
+            self._events.put(('done', None))
+
+    def _drain_events(self, events):
+        if events is not self._events:
+            return  # A newer search has replaced this one
+
+        progress = self._latest_progress
+        if progress is not None:
+            self._update_progress_ui(*progress)
+
+        done = False
+        added = 0
+        # Rows are applied for a bounded time, not a bounded count, so fast
+        # machines keep up with fast searches while the UI stays responsive
+        until = time.perf_counter() + config.UI_DRAIN_MS / 1000
+        while time.perf_counter() < until:
+            try:
+                kind, payload = events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'done':
+                done = True
+                break
+            if kind == 'error':
+                self._search_error = payload
+                continue
+            self.results.append(payload)
+            added += 1
+        if added:
+            self._results_added()
+
+        if done:
+            self._search_complete_ui()
+        else:
+            self.root.after(config.UI_POLL_MS, self._drain_events, events)
 
     def _update_progress_ui(self, scanned, total):
         if total > 0:
             self.progress_bar['value'] = (scanned / total) * 100
         self.scanned_label.config(text=f"{scanned} / {total}")
 
-    def add_result(self, result):
-        self.root.after(0, self._add_result_ui, result)
-
-    def _add_result_ui(self, result):
-        self.results.append(result)
-
-    def search_complete(self):
-        self.root.after(0, self._search_complete_ui)
+    def _row_values(self, position):
+        """Columns of the row at a view position, formatted only when it is on screen."""
+        r = self.results.result(position, with_snippet=False)
+        size_kb = r['size'] // 1024
+        date_str = datetime.fromtimestamp(r['mtime']).strftime("%Y-%m-%d %H:%M")
+        icon = config.ICONS.get(r['ext'], config.ICONS['default'])
+        location = r['location'] or ""
+        return icon, r['name'], size_kb, date_str, location
+
+    def _results_added(self):
+        if not self._sort_deferred:
+            if len(self.results) >= config.UI_SORTED_INSERT_LIMIT:
+                # Re-sorting huge lists every tick costs more than one final sort
+                self._sort_deferred = True
+            else:
+                self._sort_results()
+        self.results_view.refresh(len(self.results))
+
+    def _resort(self):
+        """Re-orders the listed results when the sort order is changed."""
+        self._sort_results()
+        self.results_view.refresh(len(self.results))
+
+    def _sort_results(self):
+        """Sorts the results by the chosen order; the selected result stays selected."""
+        view = self.results_view
+        row = self.results.row(view.selected) if view.selected is not None else None
+        self.results.sort(self.sort_var.get())
+        if row is not None:
+            view.selected = self.results.position(row)
 
     def _search_complete_ui(self):
-        sort_by = self.sort_var.get()
-        if sort_by == "name":
-            self.results.sort(key=lambda x: x['name'].lower())
-        elif sort_by == "date":
-            self.results.sort(key=lambda x: x['mtime'], reverse=True)
-        elif sort_by == "size":
-            self.results.sort(key=lambda x: x['size'], reverse=True)
-
-        for r in self.results:
-            size_kb = r['size'] // 1024
-            date_str = datetime.fromtimestamp(r['mtime']).strftime("%Y-%m-%d %H:%M")
-            icon = config.ICONS.get(r['ext'], config.ICONS['default'])
-            self.tree.insert("", "end", values=(icon, r['name'], size_kb, date_str), tags=(r['path'],))
+        if self._sort_deferred:
+            self._sort_results()
+        self.results_view.refresh(len(self.results))
 
         self.progress_bar['value'] = 100
         self.search_btn.config(state="normal")
+        self.stop_btn.config(state="disabled")
         if self.results:
             self.export_btn.config(state="normal")
-        messagebox.showinfo("Done", f"Found {len(self.results)} file(s).")
+        if self._searcher.stats is not None:
+            self.stats_btn.config(state="normal")
+        message = f"Found {len(self.results)} file(s)."
+        if self._live_exporter is not None:
+            exported = self._live_exporter.count
+            message = f"Found {exported} file(s), written to:\n{self._live_exporter.path}"
+            if exported > len(self.results):
+                message += f"\nOnly the first {len(self.results)} are listed."
+            if self._export_error is not None:
+                message += f"\nThe export failed: {self._export_error}"
+        if self._search_error is not None:
+            message = f"Search failed: {self._search_error}\n" + message
+        elif self._searcher.stop_reason:
+            message = f"Search stopped ({self._searcher.stop_reason}). " + message
+        skipped = len(self._searcher.skipped)
+        if skipped:
+            message += f"\n{skipped} file(s) skipped for exceeding the per-file limits."
+        messagebox.showinfo("Done", message)
+
+    def show_statistics(self):
+        """Opens the timings and counters of the last search in a separate window."""
+        stats = self._searcher.stats
+        if stats is None:
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Search statistics")
+        text = tk.Text(window, wrap="none", font=self.mono_font, width=90, height=30)
+        vsb = ttk.Scrollbar(window, orient="vertical", command=text.yview)
+        text.configure(yscrollcommand=vsb.set)
+        vsb.pack(side="right", fill="y")
+        text.pack(side="left", fill="both", expand=True)
+        text.insert("1.0", stats.to_text())
+        text.config(state="disabled")
 
     def _get_selected_filepath(self):
-        selected = self.tree.selection()
-        if not selected:
+        position = self.results_view.selected
+        if position is None or position >= len(self.results):
             return None
-        item = self.tree.item(selected[0])
-        return item['tags'][0] if item.get('tags') else None
+        return self.results.path(position)
 
     def open_selected_file(self, event=None):
         filepath = self._get_selected_filepath()
@@ -314,7 +581,11 @@ class FileSearchApp:
         self.root.clipboard_append(filepath)
         messagebox.showinfo("Copied", "File path copied to clipboard!")
 
-    def show_preview(self, event):
+    def show_preview(self, event=None):
+        # Every selection change invalidates the preview that is still loading
+        self._preview_token += 1
+        self._preview_content = None
+        self.load_more_btn.config(state="disabled")
         self.preview_text.config(state="normal")
         self.preview_text.delete(1.0, tk.END)
         self.preview_text.tag_remove("highlight", "1.0", tk.END)
@@ -332,80 +603,136 @@ class FileSearchApp:
             self.preview_text.config(state="disabled")
             return
 
-        content = file_reader.read_file_content(filepath)
+        self.preview_text.mark_set("content_start", "end-1c")
+        self.preview_text.mark_gravity("content_start", "left")
+        self.preview_text.insert(tk.END, "⏳ Loading preview...")
+        self.preview_text.config(state="disabled")
+        limits = (self._get_limit(self.file_timeout_var) or config.PREVIEW_TIMEOUT,
+                  self._get_limit(self.max_file_size_var, 1024 * 1024) or config.PREVIEW_MAX_BYTES)
+        self._preview_requests.put((self._preview_token, filepath, limits))
+
+    def _preview_worker(self):
+        """Reads preview content off the Tk thread; only the latest selection is loaded."""
+        extractor = None
+        while True:
+            token, filepath, limits = self._preview_requests.get()
+            try:
+                while True:
+                    token, filepath, limits = self._preview_requests.get_nowait()
+            except queue.Empty:
+                pass
+            if token != self._preview_token:
+                continue
+            timeout, max_size = limits
+            if extractor is None or extractor.timeout != timeout:
+                if extractor is not None:
+                    extractor.close()
+                extractor = isolation.IsolatedExtractor(timeout)
+            # Selecting another file kills the extraction of this one
+            extractor.cancelled = lambda token=token: token != self._preview_token
+            content = self._load_preview(filepath, token, max_size, extractor)
+            if content is not None:
+                self.root.after(0, self._show_preview_content, token, content)
+
+    def _load_preview(self, filepath, token, max_size, extractor):
+        """Text of filepath within the budgets, or None once the selection has moved on."""
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            return f"[Error reading file: {e}]"
+        if stat.st_size > max_size:
+            return f"[Error reading file: larger than the {int(max_size)} byte preview limit]"
+        units = []
+        stream = cache.iter_file_units(filepath, stat, extractor.iter_units)
+        try:
+            for unit in stream:
+                if token != self._preview_token:
+                    return None
+                units.append(unit)
+        except isolation.ExtractionFailed as e:
+            return f"[Error reading file: {e}]"
+        except isolation.ExtractionCancelled:
+            return None
+        finally:
+            stream.close()
+        return file_reader.join_units(units)
+
+    def _show_preview_content(self, token, content):
+        if token != self._preview_token:
+            return  # The selection changed while this file was loading
+        self.preview_text.config(state="normal")
+        self.preview_text.delete("content_start", tk.END)
         if "support not installed" in content or "Error reading" in content:
             self.preview_text.insert(tk.END, f"❌ Could not read content:\n{content}")
-        else:
-            self.preview_text.insert(tk.END, "📌 Content Preview:\n\n")
-            self.preview_text.insert(tk.END, content)
-            self._highlight_preview_text()
+            self.preview_text.config(state="disabled")
+            return
 
+        if not content.strip():
+            self.preview_text.insert(tk.END, "ℹ️ No text content to preview (empty or binary file).")
+            self.preview_text.config(state="disabled")
+            return
+
+        self.preview_text.insert(tk.END, "📌 Content Preview:\n\n")
+        highlighter = self._preview_highlighter()
+        # Open the window shortly before the first match rather than at the top
+        start = 0
+        if highlighter is not None:
+            match = highlighter.search(content)
+            if match and match.start() > config.PREVIEW_WINDOW_CHARS // 4:
+                start = match.start() - config.PREVIEW_WINDOW_CHARS // 4
+                self.preview_text.insert(tk.END, f"… {start:,} characters above …\n\n")
+        self._preview_content = content
+        self._preview_end = start
+        self._preview_regex = highlighter
+        self.preview_text.config(state="disabled")
+        self._append_preview_window()
+
+    def load_more_preview(self):
+        if self._preview_content is not None:
+            self._append_preview_window()
+
+    def _append_preview_window(self):
+        """Appends the next window of content and highlights only that window."""
+        content = self._preview_content
+        start = self._preview_end
+        end = min(len(content), start + config.PREVIEW_WINDOW_CHARS)
+        window = content[start:end]
+        self._preview_end = end
+
+        self.preview_text.config(state="normal")
+        base = self.preview_text.index("end-1c")
+        self.preview_text.insert(tk.END, window)
+        if self._preview_regex is not None:
+            for count, match in enumerate(self._preview_regex.finditer(window)):
+                if count >= config.PREVIEW_MAX_HIGHLIGHTS:
+                    break
+                if match.end() > match.start():
+                    self.preview_text.tag_add("highlight", f"{base}+{match.start()}c", f"{base}+{match.end()}c")
         self.preview_text.config(state="disabled")
+        self.load_more_btn.config(state="normal" if end < len(content) else "disabled")
 
-    def _highlight_preview_text(self):
+    def _preview_highlighter(self):
+        """Compiles the current pattern into one regex used to highlight the preview."""
         pattern = self.pattern_var.get().strip()
         if not pattern:
-            return
-
-        use_regex = self.regex_var.get()
-        case_sensitive = self.case_sensitive_var.get()
-        
-        text_to_search = self.preview_text.get("1.0", tk.END)
-        
-        if use_regex:
-            flags = 0 if case_sensitive else re.IGNORECASE
-            try:
-                for match in re.finditer(pattern, text_to_search, flags):
-                    start_index = f"1.0+{match.start()}c"
-                    end_index = f"1.0+{match.end()}c"
-                    self.preview_text.tag_add("highlight", start_index, end_index)
-            except re.error:
-                pass # Ignore invalid regex for highlighting
-        else:
-            keywords = pattern.split()
-            for keyword in keywords:
-                if not keyword: continue
-                start_index = "1.0"
-                while True:
-                    pos = self.preview_text.search(keyword, start_index, stopindex=tk.END, nocase=not case_sensitive)
-                    if not pos:
-                        break
-                    end_index = f"{pos}+{len(keyword)}c"
-                    self.preview_text.tag_add("highlight", pos, end_index)
-                    start_index = end_index
+            return None
+        flags = 0 if self.case_sensitive_var.get() else re.IGNORECASE
+        if not self.regex_var.get():
+            keywords = sorted(set(pattern.split()), key=len, reverse=True)
+            pattern = "|".join(re.escape(k) for k in keywords)
+        try:
+            return re.compile(pattern, flags)
+        except re.error:
+            return None # Ignore invalid regex for highlighting
 
     def export_results(self):
-        filepath = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("All files", "*.* ")]
-        )
+        filepath = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=self._export_filetypes())
         if not filepath:
             return
-        
-        headers = ["Filename", "Path", "Size (bytes)", "Modified", "Snippet"]
+
         try:
-            if filepath.endswith(".csv"):
-                with open(filepath, 'w', encoding='utf-8', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(headers)
-                    for r in self.results:
-                        writer.writerow([
-                            r['name'], r['path'], r['size'],
-                            datetime.fromtimestamp(r['mtime']).strftime("%Y-%m-%d %H:%M:%S"),
-                            r['snippet']
-                        ])
-            else:
-                wb = openpyxl.Workbook()
-                ws = wb.active
-                ws.title = "Search Results"
-                ws.append(headers)
-                for r in self.results:
-                    ws.append([
-                        r['name'], r['path'], r['size'],
-                        datetime.fromtimestamp(r['mtime']).strftime("%Y-%m-%d %H:%M:%S"),
-                        r['snippet']
-                    ])
-                wb.save(filepath)
+            # Rows are streamed to the file, xlsx included, so no second copy is built in memory
+            export.export_results(self.results, filepath)
             messagebox.showinfo("Export Success", f"Results saved to:\n{filepath}")
         except Exception as e:
             messagebox.showerror("Export Failed", f"Could not save file:\n{str(e)}")
@@ -1,4 +1,5 @@
 import tkinter as tk
+from tkinter import ttk
 
 class Tooltip:
     """Create a tooltip for a given widget."""
@@ -28,3 +29,138 @@ class Tooltip:
         if self.tooltip_window:
             self.tooltip_window.destroy()
             self.tooltip_window = None
+
+
+class VirtualTreeview:
+    """
+    A ttk.Treeview that only holds the rows currently on screen.
+
+    Rows are addressed by position (0 to count - 1) and rendered on demand by
+    row_values(position), so a million rows cost no more than a screenful. The
+    scrollbar, mouse wheel and arrow/page keys move the window over the rows.
+    One row can be selected; on_select is called when the selection changes.
+    """
+    def __init__(self, parent, columns, row_values, on_select=None, height=20):
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", selectmode="browse", height=height)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.row_values = row_values
+        self.on_select = on_select
+        self.count = 0
+        self.first = 0
+        self.visible = height
+        self.selected = None
+
+        self.tree.bind("<Configure>", self._measure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        for sequence in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            self.tree.bind(sequence, self._on_key)
+
+    def refresh(self, count=None):
+        """Re-renders the visible rows, after the rows changed or count grew."""
+        if count is not None:
+            self.count = count
+            if self.selected is not None and self.selected >= count:
+                self.selected = None
+        self.first = max(0, min(self.first, self.count - self.visible))
+        self._render()
+
+    def reset(self):
+        self.count = self.first = 0
+        self.selected = None
+        self._render()
+
+    def _render(self):
+        tree = self.tree
+        tree.delete(*tree.get_children())
+        end = min(self.first + self.visible, self.count)
+        for position in range(self.first, end):
+            tree.insert("", "end", iid=str(position), values=self.row_values(position))
+        if self.selected is not None and self.first <= self.selected < end:
+            tree.selection_set(str(self.selected))
+            tree.focus(str(self.selected))
+        if self.count:
+            self.scrollbar.set(self.first / self.count, min(1.0, end / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _measure(self, event=None):
+        """Fits the number of rendered rows to the widget's height."""
+        children = self.tree.get_children()
+        box = self.tree.bbox(children[0]) if children else None
+        if not box:
+            return
+        _, top, _, row_height = box
+        visible = max(1, (self.tree.winfo_height() - top) // max(1, row_height))
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh()
+
+    def _scroll_to(self, first):
+        first = max(0, min(first, self.count - self.visible))
+        if first != self.first:
+            self.first = first
+            self._render()
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')."""
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self.count))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self._scroll_to(self.first + int(args[1]) * step)
+
+    def see(self, position):
+        if position < self.first:
+            self._scroll_to(position)
+        elif position >= self.first + self.visible:
+            self._scroll_to(position - self.visible + 1)
+
+    def select(self, position):
+        changed = position != self.selected
+        self.selected = position
+        self.see(position)
+        self.tree.selection_set(str(position))
+        self.tree.focus(str(position))
+        if changed and self.on_select:
+            self.on_select()
+
+    def identify_row(self, y):
+        """The row position at widget y coordinate y, or None."""
+        item = self.tree.identify_row(y)
+        return int(item) if item else None
+
+    def _on_tree_select(self, event):
+        selection = self.tree.selection()
+        if not selection:
+            return  # The selected row was scrolled out of view, not deselected
+        position = int(selection[0])
+        if position != self.selected:
+            self.selected = position
+            if self.on_select:
+                self.on_select()
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self._scroll_to(self.first - 3)
+        else:
+            self._scroll_to(self.first + 3)
+        return "break"
+
+    def _on_key(self, event):
+        if not self.count:
+            return "break"
+        position = self.first if self.selected is None else self.selected
+        if event.keysym == "Home":
+            position = 0
+        elif event.keysym == "End":
+            position = self.count - 1
+        else:
+            step = {"Up": -1, "Down": 1, "Prior": -self.visible, "Next": self.visible}[event.keysym]
+            position = max(0, min(position + step, self.count - 1))
+        self.select(position)
+        return "break"
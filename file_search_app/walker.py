@@ -0,0 +1,323 @@
+"""
+Streaming directory walker.
+
+Yields matching files as they are discovered with os.scandir, pruning excluded
+directories before descending into them, so matching can start immediately even
+on very large trees.
+"""
+import os
+import re
+import time
+import fnmatch
+import threading
+from collections import OrderedDict
+
+from . import config
+
+# Directories modified this recently aren't remembered by DirectoryListings: a
+# change within the same mtime tick would otherwise go unnoticed
+RACY_SECONDS = 2
+
+
+def _gitignore_regex(pattern):
+    """
+    Translates a .gitignore glob into a regex matching paths relative to the
+    .gitignore directory. * and ? don't match '/', a leading **/ and an inner
+    /**/ match any number of directories, and a trailing /** everything below.
+    """
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        at_segment_start = i == 0 or pattern[i - 1] == '/'
+        if c == '*' and pattern.startswith('**', i) and at_segment_start and (i + 2 == n or pattern[i + 2] == '/'):
+            if i + 2 == n:
+                parts.append('.*')
+                i = n
+            else:
+                parts.append('(?:.*/)?')
+                i += 3
+        elif c == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif c == '?':
+            parts.append('[^/]')
+            i += 1
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            j = pattern.find(']', j)
+            if j == -1:
+                parts.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:j]
+            negate = body[0] in '!^'
+            # Ranges are kept, anything else is taken literally
+            body = ''.join(ch if ch == '-' else re.escape(ch) for ch in (body[1:] if negate else body))
+            parts.append('[^/' + body + ']' if negate else '(?!/)[' + body + ']')
+            i = j + 1
+        elif c == '\\' and i + 1 < n:
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return ''.join(parts)
+
+
+class GitIgnore:
+    """Minimal .gitignore matcher covering globs, anchors, dir-only rules and negation."""
+
+    def __init__(self, base, lines):
+        self.base = base
+        self.rules = []
+        for line in lines:
+            line = line.rstrip('\n')
+            # Trailing spaces are dropped unless escaped with a backslash
+            stripped = line.rstrip(' ')
+            if stripped.endswith('\\') and len(stripped) < len(line):
+                stripped += ' '
+            line = stripped
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/') if dir_only else line
+            if not line:
+                continue
+            # A slash at the start or in the middle anchors the rule to base;
+            # other rules match at any depth
+            regex = _gitignore_regex(line.lstrip('/'))
+            if '/' not in line:
+                regex = '(?:.*/)?' + regex
+            self.rules.append((re.compile(regex, re.DOTALL), negate, dir_only))
+
+    @classmethod
+    def load(cls, directory):
+        try:
+            with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8', errors='ignore') as f:
+                return cls(directory, f.readlines())
+        except OSError:
+            return None
+
+    def ignored(self, path, is_dir):
+        """Returns True/False when a rule decides, None when no rule applies."""
+        rel = os.path.relpath(path, self.base).replace(os.sep, '/')
+        decision = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel):
+                decision = not negate
+        return decision
+
+
+class _ListedEntry:
+    """Stands in for an os.DirEntry of a remembered listing."""
+    __slots__ = ('name', 'path', '_is_dir', '_is_link', '_stat')
+
+    def __init__(self, directory, name, is_dir, is_link):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self._is_dir = is_dir
+        self._is_link = is_link
+        self._stat = None
+
+    def is_dir(self, follow_symlinks=True):
+        return self._is_dir
+
+    def is_symlink(self):
+        return self._is_link
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+class DirectoryListings:
+    """
+    Directory contents remembered between walks, e.g. by the search server.
+
+    A directory is listed again only when its mtime changes, which happens when
+    an entry is added, removed or renamed. File metadata isn't kept: editing a
+    file leaves its directory alone, so every walk still stats files afresh.
+    At most max_dirs listings are kept, least recently used dropped first.
+    """
+
+    def __init__(self, max_dirs=config.LISTINGS_MAX_DIRS):
+        self.max_dirs = max_dirs
+        self._listings = OrderedDict()  # directory -> (st_mtime_ns, [(name, is_dir, is_link)])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._listings)
+
+    def list(self, directory):
+        """Entries of directory, like list(os.scandir(directory))."""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._listings.pop(directory, None)
+            raise
+        with self._lock:
+            cached = self._listings.get(directory)
+            if cached is not None and cached[0] == mtime:
+                self._listings.move_to_end(directory)
+                self.hits += 1
+            else:
+                cached = None
+                self.misses += 1
+        if cached is not None:
+            return [_ListedEntry(directory, *item) for item in cached[1]]
+
+        with os.scandir(directory) as it:
+            entries = list(it)
+        if time.time() - mtime / 1e9 > RACY_SECONDS:
+            listing = []
+            for entry in entries:
+                try:
+                    listing.append((entry.name, entry.is_dir(), entry.is_symlink()))
+                except OSError:
+                    listing.append((entry.name, False, False))
+            with self._lock:
+                self._listings[directory] = (mtime, listing)
+                self._listings.move_to_end(directory)
+                while len(self._listings) > self.max_dirs:
+                    self._listings.popitem(last=False)
+        else:
+            with self._lock:
+                self._listings.pop(directory, None)
+        return entries
+
+
+class Walker:
+    """
+    Iterates over the files under a root directory.
+
+    Counters are updated while walking so callers can show progress before the
+    full tree is known; see estimated_total(). With a DirectoryListings,
+    unchanged directories aren't read from disk again.
+    """
+
+    def __init__(self, root, extensions=None, exclude=(), use_gitignore=False, listings=None):
+        self.root = root
+        self.listings = listings
+        self.extensions = extensions
+        self.exclude = tuple(exclude or ())
+        self.use_gitignore = use_gitignore
+        self.files_found = 0
+        self.dirs_done = 0
+        self.dirs_pending = 0
+        self._gitignores = {}  # directory -> GitIgnore chain, for admits()
+
+    def _excluded(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude)
+
+    def _ignored(self, ignores, path, is_dir):
+        decision = None
+        for ignore in ignores:
+            verdict = ignore.ignored(path, is_dir)
+            if verdict is not None:
+                decision = verdict
+        return bool(decision)
+
+    def _ignores_in(self, directory, inherited):
+        ignores = self._gitignores.get(directory)
+        if ignores is None:
+            ignore = GitIgnore.load(directory)
+            ignores = self._gitignores[directory] = inherited + (ignore,) if ignore else inherited
+        return ignores
+
+    def admits(self, path):
+        """
+        True if iterating would yield the file at path, a file under root that
+        was found some other way (e.g. in the filename index): its extension is
+        wanted and neither it nor a directory above it is excluded or ignored.
+        """
+        if self.extensions and os.path.splitext(path)[1][1:].lower() not in self.extensions:
+            return False
+        return self._reached(path, False)
+
+    def descends(self, path):
+        """True if iterating would descend into the directory at path, under root."""
+        return self._reached(path, True)
+
+    def _reached(self, path, is_dir):
+        parts = os.path.relpath(path, self.root).split(os.sep)
+        directory = self.root
+        ignores = ()
+        for depth, name in enumerate(parts):
+            if self.use_gitignore:
+                ignores = self._ignores_in(directory, ignores)
+            child = os.path.join(directory, name)
+            last = depth == len(parts) - 1
+            if self._excluded(name) or (ignores and self._ignored(ignores, child, is_dir or not last)):
+                return False
+            directory = child
+        return True
+
+    def estimated_total(self):
+        """Extrapolates the final file count from the directories visited so far."""
+        if not self.dirs_pending or not self.dirs_done:
+            return self.files_found
+        per_dir = self.files_found / self.dirs_done
+        return self.files_found + int(per_dir * self.dirs_pending)
+
+    def __iter__(self):
+        """
+        Yields os.DirEntry objects (or equivalents from the listings); entry.stat()
+        is cached by the entry itself.
+        """
+        stack = [(self.root, ())]
+        self.dirs_pending = 1
+        while stack:
+            directory, ignores = stack.pop()
+            self.dirs_pending -= 1
+            if self.use_gitignore:
+                ignore = GitIgnore.load(directory)
+                if ignore:
+                    ignores = ignores + (ignore,)
+            try:
+                if self.listings is not None:
+                    entries = self.listings.list(directory)
+                else:
+                    with os.scandir(directory) as it:
+                        entries = list(it)
+            except OSError:
+                self.dirs_done += 1
+                continue
+
+            subdirs = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if self._excluded(entry.name) or (ignores and self._ignored(ignores, entry.path, is_dir)):
+                    continue
+                if is_dir:
+                    # Links to directories are neither files nor followed, like os.walk
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                    continue
+                if self.extensions:
+                    file_ext = os.path.splitext(entry.name)[1][1:].lower()
+                    if file_ext not in self.extensions:
+                        continue
+                self.files_found += 1
+                yield entry
+
+            self.dirs_done += 1
+            self.dirs_pending += len(subdirs)
+            # Reversed so that subdirectories are visited in listing order, like os.walk
+            stack.extend((d, ignores) for d in reversed(subdirs))
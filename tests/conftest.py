@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_search_app import config  # noqa: E402
+from file_search_app.search import FileSearcher  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keeps indexes and failure logs of a test out of the user's STATE_DIR."""
+    path = tmp_path / "state"
+    monkeypatch.setattr(config, 'STATE_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def search():
+    """Runs a search and returns the names of the files found, sorted."""
+    def run(directory, pattern, **params):
+        params = {
+            'directory': str(directory),
+            'pattern': pattern,
+            'extensions': None,
+            'match_any': False,
+            'case_sensitive': False,
+            'search_content': True,
+            'use_regex': False,
+            **params,
+        }
+        searcher = FileSearcher(params)
+        results = []
+        searcher.search(None, results.append, None)
+        return sorted(os.path.relpath(r['path'], directory) for r in results)
+    return run
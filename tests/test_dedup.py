@@ -0,0 +1,55 @@
+import os
+import shutil
+
+import pytest
+
+from file_search_app import file_reader
+from file_search_app.dedup import ContentDeduper
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def test_copies_of_the_same_kind_share_an_outcome(tmp_path):
+    a = _write(tmp_path / "a.docx", b"same bytes")
+    b = _write(tmp_path / "b.docx", b"same bytes")
+    dedup = ContentDeduper()
+    kind = file_reader.reader_for(str(a))
+    assert dedup.lookup(str(a), os.stat(a), kind) is None
+    dedup.record(str(a), os.stat(a), "outcome", kind)
+    assert dedup.lookup(str(b), os.stat(b), kind) == "outcome"
+    assert dedup.duplicates == 1
+
+
+def test_copies_read_by_different_readers_dont_share_an_outcome(tmp_path):
+    a = _write(tmp_path / "a.xlsx", b"same bytes")
+    b = _write(tmp_path / "a.docx", b"same bytes")
+    dedup = ContentDeduper()
+    assert dedup.lookup(str(a), os.stat(a), file_reader.reader_for(str(a))) is None
+    dedup.record(str(a), os.stat(a), "xlsx outcome", file_reader.reader_for(str(a)))
+    assert dedup.lookup(str(b), os.stat(b), file_reader.reader_for(str(b))) is None
+
+
+def test_hardlinks_under_another_extension_dont_share_an_outcome(tmp_path):
+    a = _write(tmp_path / "a.xlsx", b"same bytes")
+    b = tmp_path / "a.docx"
+    try:
+        os.link(a, b)
+    except OSError:
+        pytest.skip("hardlinks not supported here")
+    dedup = ContentDeduper()
+    dedup.record(str(a), os.stat(a), "xlsx outcome", file_reader.reader_for(str(a)))
+    assert dedup.lookup(str(b), os.stat(b), file_reader.reader_for(str(b))) is None
+
+
+@pytest.mark.parametrize("copy_name", ["c.xlsx", "0.xlsx", "z.xlsx"])
+def test_search_finds_a_document_next_to_a_copy_under_another_extension(tmp_path, search, copy_name):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("a needle in a haystack")
+    document.save(str(tmp_path / "a.docx"))
+    shutil.copy(tmp_path / "a.docx", tmp_path / copy_name)
+
+    assert search(tmp_path, "needle") == ["a.docx"]
@@ -0,0 +1,69 @@
+import csv
+import json
+from datetime import datetime
+
+import pytest
+
+from file_search_app import cli, export
+
+RESULTS = [
+    {'name': 'a.txt', 'path': '/d/a.txt', 'size': 12, 'mtime': 1700000000.5, 'ext': 'txt',
+     'snippet': 'hello, "world"\nnext line', 'location': None, 'cell': None},
+    {'name': 'b.xlsx', 'path': '/d/b.xlsx', 'size': 3400, 'mtime': 1700000100.0, 'ext': 'xlsx',
+     'snippet': 'Straße \x07bell', 'location': "'My Sheet'!B7", 'cell': ['My Sheet', 7, 2]},
+]
+
+
+def _expected_rows():
+    return [[r['name'], r['path'], r['size'],
+             datetime.fromtimestamp(r['mtime']).strftime("%Y-%m-%d %H:%M:%S"),
+             r['snippet'], r['location'] or ""] for r in RESULTS]
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / "r.jsonl"
+    assert export.export_results(RESULTS, str(path)) == 2
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == RESULTS
+
+
+def test_csv_round_trip(tmp_path):
+    path = tmp_path / "r.csv"
+    assert export.export_results(iter(RESULTS), str(path)) == 2
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == export.HEADERS
+    assert rows[1:] == [[str(v) for v in row] for row in _expected_rows()]
+
+
+def test_xlsx_round_trip(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = tmp_path / "r.xlsx"
+    assert export.export_results(RESULTS, str(path)) == 2
+    rows = [list(row) for row in openpyxl.load_workbook(path, read_only=True).active.iter_rows(values_only=True)]
+    expected = _expected_rows()
+    # Control characters aren't allowed in cells and are dropped
+    expected[1][4] = 'Straße bell'
+    expected[0][5] = None
+    assert rows == [export.HEADERS] + expected
+
+
+def test_format_comes_from_the_extension_or_the_argument(tmp_path):
+    assert export.format_for("x/Results.CSV") == 'csv'
+    with pytest.raises(ValueError):
+        export.format_for("results.json")
+    with pytest.raises(ValueError):
+        export.open_exporter(str(tmp_path / "results"))
+    with export.open_exporter(str(tmp_path / "results.json"), 'jsonl') as exporter:
+        exporter.write(RESULTS[0])
+    assert json.loads((tmp_path / "results.json").read_text(encoding='utf-8')) == RESULTS[0]
+
+
+def test_cli_rejects_an_unknown_output_extension(tmp_path, capsys):
+    (tmp_path / "a.txt").write_text("hello")
+    out = tmp_path / "results.json"
+    assert cli.main(["search", "hello", str(tmp_path), "-c", "-o", str(out)]) == cli.EXIT_ERROR
+    assert not out.exists()
+    assert "export format" in capsys.readouterr().err
+    assert cli.main(["search", "hello", str(tmp_path), "-c", "-o", str(out), "--format", "jsonl"]) == cli.EXIT_MATCH
+    assert json.loads(out.read_text(encoding='utf-8'))['name'] == 'a.txt'
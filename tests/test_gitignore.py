@@ -0,0 +1,77 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from file_search_app.walker import Walker
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git not installed")
+
+FILES = [
+    'a.md', 'a.log', 'keep.log', 'x.txt', 'ab.txt', 'b.txt', 'root.txt', 'tmp', 'sp ace',
+    'docs/a.md', 'docs/c.md', 'docs/a/b.md', 'docs/x/y/d.md', 'docs/notes.txt',
+    'build/out.txt', 'src/build/out.txt', 'src/build.txt', 'src/root.txt',
+    'a/b', 'a/x/b', 'a/x/y/b/c.txt', 'logs/today.txt', 'logs/old/2020.txt',
+    'sub/tmp/t.txt', 'sub/x.txt', 'sub/deep/x.txt', 'sub/deep/y.log', 'sub/keep.log',
+]
+
+CASES = {
+    'star does not cross slashes': ['docs/*.md'],
+    'double star in the middle': ['docs/**/*.md'],
+    'leading double star': ['**/build'],
+    'inner double star': ['a/**/b'],
+    'trailing double star': ['logs/**'],
+    'anchored to the gitignore': ['/root.txt', '/build/'],
+    'unanchored name at any depth': ['build', '*.md'],
+    'negation': ['*.log', '!keep.log'],
+    'directory only': ['tmp/'],
+    'wildcards and classes': ['?.txt', '[ab].txt', '[!a-b].md'],
+    'escaped trailing space': ['sp\\ ace', 'x.txt   '],
+    'slash in the middle anchors': ['deep/x.txt', 'a/x'],
+}
+
+
+def _make_tree(root, gitignore, nested=None):
+    for rel in FILES:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    (root / '.gitignore').write_text("\n".join(gitignore) + "\n")
+    if nested:
+        (root / 'sub' / '.gitignore').write_text("\n".join(nested) + "\n")
+
+
+def _git_visible(root):
+    """Untracked files git doesn't ignore."""
+    subprocess.run(['git', 'init', '-q', str(root)], check=True)
+    out = subprocess.run(['git', '-C', str(root), 'ls-files', '-z', '--others', '--exclude-standard'],
+                         check=True, capture_output=True).stdout
+    return {p for p in out.decode('utf-8').split('\0') if p}
+
+
+def _walked(root):
+    walker = Walker(str(root), exclude=['.git'], use_gitignore=True)
+    return {os.path.relpath(entry.path, root).replace(os.sep, '/') for entry in walker}
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_walker_ignores_what_git_ignores(tmp_path, case):
+    _make_tree(tmp_path, CASES[case])
+    expected = _git_visible(tmp_path)
+    assert _walked(tmp_path) == expected
+
+
+def test_nested_gitignore_is_anchored_to_its_directory(tmp_path):
+    _make_tree(tmp_path, ['*.log'], nested=['/x.txt', 'deep/*.log', '!keep.log'])
+    expected = _git_visible(tmp_path)
+    assert _walked(tmp_path) == expected
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_admits_agrees_with_the_walk(tmp_path, case):
+    _make_tree(tmp_path, CASES[case])
+    expected = _git_visible(tmp_path)
+    walker = Walker(str(tmp_path), exclude=['.git'], use_gitignore=True)
+    for rel in FILES:
+        assert walker.admits(str(tmp_path / rel)) == (rel in expected), rel
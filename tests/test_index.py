@@ -0,0 +1,62 @@
+import pytest
+
+from file_search_app.search import FileSearcher
+
+
+def _results(directory, pattern, use_index, **params):
+    params = {
+        'directory': str(directory),
+        'pattern': pattern,
+        'extensions': None,
+        'match_any': False,
+        'case_sensitive': False,
+        'search_content': True,
+        'use_regex': False,
+        'use_index': use_index,
+        **params,
+    }
+    results = []
+    searcher = FileSearcher(params)
+    searcher.search(None, results.append, None)
+    assert searcher.error is None
+    return sorted((r['name'], r['snippet'], r['location'], r['cell']) for r in results)
+
+
+@pytest.fixture
+def documents(tmp_path):
+    (tmp_path / "table.csv").write_text("id,name\n1,alpha\n2,needle in cell\n", encoding='utf-8')
+    (tmp_path / "notes.txt").write_text("a needle and alpha\n", encoding='utf-8')
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("first alpha")
+    document.add_paragraph("beta second")
+    document.save(str(tmp_path / "doc.docx"))
+    return tmp_path
+
+
+@pytest.mark.parametrize("pattern, regex", [
+    ("needle", False),
+    ("alpha", False),
+    ("alpha beta", False),
+    (r"alpha beta", True),   # Would span two paragraphs in the joined text
+    (r"^beta", True),        # Starts the second paragraph, not the document
+    (r"cell$", True),
+    (r"\d,needle", True),
+])
+def test_index_reports_the_same_hits_as_a_plain_search(documents, pattern, regex):
+    expected = _results(documents, pattern, False, use_regex=regex)
+    # Twice: once filling the index, once answered from it
+    assert _results(documents, pattern, True, use_regex=regex) == expected
+    assert _results(documents, pattern, True, use_regex=regex) == expected
+
+
+def test_index_hits_in_spreadsheets_carry_their_cell(documents):
+    _results(documents, "needle", True)
+    hits = _results(documents, "needle", True)
+    assert ('table.csv', 'needle in cell', 'B3', (None, 3, 2)) in hits
+
+
+def test_changed_files_are_indexed_again(documents):
+    assert [h[0] for h in _results(documents, "gamma", True)] == []
+    (documents / "notes.txt").write_text("now with gamma and more\n", encoding='utf-8')
+    assert [h[0] for h in _results(documents, "gamma", True)] == ['notes.txt']
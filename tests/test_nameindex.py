@@ -0,0 +1,53 @@
+from file_search_app import nameindex
+from file_search_app.search import FileSearcher
+
+
+def _names(directory, pattern, tmp_path, **params):
+    params = {
+        'directory': str(directory),
+        'pattern': pattern,
+        'extensions': None,
+        'match_any': False,
+        'case_sensitive': False,
+        'search_content': False,
+        'use_regex': False,
+        'use_name_index': True,
+        'name_index_path': str(tmp_path / "names.sqlite"),
+        **params,
+    }
+    searcher = FileSearcher(params)
+    results = []
+    searcher.search(None, results.append, None)
+    return sorted(r['name'] for r in results), searcher
+
+
+def _indexed_dirs(tmp_path):
+    with nameindex.NameIndex(str(tmp_path / "names.sqlite")) as idx:
+        return {path for (path,) in idx.conn.execute("SELECT path FROM dirs")}
+
+
+def test_refresh_skips_excluded_and_ignored_directories(tmp_path):
+    root = tmp_path / "tree"
+    for rel in ["src/report.txt", "node_modules/pkg/report.txt", "build/report.txt", "build/deep/report.txt"]:
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text("x")
+    (root / ".gitignore").write_text("build/\n")
+
+    names, _ = _names(root, "report", tmp_path, exclude=['node_modules'], use_gitignore=True)
+    assert names == ['report.txt']
+    listed = _indexed_dirs(tmp_path)
+    assert str(root / "src") in listed
+    assert not any(part in path for path in listed for part in ("node_modules", "build"))
+
+    # A search that does descend into them still finds everything
+    names, _ = _names(root, "report", tmp_path, exclude=[])
+    assert names == ['report.txt'] * 4
+
+
+def test_a_pruned_refresh_isnt_fresh_for_an_unpruned_search(tmp_path):
+    root = tmp_path / "tree"
+    (root / "node_modules").mkdir(parents=True)
+    (root / "node_modules" / "a.txt").write_text("x")
+    _names(root, "a.txt", tmp_path, exclude=['node_modules'], name_index_max_age=3600)
+    names, _ = _names(root, "a.txt", tmp_path, exclude=[], name_index_max_age=3600)
+    assert names == ['a.txt']
@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+from file_search_app.query import Query
+
+
+@pytest.mark.parametrize("pattern, match_any, text, expected", [
+    ("alpha beta", False, "beta then alpha", True),
+    ("alpha beta", False, "only alpha", False),
+    ("alpha beta", True, "only alpha", True),
+    ("alpha beta", True, "neither", False),
+    ("ALPHA", False, "an alpha", True),
+    ("abc bcd", False, "xabcdx", True),       # Overlapping keywords share characters
+    ("alphabet alpha", False, "alphabet", True),  # A keyword inside another one
+])
+def test_keywords(pattern, match_any, text, expected):
+    assert Query(pattern, match_any=match_any).matches(text) is expected
+
+
+def test_keywords_respect_case_sensitivity():
+    assert not Query("Alpha", case_sensitive=True).matches("alpha")
+    assert Query("Alpha", case_sensitive=True).matches("Alpha")
+
+
+def test_snippet_anchor_is_the_first_keyword():
+    text = "beta comes before alpha"
+    assert Query("alpha beta").find(text) == text.index("alpha")
+    assert Query("missing beta", match_any=True).find(text) == text.index("beta")
+    assert Query("missing").find(text) == -1
+
+
+def test_keywords_split_over_units():
+    units = [("page 1", "the alpha"), ("page 2", "and the beta")]
+    assert Query("beta alpha").find_in_units(iter(units)) == ("page 2", "and the beta", 8)
+    assert Query("alpha gamma").find_in_units(iter(units)) is None
+
+
+def test_regex():
+    query = Query(r"b\w+a", use_regex=True)
+    assert query.find("alpha beta") == 6
+    assert not Query(r"B\w+A", use_regex=True, case_sensitive=True).matches("alpha beta")
+    with pytest.raises(re.error):
+        Query("(unclosed", use_regex=True)
+
+
+@pytest.mark.parametrize("pattern, regex, case_sensitive, bytes_ok", [
+    ("alpha beta", False, False, True),
+    ("straße", False, True, True),
+    ("straße", False, False, False),     # ß folds to ss only on str
+    (r"fo+[a-z]", True, True, True),
+    (r"\w+", True, True, False),         # \w is Unicode-aware on str only
+    (r"s", True, False, False),          # s also folds to the long s on str
+    (r"x(?=y)", True, True, True),
+])
+def test_encoded_query_matches_like_the_text_query(pattern, regex, case_sensitive, bytes_ok):
+    query = Query(pattern, use_regex=regex, case_sensitive=case_sensitive)
+    encoded = query.encoded()
+    assert (encoded is not None) == bytes_ok
+    if encoded is None:
+        return
+    for text in ["alpha beta", "Straße", "foox", "xy", "ſ", "BETA ALPHA", ""]:
+        assert encoded.matches(text.encode('utf-8')) == query.matches(text), text
+
+
+def test_folded_bytes_keywords_match_unicode_case_variants():
+    encoded = Query("kiss").encoded()
+    for text in ["KISS", "Kiss", "kıss", "kiſs"]:
+        assert encoded.matches(text.encode('utf-8')) == Query("kiss").matches(text), text
+
+
+def test_required_literals():
+    assert Query("alpha beta").required_literals() == [["alpha", "beta"]]
+    assert Query("alpha beta", match_any=True).required_literals() == [["alpha"], ["beta"]]
+    assert Query(r"foo\d+bar", use_regex=True).required_literals() == [["foo", "bar"]]
+    assert Query(r"a|b", use_regex=True).required_literals() is None
+
+
+def test_count_terms():
+    query = Query("alpha alphabet beta")
+    counts = query.count_terms("alphabet alpha beta beta", [0] * query.term_count)
+    assert dict(zip(query.term_keys(), counts)) == {'alphabet': 1, 'alpha': 2, 'beta': 2}
+    regex = Query(r"b\w+", use_regex=True)
+    assert regex.count_terms("beta bob b", [0]) == [2]
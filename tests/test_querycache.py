@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from file_search_app.querycache import QueryCache
+from file_search_app.search import FileSearcher
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = {
+        'a.txt': "alpha beta",
+        'b.txt': "alpha only",
+        'c.md': "alpha beta gamma",
+        'd.txt': "nothing here",
+    }
+    for name, text in files.items():
+        (tmp_path / name).write_text(text)
+    return tmp_path
+
+
+def _search(cache, directory, pattern, **params):
+    params = {
+        'directory': str(directory),
+        'pattern': pattern,
+        'extensions': None,
+        'match_any': False,
+        'case_sensitive': False,
+        'search_content': True,
+        'use_regex': False,
+        'collect_stats': True,
+        **params,
+    }
+    searcher = FileSearcher(params, query_cache=cache)
+    results = []
+    searcher.search(None, results.append, None)
+    return sorted(r['name'] for r in results), searcher.stats.counters['recalled']
+
+
+def _touch(path, text):
+    stat = os.stat(path)
+    path.write_text(text)
+    # A new mtime even on filesystems with coarse timestamps
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_repeat_search_reuses_every_outcome(tree):
+    cache = QueryCache()
+    assert _search(cache, tree, "alpha beta") == (['a.txt', 'c.md'], 0)
+    assert _search(cache, tree, "alpha beta") == (['a.txt', 'c.md'], 4)
+    assert cache.hits == 1
+
+
+def test_changed_and_new_files_are_examined_again(tree):
+    cache = QueryCache()
+    _search(cache, tree, "alpha beta")
+    _touch(tree / 'd.txt', "now alpha and beta")
+    _touch(tree / 'a.txt', "no longer")
+    (tree / 'e.txt').write_text("alpha beta too")
+    names, recalled = _search(cache, tree, "alpha beta")
+    assert names == ['c.md', 'd.txt', 'e.txt']
+    assert recalled == 2
+
+
+def test_keywords_differing_in_case_repeat_the_search(tree):
+    cache = QueryCache()
+    _search(cache, tree, "alpha beta")
+    assert _search(cache, tree, "ALPHA Beta") == (['a.txt', 'c.md'], 4)
+    # Unless case matters
+    assert _search(cache, tree, "ALPHA Beta", case_sensitive=True) == ([], 0)
+
+
+def test_adding_a_keyword_refines_the_earlier_search(tree):
+    cache = QueryCache()
+    _search(cache, tree, "alpha")
+    names, recalled = _search(cache, tree, "alpha gamma")
+    assert names == ['c.md']
+    # Only the earlier misses are reused; its hits are matched again
+    assert recalled == 1
+    assert cache.refinements == 1
+
+
+def test_narrowing_the_extensions_reuses_hits(tree):
+    cache = QueryCache()
+    _search(cache, tree, "alpha")
+    assert _search(cache, tree, "alpha", extensions=['txt']) == (['a.txt', 'b.txt'], 3)
+    assert cache.refinements == 1
+
+
+def test_broader_or_different_searches_start_over(tree):
+    cache = QueryCache()
+    _search(cache, tree, "alpha beta")
+    assert _search(cache, tree, "alpha") == (['a.txt', 'b.txt', 'c.md'], 0)
+    assert _search(cache, tree, "alpha", match_any=True) == (['a.txt', 'b.txt', 'c.md'], 0)
+    assert _search(cache, tree, "alpha", search_content=False) == ([], 0)
+    assert cache.refinements == 0
+
+
+def test_cancelled_searches_arent_remembered(tree):
+    cache = QueryCache()
+    _search(cache, tree, "alpha", max_results=1)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_searches_are_dropped(tree):
+    cache = QueryCache(max_entries=2)
+    for pattern in ("alpha", "beta", "gamma"):
+        _search(cache, tree, pattern)
+    assert len(cache) == 2
+    assert _search(cache, tree, "alpha")[1] == 0
+    assert _search(cache, tree, "gamma")[1] == 4
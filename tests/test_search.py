@@ -0,0 +1,43 @@
+import asyncio
+
+from file_search_app.search import FileSearcher
+
+
+def _params(directory, **params):
+    return {
+        'directory': str(directory),
+        'pattern': 'hello',
+        'extensions': None,
+        'match_any': False,
+        'case_sensitive': False,
+        'search_content': True,
+        'use_regex': False,
+        **params,
+    }
+
+
+def test_cancelling_the_consumer_task_cancels_the_search(tmp_path):
+    for i in range(50):
+        (tmp_path / f"{i}.txt").write_text(f"hello {i}")
+    searcher = FileSearcher(_params(tmp_path))
+    seen = []
+
+    async def consume():
+        async for result in searcher.aiter_results():
+            seen.append(result)
+            await asyncio.sleep(3600)
+
+    async def main():
+        task = asyncio.create_task(consume())
+        while not seen:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # Cancelled although the generator was suspended at its yield, not closed
+        assert searcher.stop_reason == "cancelled"
+        assert searcher.cancelled()
+
+    asyncio.run(main())
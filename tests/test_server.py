@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+import signal
+import subprocess
+
+import pytest
+
+from file_search_app import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGKILL'), reason="POSIX signals only")
+def test_sigterm_removes_the_server_info(tmp_path):
+    env = dict(os.environ, HOME=str(tmp_path), USERPROFILE=str(tmp_path), PYTHONPATH=ROOT)
+    info = tmp_path / ".file_search_app" / "server.json"
+    process = subprocess.Popen([sys.executable, "-m", "file_search_app", "serve"], env=env,
+                               stderr=subprocess.PIPE)
+    try:
+        deadline = time.monotonic() + 30
+        while not info.exists():
+            assert process.poll() is None, process.stderr.read()
+            assert time.monotonic() < deadline, "the server didn't start"
+            time.sleep(0.05)
+        assert server.server_status(str(info))['pid'] == process.pid
+        process.terminate()
+        process.wait(timeout=30)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stderr.close()
+    assert not info.exists()
+    with pytest.raises(server.ServerError, match="no search server is running"):
+        server.read_info(str(info))
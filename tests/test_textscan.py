@@ -0,0 +1,70 @@
+import re
+import random
+
+import pytest
+
+from file_search_app import textscan
+from file_search_app.query import Query
+
+ANCHORED = [r'foo$', r'^foo', r'\Afoo', r'qux$', r'foo\Z', r'\bfoo', r'foo\b', r'(?<=x)foo', r'foo(?!y)',
+            r'(?:^|z)foo', r'^x+foo']
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(textscan, 'CHUNK_SIZE', 16)
+    monkeypatch.setattr(textscan, 'CHUNK_OVERLAP', 4)
+
+
+def _never():
+    return False
+
+
+def _scan(path, pattern, **query):
+    # A cancelled callback makes files above CHUNK_SIZE be scanned in chunks
+    return textscan.scan_file(str(path), Query(pattern, **query), sniff=True, cancelled=_never)[0]
+
+
+def test_anchor_at_a_chunk_edge_doesnt_match(tmp_path, small_chunks):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b'x' * (16 + 4 - 3) + b'foo' + b'y' * 100)
+    assert not _scan(path, r'foo$', use_regex=True)
+    assert not _scan(path, r'foo$', use_regex=True, case_sensitive=True)
+
+
+@pytest.mark.parametrize("encoding", ['utf-8', 'cp1252'])
+@pytest.mark.parametrize("pattern", ANCHORED)
+def test_chunked_regex_matches_like_the_whole_text(tmp_path, small_chunks, pattern, encoding):
+    rng = random.Random(pattern + encoding)
+    # cp1252 text is decoded chunk by chunk instead of matched as bytes
+    filler = 'xyz \n' + ('\xe9' if encoding == 'cp1252' else '')
+    for trial in range(200):
+        text = ''.join(rng.choice(filler) for _ in range(rng.randrange(20, 80)))
+        where = rng.randrange(len(text) + 1)
+        text = text[:where] + rng.choice(['foo', 'qux']) + text[where:]
+        path = tmp_path / f"{trial}.txt"
+        path.write_bytes(text.encode(encoding))
+        expected = re.search(pattern, text, re.IGNORECASE) is not None
+        assert _scan(path, pattern, use_regex=True) == expected, text
+
+
+def test_keywords_spanning_a_chunk_boundary_are_found(tmp_path, small_chunks):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b'x' * 14 + b'needle' + b'y' * 40 + b'haystack')
+    assert _scan(path, 'needle haystack')
+    assert not _scan(path, 'needle thread')
+
+
+def test_unicode_keyword_in_chunks(tmp_path, small_chunks):
+    path = tmp_path / "a.txt"
+    path.write_bytes(('x' * 15 + 'Straße').encode('utf-8') + b'y' * 40)
+    assert _scan(path, 'STRASSE') is False
+    assert _scan(path, 'straße')
+
+
+def test_context_sensitive_regexes():
+    assert Query(r'foo$', use_regex=True).context_sensitive
+    assert Query(r'(a|(?=b))c', use_regex=True).context_sensitive
+    assert Query(r'(?:x\b)+', use_regex=True).context_sensitive
+    assert not Query(r'fo+[a-z]', use_regex=True).context_sensitive
+    assert not Query('foo bar').context_sensitive